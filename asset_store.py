@@ -0,0 +1,193 @@
+# asset_store.py
+# Read game art straight out of assets.zip (no manual unzip needed).
+# Members are indexed once by lower-cased file name, so "player_wizard.png"
+# finds "assets/player_wizard.PNG"; __MACOSX/ and dot files are skipped.
+# Images are decoded on first request only and kept in a small LRU.
+# Collision masks are built from the same decoded image and kept for good
+# (a few KB each).
+import io
+import os
+import zipfile
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+import sprite_cache
+from collision import Mask
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_ZIP = os.path.join(BASE_DIR, "assets.zip")
+ASSET_DIR = os.path.join(BASE_DIR, "assets")
+MAX_IMAGES = 32
+
+
+def asset_key(name):
+    return os.path.basename(name.replace("\\", "/")).lower()
+
+
+class AssetStore:
+    def __init__(self, zip_path=ASSET_ZIP, directory=ASSET_DIR, max_images=MAX_IMAGES):
+        self.zip_path = zip_path
+        self.directory = directory
+        self.max_images = max_images
+        self.lock = threading.RLock()
+        self._zip = None
+        self._index = None
+        self._images = OrderedDict()  # (key, size) -> PIL Image, most recent last
+        self._masks = {}  # (key, size) -> collision.Mask
+        self.decodes = 0  # images actually built (cache miss in memory)
+
+    # ---------- Index ----------
+    def index(self):
+        with self.lock:
+            if self._index is None:
+                self._index = self._build_index()
+            return self._index
+
+    def _build_index(self):
+        index = {}
+        # an unzipped assets/ folder still works and overrides the archive
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not name.startswith(".") and os.path.isfile(path):
+                    index[name.lower()] = ("file", path)
+        if self.zip_path and os.path.isfile(self.zip_path):
+            self._zip = zipfile.ZipFile(self.zip_path)
+            for info in self._zip.infolist():
+                filename = info.filename
+                base = os.path.basename(filename)
+                if info.is_dir() or filename.startswith("__MACOSX/") or not base or base.startswith("."):
+                    continue
+                index.setdefault(base.lower(), ("zip", info))
+        return index
+
+    def names(self):
+        return sorted(self.index())
+
+    def exists(self, name):
+        return asset_key(name) in self.index()
+
+    def _entry(self, name):
+        entry = self.index().get(asset_key(name))
+        if entry is None:
+            raise FileNotFoundError(f"Asset not found: {name} (looked in {self.directory} and {self.zip_path})")
+        return entry
+
+    def ident(self, name):
+        """Stable identity of the asset's bytes, used as the sprite cache key."""
+        kind, ref = self._entry(name)
+        if kind == "file":
+            return sprite_cache.file_ident(ref)
+        return f"{os.path.abspath(self.zip_path)}:{ref.filename}|{ref.CRC}|{ref.file_size}"
+
+    def read(self, name):
+        kind, ref = self._entry(name)
+        if kind == "file":
+            with open(ref, "rb") as f:
+                return f.read()
+        with self.lock:
+            return self._zip.read(ref)
+
+    # ---------- Images ----------
+    def image(self, name, size=None):
+        """Decoded PIL image (resized if size is given). Shared: don't mutate it."""
+        key = (asset_key(name), tuple(size) if size else None)
+        with self.lock:
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                return img
+        img = self._decode(name, size)
+        with self.lock:
+            self._images[key] = img
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_images:
+                self._images.popitem(last=False)
+        return img
+
+    def mask(self, name, size):
+        """Alpha collision mask of the sprite at its rendered size."""
+        key = (asset_key(name), tuple(size))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._masks[key] = Mask.from_image(self.image(name, size))
+        return mask
+
+    def _decode(self, name, size):
+        self.decodes += 1
+        if size is None:
+            img = Image.open(io.BytesIO(self.read(name)))
+            img.load()
+            return img
+        return sprite_cache.load_cached(self.ident(name), size,
+                                        lambda: sprite_cache.resize_image(io.BytesIO(self.read(name)), size))
+
+    def forget(self):
+        with self.lock:
+            self._images.clear()
+            self._masks.clear()
+
+    def close(self):
+        with self.lock:
+            self.forget()
+            if self._zip is not None:
+                self._zip.close()
+            self._zip = None
+            self._index = None
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = AssetStore()
+    return _store
+
+
+def load_asset(name, size=None):
+    return get_store().image(name, size)
+
+
+# sizes the three entry points ask for
+STARTUP_SPRITES = [
+    ("duel_bg.jpeg", (800, 400)),
+    ("player_wizard.png", (400, 300)),
+    ("enemy_wizard.png", (400, 300)),
+    ("enemy_wizard2.png", (150, 190)),
+    ("enemy_wizard3.png", (150, 300)),
+    ("overworld_bg.jpeg", (800, 600)),
+    ("overworld_player.png", (180, 180)),
+    ("overworld_npc1.png", (180, 180)),
+    ("duel_bg.jpeg", (700, 400)),
+    ("player_wizard.png", (80, 80)),
+    ("enemy_wizard.png", (80, 80)),
+]
+
+
+if __name__ == "__main__":
+    import time
+    store = get_store()
+    print("assets:", ", ".join(store.names()))
+
+    def load_all():
+        start = time.perf_counter()
+        for name, size in STARTUP_SPRITES:
+            load_asset(name, size)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, size in STARTUP_SPRITES:
+        sprite_cache.resize_image(io.BytesIO(store.read(name)), size)
+    uncached = time.perf_counter() - start
+    sprite_cache.clear()
+    cold = load_all()
+    store.forget()
+    warm_disk = load_all()
+    warm_memory = load_all()
+    print(f"uncached decode+resize: {uncached*1000:.1f} ms")
+    print(f"disk cache miss:        {cold*1000:.1f} ms")
+    print(f"disk cache hit:         {warm_disk*1000:.1f} ms")
+    print(f"memory hit:             {warm_memory*1000:.3f} ms")
@@ -0,0 +1,203 @@
+# balance.py
+# Multi-core Monte Carlo runner for tuning campaign balance.
+#   python balance.py 1000000 --seed 7 --enemy-hp 60,80,100 --spell Expelliarmus=8-15
+import random
+import time
+import argparse
+from multiprocessing import Pool, cpu_count
+
+from duel_engine import (play_campaign, random_policy, PLAYER_SPELLS, PLAYER_LIMITED_USES,
+                         PLAYER_BASE_HP, ENEMY_NAMES, ENEMY_BASE_HP, ENEMY_HP_STEP, ENEMY_SPELL_SETS,
+                         Character)
+
+DEFAULT_CHUNK = 5000
+
+
+# -------------------- RESULTS --------------------
+class Tally:
+    """Mergeable campaign statistics (sent back from every worker chunk)."""
+
+    def __init__(self, n_enemies=len(ENEMY_NAMES)):
+        self.n_enemies = n_enemies
+        self.campaigns = 0
+        self.wins = 0
+        self.losses = 0
+        self.timeouts = 0
+        self.turns = 0
+        self.reached = [0] * (n_enemies + 1)  # furthest enemy index reached (n_enemies = all beaten)
+        self.kill_turns = [{} for _ in range(n_enemies)]  # per enemy: turns-to-kill -> count
+        self.levels = {}  # final level -> count
+
+    def add(self, engine):
+        self.campaigns += 1
+        self.turns += engine.turn
+        if engine.phase == "victory":
+            self.wins += 1
+            self.reached[self.n_enemies] += 1
+        else:
+            if engine.phase == "defeat":
+                self.losses += 1
+            else:
+                self.timeouts += 1
+            self.reached[engine.enemy_index] += 1
+        for index, turns in enumerate(engine.kill_turns):
+            hist = self.kill_turns[index]
+            hist[turns] = hist.get(turns, 0) + 1
+        level = engine.player.level
+        self.levels[level] = self.levels.get(level, 0) + 1
+
+    def merge(self, other):
+        self.campaigns += other.campaigns
+        self.wins += other.wins
+        self.losses += other.losses
+        self.timeouts += other.timeouts
+        self.turns += other.turns
+        for i, count in enumerate(other.reached):
+            self.reached[i] += count
+        for mine, theirs in zip(self.kill_turns, other.kill_turns):
+            for turns, count in theirs.items():
+                mine[turns] = mine.get(turns, 0) + count
+        for level, count in other.levels.items():
+            self.levels[level] = self.levels.get(level, 0) + count
+        return self
+
+    @property
+    def win_rate(self):
+        return self.wins / self.campaigns if self.campaigns else 0.0
+
+    def mean_kill_turns(self):
+        means = []
+        for hist in self.kill_turns:
+            kills = sum(hist.values())
+            means.append(sum(t * c for t, c in hist.items()) / kills if kills else None)
+        return means
+
+    def level_reach_rate(self):
+        """Fraction of campaigns in which the player got to at least each level."""
+        rates = {}
+        remaining = self.campaigns
+        for level in range(1, max(self.levels, default=1) + 1):
+            rates[level] = remaining / self.campaigns if self.campaigns else 0.0
+            remaining -= self.levels.get(level, 0)
+        return rates
+
+    def report(self):
+        return {
+            "campaigns": self.campaigns,
+            "win_rate": self.win_rate,
+            "wins": self.wins,
+            "losses": self.losses,
+            "timeouts": self.timeouts,
+            "avg_turns": self.turns / self.campaigns if self.campaigns else 0.0,
+            "reached": self.reached,
+            "mean_kill_turns": self.mean_kill_turns(),
+            "level_reach_rate": self.level_reach_rate(),
+        }
+
+
+# -------------------- WORKERS --------------------
+def chunk_rng(seed, chunk_index):
+    # One independent stream per chunk, so totals don't depend on worker count or scheduling.
+    return random.Random(f"{seed}:{chunk_index}")
+
+
+def run_chunk(args):
+    seed, chunk_index, size, config = args
+    rng = chunk_rng(seed, chunk_index)
+    spells = config["player_spells"]
+    limited_uses = config["limited_uses"]
+    engine_kwargs = config["engine_kwargs"]
+    tally = Tally(len(engine_kwargs["enemy_names"]))
+    for _ in range(size):
+        player = Character("You", config["player_hp"], spells, dict(limited_uses))
+        tally.add(play_campaign(rng, random_policy, config["max_turns"], player=player, **engine_kwargs))
+    return tally
+
+
+def make_config(player_spells=None, limited_uses=None, player_hp=PLAYER_BASE_HP,
+                enemy_base_hp=None, enemy_hp_step=ENEMY_HP_STEP, max_turns=1000):
+    enemy_base_hp = list(enemy_base_hp or ENEMY_BASE_HP)
+    names = [ENEMY_NAMES[i] if i < len(ENEMY_NAMES) else f"Enemy {i+1}" for i in range(len(enemy_base_hp))]
+    # extra enemies beyond the roster reuse the last enemy's spells
+    spell_sets = [ENEMY_SPELL_SETS[min(i, len(ENEMY_SPELL_SETS) - 1)] for i in range(len(enemy_base_hp))]
+    return {
+        "player_spells": dict(player_spells or PLAYER_SPELLS),
+        "limited_uses": dict(PLAYER_LIMITED_USES if limited_uses is None else limited_uses),
+        "player_hp": player_hp,
+        "max_turns": max_turns,
+        "engine_kwargs": {"enemy_names": names, "enemy_base_hp": enemy_base_hp,
+                          "enemy_hp_step": enemy_hp_step, "enemy_spells": spell_sets},
+    }
+
+
+def run_iter(n_campaigns, seed=0, workers=None, chunk_size=DEFAULT_CHUNK, config=None):
+    """Yield the running Tally after every finished chunk."""
+    config = config or make_config()
+    jobs = []
+    for chunk_index, start in enumerate(range(0, n_campaigns, chunk_size)):
+        jobs.append((seed, chunk_index, min(chunk_size, n_campaigns - start), config))
+    total = Tally(len(config["engine_kwargs"]["enemy_names"]))
+    if workers == 1:
+        for job in jobs:
+            yield total.merge(run_chunk(job))
+        return
+    with Pool(workers or cpu_count()) as pool:
+        for tally in pool.imap_unordered(run_chunk, jobs):
+            yield total.merge(tally)
+
+
+def run(n_campaigns, seed=0, workers=None, chunk_size=DEFAULT_CHUNK, config=None):
+    total = None
+    for total in run_iter(n_campaigns, seed, workers, chunk_size, config):
+        pass
+    return total
+
+
+# -------------------- CLI --------------------
+def parse_spell(text):
+    # "Expelliarmus=8-15"
+    name, _, dmg = text.partition("=")
+    lo, _, hi = dmg.partition("-")
+    return name, (int(lo), int(hi))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo campaign balance runner")
+    parser.add_argument("campaigns", type=int, nargs="?", default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    parser.add_argument("--player-hp", type=int, default=PLAYER_BASE_HP)
+    parser.add_argument("--enemy-hp", default=",".join(map(str, ENEMY_BASE_HP)),
+                        help="comma separated base HP per enemy")
+    parser.add_argument("--hp-step", type=int, default=ENEMY_HP_STEP,
+                        help="extra enemy HP per enemy index")
+    parser.add_argument("--spell", action="append", default=[],
+                        help="override a player spell damage range, e.g. Stupefy=6-12")
+    args = parser.parse_args()
+
+    spells = dict(PLAYER_SPELLS)
+    for text in args.spell:
+        name, dmg_range = parse_spell(text)
+        if name not in spells:
+            parser.error(f"unknown spell: {name}")
+        spells[name] = (dmg_range, spells[name][1])
+    config = make_config(spells, player_hp=args.player_hp,
+                         enemy_base_hp=[int(hp) for hp in args.enemy_hp.split(",")],
+                         enemy_hp_step=args.hp_step)
+
+    start = time.perf_counter()
+    total = None
+    for total in run_iter(args.campaigns, args.seed, args.workers, args.chunk, config):
+        elapsed = time.perf_counter() - start
+        print(f"\r{total.campaigns}/{args.campaigns} campaigns  win rate {total.win_rate:.4f}  "
+              f"{total.campaigns / elapsed:.0f}/s", end="", flush=True)
+    print()
+    if total is None:
+        return
+    for key, value in total.report().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# battle.py
+# Party-vs-horde battles (e.g. 4 wizards against 200 enemies) on
+# structure-of-arrays state: one numpy array per attribute, one row per
+# combatant. A side's whole turn (spell choice, rolls, shields, area
+# spells, heals, stun and poison ticks) is resolved in a few vectorized
+# passes instead of a Python loop over Character objects.
+#   python battle.py 4 200      memory and turn-time comparison with Character
+import numpy as np
+
+from catalog import get_catalog
+from duel_engine import POISON_DAMAGE
+
+# effect of a spell, by catalog spell type
+DAMAGE, HEAL, SHIELD, STUN, POISON = range(5)
+TYPE_EFFECTS = {"Charm": DAMAGE, "Curse": DAMAGE, "Defense": SHIELD, "Heal": HEAL,
+                "Stun": STUN, "Poison": POISON}
+POISON_TURNS = 3  # poison ticks added per cast (stacks by extending the duration)
+UNLIMITED = -1
+
+
+class SpellTable:
+    """The spells of the loadouts in play, as parallel arrays (local IDs 0..n-1)."""
+
+    def __init__(self, loadouts, catalog=None):
+        catalog = catalog or get_catalog()
+        names = []
+        limits = []
+        for loadout in loadouts:
+            spells, uses = catalog.loadout(loadout)
+            for spell in spells:
+                if spell not in names:
+                    names.append(spell)
+            limits.append(uses)
+        self.names = names
+        rows = [catalog.spell(name) for name in names]
+        self.lo = np.array([row.min for row in rows], dtype=np.int32)
+        self.hi = np.array([row.max for row in rows], dtype=np.int32)
+        self.effect = np.array([TYPE_EFFECTS.get(catalog.spell_type(row.type), DAMAGE) for row in rows],
+                               dtype=np.int8)
+        self.area = np.array([bool(row.area) for row in rows], dtype=bool)
+        # per loadout: which spells it has, and its starting uses (UNLIMITED if none)
+        self.allowed = np.zeros((len(loadouts), len(names)), dtype=bool)
+        self.start_uses = np.full((len(loadouts), len(names)), UNLIMITED, dtype=np.int16)
+        for i, loadout in enumerate(loadouts):
+            spells, _ = catalog.loadout(loadout)
+            for spell in spells:
+                self.allowed[i, names.index(spell)] = True
+            for spell, count in limits[i].items():
+                self.start_uses[i, names.index(spell)] = count
+
+
+class Combatants:
+    """Structure of arrays: row i of every array is combatant i."""
+
+    def __init__(self, members, spells):
+        # members: [(name, team, hp, loadout index)]
+        n = len(members)
+        self.names = [m[0] for m in members]
+        self.team = np.array([m[1] for m in members], dtype=np.int8)
+        self.max_hp = np.array([m[2] for m in members], dtype=np.int32)
+        self.hp = self.max_hp.copy()
+        self.loadout = np.array([m[3] for m in members], dtype=np.int16)
+        self.uses = spells.start_uses[self.loadout].copy()
+        self.shield = np.zeros(n, dtype=bool)
+        self.stun = np.zeros(n, dtype=np.int16)    # turns to skip
+        self.poison = np.zeros(n, dtype=np.int16)  # poison ticks left
+
+    def __len__(self):
+        return len(self.hp)
+
+    @property
+    def alive(self):
+        return self.hp > 0
+
+    def nbytes(self):
+        arrays = (self.team, self.max_hp, self.hp, self.loadout, self.uses, self.shield, self.stun, self.poison)
+        return sum(a.nbytes for a in arrays)
+
+
+class Battle:
+    def __init__(self, teams, seed=None, catalog=None):
+        """teams: list of sides, each a list of (name, hp, loadout name)."""
+        loadouts = []
+        for side in teams:
+            for _, _, loadout in side:
+                if loadout not in loadouts:
+                    loadouts.append(loadout)
+        self.spells = SpellTable(loadouts, catalog)
+        members = [(name, team, hp, loadouts.index(loadout))
+                   for team, side in enumerate(teams) for name, hp, loadout in side]
+        self.units = Combatants(members, self.spells)
+        self.n_teams = len(teams)
+        self.rng = np.random.default_rng(seed)
+        self.side = 0   # team to act next
+        self.turn = 0   # side turns played
+        self.winner = None
+
+    @property
+    def over(self):
+        return self.winner is not None
+
+    def team_alive(self, team):
+        units = self.units
+        return int(np.count_nonzero(units.alive & (units.team == team)))
+
+    # ---------- One side's turn ----------
+    def step(self):
+        """Resolve every action of the side to move. Returns a stats dict."""
+        if self.over:
+            return {}
+        u, spells, rng = self.units, self.spells, self.rng
+        side = self.side
+        self.side = (side + 1) % self.n_teams
+        self.turn += 1
+        mine = u.alive & (u.team == side)
+        stats = {"side": side, "poison": 0, "stunned": 0, "actions": 0, "damage": 0, "blocked": 0, "healed": 0}
+
+        # status ticks at the start of the side's turn
+        poisoned = mine & (u.poison > 0)
+        u.hp[poisoned] = np.maximum(0, u.hp[poisoned] - POISON_DAMAGE)
+        u.poison[poisoned] -= 1
+        stats["poison"] = int(np.count_nonzero(poisoned)) * POISON_DAMAGE
+        mine &= u.hp > 0
+        stunned = mine & (u.stun > 0)
+        u.stun[stunned] -= 1
+        stats["stunned"] = int(np.count_nonzero(stunned))
+        actors = np.flatnonzero(mine & ~stunned)
+        foes = np.flatnonzero(u.alive & (u.team != side))
+        if len(actors) == 0 or len(foes) == 0:
+            self._check_winner()
+            return stats
+        stats["actions"] = len(actors)
+
+        # spell choice: uniform over each actor's castable spells
+        castable = spells.allowed[u.loadout[actors]] & (u.uses[actors] != 0)
+        choice = np.argmax(rng.random(castable.shape) * castable, axis=1)
+        limited = u.uses[actors, choice] > 0
+        u.uses[actors[limited], choice[limited]] -= 1
+        lo = spells.lo[choice]
+        roll = lo + (rng.random(len(actors)) * (spells.hi[choice] - lo + 1)).astype(np.int32)
+        effect = spells.effect[choice]
+        target = foes[rng.integers(0, len(foes), size=len(actors))]
+
+        # damage: single-target hits, plus every foe for each area caster
+        hit = effect == DAMAGE
+        single = hit & ~spells.area[choice]
+        area = hit & spells.area[choice]
+        if u.shield[foes].any():
+            stats["damage"], stats["blocked"] = self._shielded_hits(foes, target[single], roll[single], roll[area])
+        else:
+            dmg = np.bincount(target[single], weights=roll[single], minlength=len(u)).astype(np.int32)
+            dmg[foes] += int(roll[area].sum())
+            u.hp -= dmg
+            np.maximum(u.hp, 0, out=u.hp)
+            stats["damage"] = int(dmg.sum())
+
+        casters = actors[effect == HEAL]
+        before = u.hp[casters]
+        u.hp[casters] = np.minimum(u.max_hp[casters], before + roll[effect == HEAL])
+        stats["healed"] = int((u.hp[casters] - before).sum())
+        u.shield[actors[effect == SHIELD]] = True
+        u.stun[target[effect == STUN]] = 1
+        np.add.at(u.poison, target[effect == POISON], POISON_TURNS)
+
+        self._check_winner()
+        return stats
+
+    def _shielded_hits(self, foes, targets, rolls, area_rolls):
+        """Slow path when a foe has Protego up: it blocks the first hit on it."""
+        u = self.units
+        hit_target = np.concatenate((targets, np.tile(foes, len(area_rolls))))
+        hit_damage = np.concatenate((rolls, np.repeat(area_rolls, len(foes))))
+        if not len(hit_target):
+            return 0, 0
+        order = self.rng.permutation(len(hit_target))  # hits land in random order
+        hit_target, hit_damage = hit_target[order], hit_damage[order]
+        first_target, first = np.unique(hit_target, return_index=True)
+        blocks = first[u.shield[first_target]]
+        hit_damage[blocks] = 0
+        u.shield[hit_target[blocks]] = False
+        np.subtract.at(u.hp, hit_target, hit_damage)
+        np.maximum(u.hp, 0, out=u.hp)
+        return int(hit_damage.sum()), len(blocks)
+
+    def _check_winner(self):
+        counts = np.bincount(self.units.team[self.units.alive], minlength=self.n_teams)
+        standing = np.flatnonzero(counts).tolist()
+        if len(standing) <= 1:
+            self.winner = standing[0] if standing else -1
+
+    def run(self, max_turns=10000):
+        while not self.over and self.turn < max_turns:
+            self.step()
+        return self.winner
+
+
+def party_vs_horde(party=4, horde=200, seed=None, party_hp=120, horde_hp=30):
+    return Battle([[(f"Wizard {i+1}", party_hp, "party") for i in range(party)],
+                   [(f"Minion {i+1}", horde_hp, "horde") for i in range(horde)]], seed)
+
+
+# -------------------- OBJECT BASELINE --------------------
+# The same rules on Character objects, with the per-character status dict
+# combat used before status_effects.py; only used for the comparison below.
+def object_side_turn(units, side, spells, rng):
+    foes = [c for c in units if c.team != side and c.hp > 0]
+    for c in units:
+        if c.team != side or c.hp <= 0:
+            continue
+        if c.status_effects.get("poison", 0) > 0:
+            c.status_effects["poison"] -= 1
+            c.hp = max(0, c.hp - POISON_DAMAGE)
+            if c.hp <= 0:
+                continue
+        if c.status_effects.get("stun", 0) > 0:
+            c.status_effects["stun"] -= 1
+            continue
+        if not foes:
+            return
+        castable = [s for s in c.spells if c.limited_uses.get(s, 1) != 0]
+        spell = rng.choice(castable)
+        if spell in c.limited_uses:
+            c.limited_uses[spell] -= 1
+        dmg, stype = c.cast_spell(spell, rng)
+        effect = TYPE_EFFECTS.get(stype, DAMAGE)
+        target = rng.choice(foes)
+        if effect == DAMAGE:
+            for t in (foes if spells[spell] else [target]):
+                if t.status_effects.get("shield"):
+                    t.status_effects["shield"] = 0
+                else:
+                    t.hp = max(0, t.hp - dmg)
+            foes = [f for f in foes if f.hp > 0]
+        elif effect == HEAL:
+            c.hp = min(c.max_hp, c.hp + dmg)
+        elif effect == SHIELD:
+            c.status_effects["shield"] = 1
+        elif effect == STUN:
+            target.status_effects["stun"] = 1
+        else:
+            target.status_effects["poison"] = target.status_effects.get("poison", 0) + POISON_TURNS
+
+
+def object_party_vs_horde(party=4, horde=200, party_hp=120, horde_hp=30):
+    from duel_engine import Character
+    catalog = get_catalog()
+    units = []
+    for team, count, hp, loadout in ((0, party, party_hp, "party"), (1, horde, horde_hp, "horde")):
+        spells, uses = catalog.loadout(loadout)
+        for i in range(count):
+            c = Character(f"{loadout} {i+1}", hp, spells, dict(uses))
+            c.team = team
+            c.status_effects = {}
+            units.append(c)
+    return units
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    import tracemalloc
+
+    party = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    horde = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    n = party + horde
+
+    tracemalloc.start()
+    units = object_party_vs_horde(party, horde)
+    for c in units:
+        c.status_effects["poison"] = 0  # every unit carries some status once a fight starts
+    obj_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    battle = party_vs_horde(party, horde, seed=1)
+    print(f"{n} combatants")
+    print(f"  Character objects: {obj_bytes / n:7.0f} bytes/combatant")
+    print(f"  arrays:            {battle.units.nbytes() / n:7.1f} bytes/combatant "
+          f"(+ {sys.getsizeof(battle.units.names[0])} for the name string)")
+
+    def time_turns(make, turn, turns=200):
+        best = float("inf")
+        for _ in range(3):
+            state = make()
+            start = time.perf_counter()
+            for i in range(turns):
+                turn(state, i)
+            best = min(best, (time.perf_counter() - start) / turns)
+        return best
+
+    area = {name: bool(get_catalog().spell(name).area) for name in get_catalog().spells_of_type("Curse")}
+    area.update({name: False for name in ("Expelliarmus", "Protego", "Episkey", "Stupefying Stun", "Poison Cloud")})
+    rng = random.Random(1)
+    heal = lambda units: [setattr(c, "hp", c.max_hp) for c in units]  # keep everyone fighting
+    obj = time_turns(lambda: object_party_vs_horde(party, horde),
+                     lambda units, i: (object_side_turn(units, i % 2, area, rng), heal(units)))
+
+    def soa_turn(b, i):
+        b.step()
+        b.units.hp[:] = b.units.max_hp
+        b.winner = None
+    soa = time_turns(lambda: party_vs_horde(party, horde, seed=1), soa_turn)
+    print(f"  turn resolution:   Character loop {obj * 1e6:.0f} us, arrays {soa * 1e6:.0f} us "
+          f"({obj / soa:.1f}x)")
+
+    start = time.perf_counter()
+    wins = [party_vs_horde(party, horde, seed=s).run() for s in range(200)]
+    print(f"  200 full battles:  {time.perf_counter() - start:.2f} s, party won {wins.count(0)}")
@@ -0,0 +1,311 @@
+# benchmarks.py
+# Reproducible benchmarks for startup, combat and overworld costs.
+#   python benchmarks.py                         run, compare with bench_baseline.json
+#                                                (fails on a regression or a metric the baseline lacks)
+#   python benchmarks.py --save-baseline         store this run as the new baseline
+#   python benchmarks.py --only combat,world     run a subset
+# Results are written as JSON (--out). Tk benchmarks use $DISPLAY, or start
+# an Xvfb server if one is installed, and are skipped otherwise.
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(BASE_DIR, "bench_baseline.json")
+TOLERANCE = 0.25  # fail when a "lower is better" metric gets 25% slower
+
+
+def best_of(fn, repeat=5, number=1):
+    """Best wall time (s) per call of fn over repeat rounds of number calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+class Results:
+    def __init__(self):
+        self.items = []
+
+    def add(self, name, value, unit, better="lower", **params):
+        self.items.append({"name": name, "value": value, "unit": unit, "better": better, "params": params})
+        shown = f"{value:.4g}" if isinstance(value, float) else value
+        print(f"  {name:48s} {shown:>12} {unit}")
+
+    def skip(self, name, reason):
+        self.items.append({"name": name, "skipped": reason})
+        print(f"  {name:48s} skipped ({reason})")
+
+
+# -------------------- ASSETS --------------------
+# run in a fresh interpreter: imports, sprites and the first frame of a duel (argv[1] = sprite cache dir)
+FIRST_FRAME = """
+import sys, time
+start = time.perf_counter()
+import sprite_cache
+sprite_cache.CACHE_DIR = sys.argv[1]
+import duel_film
+duel_film.DuelFilm(duel_film.golden_replay(3)).render()
+print(time.perf_counter() - start)
+"""
+
+
+def bench_assets(results):
+    import io
+    import asset_store
+    import sprite_cache
+
+    old_cache = sprite_cache.CACHE_DIR
+    sprite_cache.CACHE_DIR = tempfile.mkdtemp(prefix="wizard-bench-")
+    try:
+        for name, size in asset_store.STARTUP_SPRITES:
+            label = f"{name}@{size[0]}x{size[1]}"
+            store = asset_store.AssetStore()
+            data = store.read(name)
+            results.add(f"asset.decode_resize.{label}",
+                        best_of(lambda: sprite_cache.resize_image(io.BytesIO(data), size), 3) * 1000, "ms")
+
+            def cold():
+                sprite_cache.clear()
+                asset_store.AssetStore().image(name, size)
+            results.add(f"asset.cold.{label}", best_of(cold, 3) * 1000, "ms")
+            results.add(f"asset.warm_disk.{label}",
+                        best_of(lambda: asset_store.AssetStore().image(name, size), 5) * 1000, "ms")
+            results.add(f"asset.warm_memory.{label}",
+                        best_of(lambda: store.image(name, size), 5, 1000) * 1e6, "us")
+
+        # fresh process to the first composited duel frame: every sprite decoded and resized
+        # (cold, what each launch paid before the sprite cache) vs. read back from the cache
+        def first_frame(cold):
+            if cold:
+                sprite_cache.clear()
+            out = subprocess.run([sys.executable, "-c", FIRST_FRAME, sprite_cache.CACHE_DIR], cwd=BASE_DIR,
+                                 capture_output=True, text=True, check=True).stdout
+            return float(out.split()[-1])
+        for cold in (True, False):
+            first_frame(cold)  # warm the OS file cache (and the sprite cache for the warm run)
+            results.add(f"asset.first_frame.{'cold' if cold else 'warm_disk'}",
+                        min(first_frame(cold) for _ in range(3)) * 1000, "ms")
+    finally:
+        shutil.rmtree(sprite_cache.CACHE_DIR, ignore_errors=True)
+        sprite_cache.CACHE_DIR = old_cache
+
+
+# -------------------- COMBAT --------------------
+def bench_combat(results):
+    import duel_engine
+
+    n = 2000
+    secs = best_of(lambda: duel_engine.simulate(n, seed=1234), 3)
+    results.add("combat.campaigns_per_s", n / secs, "campaigns/s", better="higher", campaigns=n, seed=1234)
+
+    for amount in (10**3, 10**6, 10**9, 10**18):
+        def grant():
+            duel_engine.Character("bench", 60, {}).gain_xp(amount)
+        results.add(f"combat.gain_xp.{amount:.0e}", best_of(grant, 5, 200) * 1e6, "us", amount=amount)
+
+
+# -------------------- OVERWORLD --------------------
+def bench_world(results):
+    import world
+    from asset_store import get_store
+
+    masks = {"player": get_store().mask("overworld_player.png", (180, 180)),
+             "npc": get_store().mask("overworld_npc1.png", (180, 180))}
+    for count in (1, 10, 100, 1000, 10000):
+        for masked in (False, True):
+            rng = random.Random(count)
+            w = world.World(800 * 10, 600 * 10)
+            for _ in range(count):
+                w.add("npc", rng.uniform(0, 7800), rng.uniform(0, 5800), 180, 180, inset=20,
+                      mask=masks["npc"] if masked else None)
+            player = w.add("player", 100, 400, 180, 180, mask=masks["player"] if masked else None)
+            steps = [(rng.choice((-5, 0, 5)), rng.choice((-5, 0, 5))) for _ in range(1000)]
+
+            def ticks():
+                for dx, dy in steps:
+                    w.move_player(player, dx, dy)
+                    w.triggers(player, "npc")
+            name = "world.tick_masks" if masked else "world.tick"
+            results.add(f"{name}.npcs={count}", best_of(ticks, 3) / len(steps) * 1e6, "us", npcs=count)
+
+
+# -------------------- BATTLES --------------------
+def bench_battle(results):
+    import battle
+
+    for party, horde in ((4, 200), (40, 2000)):
+        def turns(b=battle.party_vs_horde(party, horde, seed=1)):
+            b.step()
+            b.units.hp[:] = b.units.max_hp  # keep everyone standing
+            b.winner = None
+        results.add(f"battle.side_turn.{party}v{horde}", best_of(turns, 5, 100) * 1e6, "us",
+                    party=party, horde=horde)
+
+
+# -------------------- TK (animation) --------------------
+def bench_render(results):
+    # offscreen duel frames: no display needed
+    import duel_film
+    film = duel_film.DuelFilm(duel_film.golden_replay(3))
+    film.seek(18000)  # sprites, HP bars, status lines, sparks and a typed message on screen
+    film.board.sparks.burst(500, 200, 48, "gold", ttl=(1e9, 1e9))
+
+    def composite():
+        film.canvas.version += 1  # force a full redraw
+        film.compositor.render(film.canvas)
+    results.add("render.composite", best_of(composite, 5, 50) * 1000, "ms")
+
+    def whole_duel():
+        for _ in duel_film.DuelFilm(duel_film.golden_replay(3)):
+            pass
+    frames = sum(1 for _ in duel_film.DuelFilm(duel_film.golden_replay(3)))
+    results.add("render.duel_fps", frames / best_of(whole_duel, 3), "fps", better="higher", frames=frames)
+
+
+def start_display():
+    """Make sure Tk can open a window. Returns (ok, cleanup)."""
+    if os.environ.get("DISPLAY"):
+        return True, lambda: None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        return False, lambda: None
+    display = ":97"
+    proc = subprocess.Popen([xvfb, display, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    def cleanup():
+        proc.terminate()
+        os.environ.pop("DISPLAY", None)
+    return True, cleanup
+
+
+def bench_tk(results):
+    ok, cleanup = start_display()
+    if not ok:
+        results.skip("tk.frame_step", "no $DISPLAY and no Xvfb")
+        return
+    try:
+        import tkinter as tk
+        from frame_loop import FrameLoop
+
+        root = tk.Tk()
+        canvas = tk.Canvas(root, width=800, height=600)
+        canvas.pack()
+        root.update()
+        for count in (10, 100, 1000):
+            loop = FrameLoop(root)
+            for i in range(count):
+                item = canvas.create_oval(0, 0, 10, 10, fill="red")
+                loop.tween(10**9, lambda t, item=item: canvas.move(item, 1, 0))
+            results.add(f"tk.frame_step.tweens={count}", best_of(loop.step, 5, 20) * 1000, "ms", tweens=count)
+            loop.stop()
+            canvas.delete("all")
+
+        # one spell beam per cast: fresh item vs pooled item
+        from fx_pool import ItemPool, Particles
+        def cast_fresh():
+            beam = canvas.create_line(0, 0, 0, 0, fill="red", width=5)
+            canvas.coords(beam, 10, 10, 10, 10)
+            canvas.delete(beam)
+        beams = ItemPool(canvas, "line", prewarm=1, width=5)
+        def cast_pooled():
+            beam = beams.acquire(0, 0, 0, 0, fill="red")
+            canvas.coords(beam, 10, 10, 10, 10)
+            beams.release(beam)
+        results.add("tk.cast_item.fresh", best_of(cast_fresh, 5, 200) * 1e6, "us")
+        results.add("tk.cast_item.pooled", best_of(cast_pooled, 5, 200) * 1e6, "us")
+
+        # every live spark moved each frame by a single task
+        loop = FrameLoop(root)
+        sparks = Particles(loop, ItemPool(canvas, "oval", prewarm=0, outline=""), random.Random(1))
+        for count in (100, 500):
+            sparks.clear()
+            sparks.burst(400, 300, count, "gold", ttl=(1e9, 1e9))
+            results.add(f"tk.particles={count}", best_of(loop.step, 5, 20) * 1000, "ms", particles=count)
+        loop.stop()
+        canvas.delete("all")
+        root.destroy()
+    finally:
+        cleanup()
+
+
+SUITES = {"assets": bench_assets, "combat": bench_combat, "world": bench_world, "battle": bench_battle,
+          "render": bench_render, "tk": bench_tk}
+
+
+# -------------------- BASELINE --------------------
+def compare(current, baseline, tolerance=TOLERANCE):
+    """Return ([(name, old, new, change)] regressions, [name] measured but not in the baseline)."""
+    old = {item["name"]: item for item in baseline.get("results", []) if "value" in item}
+    regressions = []
+    missing = []
+    for item in current:
+        if "value" not in item:
+            continue
+        if item["name"] not in old:
+            missing.append(item["name"])
+            continue
+        before, after = old[item["name"]]["value"], item["value"]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = change > tolerance if item["better"] == "lower" else change < -tolerance
+        if worse:
+            regressions.append((item["name"], before, after, change))
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wizard Duel benchmarks")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--only", default=",".join(SUITES), help="comma separated: " + ", ".join(SUITES))
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = Results()
+    for suite in args.only.split(","):
+        print(f"[{suite}]")
+        SUITES[suite](results)
+
+    report = {"python": sys.version.split()[0], "platform": platform.platform(),
+              "cpu_count": os.cpu_count(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "results": results.items}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"saved baseline {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        print("no baseline to compare against (use --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        regressions, missing = compare(results.items, json.load(f), args.tolerance)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:.4g} -> {after:.4g} ({change:+.0%})")
+    for name in missing:
+        print(f"NO BASELINE {name}: not compared (re-record with --save-baseline)")
+    if not regressions and not missing:
+        print("no regressions against baseline")
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+# catalog.py
+# Spells, spell types, enemies and loadouts are defined in data/*.csv. Each
+# table is compiled once into a fixed-record binary file under
+# .catalog_cache/ (integer row IDs, interned strings, sorted lookup
+# indexes) and memory-mapped. A table is only opened the first time it is
+# used, and rows are only decoded when asked for, so a catalog with
+# thousands of entries opens instantly and holds almost nothing in RAM.
+#   python catalog.py 10000     compile/open/lookup timings for a synthetic catalog
+import os
+import csv
+import mmap
+import struct
+import bisect
+import hashlib
+import threading
+from collections import namedtuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+CACHE_DIR = os.path.join(BASE_DIR, ".catalog_cache")
+
+MAGIC = b"WCAT"
+VERSION = 2
+NONE = 0xFFFF  # empty ref / blank number (e.g. unlimited uses)
+
+# field kinds:
+#   "str"          interned UTF-8 string
+#   "u16"          small number, blank -> None
+#   "ref:<table>"  row ID in another table (by name)
+#   "refs:<table>" ';'-separated names -> tuple of row IDs
+SCHEMAS = {
+    "spell_types": (("name", "str"), ("color", "str")),
+    "spells": (("name", "str"), ("type", "ref:spell_types"), ("min", "u16"), ("max", "u16"),
+               ("color", "str"), ("area", "u16")),  # area: 1 = hits every opponent (battles)
+    "enemies": (("name", "str"), ("hp", "u16"), ("sprite", "str"), ("width", "u16"), ("height", "u16"),
+                ("spells", "refs:spells")),
+    "loadouts": (("loadout", "str"), ("spell", "ref:spells"), ("uses", "u16")),
+}
+INDEXES = {
+    "spell_types": ("name",),
+    "spells": ("name", "type"),
+    "enemies": ("name",),
+    "loadouts": ("loadout",),
+}
+
+_HEADER = struct.Struct("<4sHHII")  # magic, version, index count, row count, record size
+_U16 = struct.Struct("<H")
+
+
+def _record_format(fields):
+    return "<" + "".join("H" if kind == "u16" or kind.startswith("ref:") else "I" for _, kind in fields)
+
+
+def _file_ident(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+# -------------------- COMPILER --------------------
+def compile_table(name, rows, resolve):
+    """Pack dict rows into the binary layout. resolve(table, name) -> row ID."""
+    fields = SCHEMAS[name]
+    record = struct.Struct(_record_format(fields))
+    blob = bytearray()
+    interned = {}
+
+    def intern(text):
+        offset = interned.get(text)
+        if offset is None:
+            data = text.encode("utf-8")
+            offset = interned[text] = len(blob)
+            blob.extend(_U16.pack(len(data)))
+            blob.extend(data)
+        return offset
+
+    records = bytearray()
+    keys = {field: [] for field in INDEXES[name]}
+    for row_id, row in enumerate(rows):
+        values = []
+        for field, kind in fields:
+            raw = (row.get(field) or "").strip()
+            if kind == "str":
+                values.append(intern(raw))
+                value = raw
+            elif kind == "u16":
+                value = int(raw) if raw else None
+                values.append(NONE if value is None else value)
+            elif kind.startswith("ref:"):
+                value = resolve(kind[4:], raw) if raw else None
+                values.append(NONE if value is None else value)
+            else:  # refs
+                ids = [resolve(kind[5:], part.strip()) for part in raw.split(";") if part.strip()]
+                values.append(len(blob))
+                blob.extend(struct.pack(f"<H{len(ids)}H", len(ids), *ids))
+                value = ids
+            if field in keys:
+                keys[field].append((value if value is not None else -1, row_id))
+        records.extend(record.pack(*values))
+
+    count = len(records) // record.size if record.size else 0
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(keys), count, record.size))
+    names = [field for field, _ in fields]
+    for field in keys:
+        out.extend(_U16.pack(names.index(field)))
+    out.extend(records)
+    for field, pairs in keys.items():
+        pairs.sort()
+        out.extend(struct.pack(f"<{count}I", *(row_id for _, row_id in pairs)))
+    out.extend(blob)
+    return bytes(out)
+
+
+# -------------------- TABLE --------------------
+class Table:
+    """One compiled table, memory-mapped; rows are decoded on demand."""
+
+    def __init__(self, name, path=None, data=None):
+        """Map the compiled file at path, or read the compiled bytes (data) from memory."""
+        self.name = name
+        self.fields = SCHEMAS[name]
+        self.field_names = [field for field, _ in self.fields]
+        self.Row = namedtuple(name.title().replace("_", "") + "Row", ["id"] + self.field_names)
+        if data is None:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = data
+        magic, version, n_indexes, self.count, record_size = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path or name}: not a compiled catalog table")
+        self._record = struct.Struct(_record_format(self.fields))
+        # per field: (byte offset inside a record, single-value Struct, kind)
+        self._field_at = {}
+        offset = 0
+        for field, kind in self.fields:
+            single = struct.Struct("<" + _record_format(((field, kind),))[1:])
+            self._field_at[field] = (offset, single, kind)
+            offset += single.size
+        pos = _HEADER.size
+        index_fields = [self.field_names[_U16.unpack_from(self._mm, pos + 2 * i)[0]] for i in range(n_indexes)]
+        self._records = pos + 2 * n_indexes
+        pos = self._records + self.count * record_size
+        self._indexes = {}
+        for field in index_fields:
+            self._indexes[field] = memoryview(self._mm)[pos:pos + 4 * self.count].cast("I")
+            pos += 4 * self.count
+        self._blob = pos
+
+    def __len__(self):
+        return self.count
+
+    def _string(self, offset):
+        start = self._blob + offset
+        (length,) = _U16.unpack_from(self._mm, start)
+        return self._mm[start + 2:start + 2 + length].decode("utf-8")
+
+    def _decode(self, kind, raw):
+        if kind == "str":
+            return self._string(raw)
+        if kind == "u16" or kind.startswith("ref:"):
+            return None if raw == NONE else raw
+        start = self._blob + raw
+        (n,) = _U16.unpack_from(self._mm, start)
+        return struct.unpack_from(f"<{n}H", self._mm, start + 2)
+
+    def row(self, row_id):
+        if not 0 <= row_id < self.count:
+            raise IndexError(f"{self.name}: no row {row_id}")
+        raw = self._record.unpack_from(self._mm, self._records + row_id * self._record.size)
+        return self.Row(row_id, *(self._decode(kind, value) for (_, kind), value in zip(self.fields, raw)))
+
+    def field(self, row_id, field):
+        offset, single, kind = self._field_at[field]
+        (raw,) = single.unpack_from(self._mm, self._records + row_id * self._record.size + offset)
+        return self._decode(kind, raw)
+
+    def rows(self):
+        return [self.row(i) for i in range(self.count)]
+
+    def lookup(self, field, value):
+        """Row IDs whose field equals value (binary search on the sorted index)."""
+        index = self._indexes[field]
+        key = lambda row_id: self._sort_key(row_id, field)
+        lo = bisect.bisect_left(index, value, key=key)
+        hi = bisect.bisect_right(index, value, lo=lo, key=key)
+        return list(index[lo:hi])
+
+    def _sort_key(self, row_id, field):
+        value = self.field(row_id, field)
+        return -1 if value is None else value
+
+    def id_of(self, name):
+        ids = self.lookup("name", name)
+        if not ids:
+            raise KeyError(f"{self.name}: unknown {name!r}")
+        return ids[0]
+
+    def close(self):
+        for view in self._indexes.values():
+            view.release()
+        self._indexes = {}
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+
+# -------------------- CATALOG --------------------
+class Catalog:
+    def __init__(self, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self._tables = {}
+        self._lock = threading.RLock()
+        self.compiled = 0  # tables (re)built from CSV by this instance
+
+    def csv_path(self, name):
+        return os.path.join(self.data_dir, name + ".csv")
+
+    def _deps(self, name):
+        deps = []
+        for _, kind in SCHEMAS[name]:
+            if ":" in kind:
+                ref = kind.split(":", 1)[1]
+                deps.extend(d for d in self._deps(ref) + [ref] if d not in deps)
+        return deps
+
+    def table(self, name):
+        """Open (compiling first if the CSV changed) and return a table."""
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                table = self._tables[name] = self._open(name)
+            return table
+
+    def _open(self, name):
+        idents = [_file_ident(self.csv_path(t)) for t in self._deps(name) + [name]]
+        key = hashlib.sha1(f"{VERSION}|{'|'.join(idents)}".encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, f"{name}-{key}.bin")
+        if not os.path.isfile(path):
+            names = {}  # referenced table -> {name: row ID}, only while compiling
+
+            def resolve(ref, value):
+                if ref not in names:
+                    table = self.table(ref)
+                    names[ref] = {table.field(i, "name"): i for i in range(len(table))}
+                try:
+                    return names[ref][value]
+                except KeyError:
+                    raise KeyError(f"{name}.csv: unknown {ref} entry {value!r}") from None
+
+            with open(self.csv_path(name), newline="", encoding="utf-8") as f:
+                data = compile_table(name, csv.DictReader(f), resolve)
+            self.compiled += 1
+            try:
+                self._store(name, path, data)
+            except OSError:
+                return Table(name, data=data)  # read-only install: keep the compiled table in memory
+        return Table(name, path)
+
+    def _store(self, name, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for old in os.listdir(self.cache_dir):
+            if old.startswith(name + "-") and old.endswith(".bin"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, old))
+                except OSError:
+                    pass
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def close(self):
+        with self._lock:
+            for table in self._tables.values():
+                table.close()
+            self._tables = {}
+
+    # ---------- Spells ----------
+    @property
+    def spells(self):
+        return self.table("spells")
+
+    def spell(self, spell):
+        """Row for a spell name or ID."""
+        table = self.spells
+        return table.row(spell if isinstance(spell, int) else table.id_of(spell))
+
+    def spell_type(self, type_id):
+        return self.table("spell_types").field(type_id, "name")
+
+    def spells_of_type(self, type_name):
+        type_id = self.table("spell_types").id_of(type_name)
+        return [self.spells.field(i, "name") for i in self.spells.lookup("type", type_id)]
+
+    def spell_dict(self, spells):
+        """{name: ((min, max), type)} for spell names or IDs, as DuelEngine uses."""
+        out = {}
+        for spell in spells:
+            row = self.spell(spell)
+            out[row.name] = ((row.min, row.max), self.spell_type(row.type))
+        return out
+
+    def type_color(self, type_name, default="white"):
+        types = self.table("spell_types")
+        ids = types.lookup("name", type_name)
+        return (types.field(ids[0], "color") or default) if ids else default
+
+    def spell_color(self, name, default="white"):
+        """The spell's own color, else its type's."""
+        ids = self.spells.lookup("name", name)
+        if not ids:
+            return default
+        row = self.spells.row(ids[0])
+        return row.color or self.type_color(self.spell_type(row.type), default)
+
+    # ---------- Enemies / loadouts ----------
+    def enemies(self):
+        return self.table("enemies").rows()
+
+    def enemy(self, enemy):
+        table = self.table("enemies")
+        return table.row(enemy if isinstance(enemy, int) else table.id_of(enemy))
+
+    def loadout(self, name):
+        """(spells dict, limited uses dict) for a named loadout."""
+        table = self.table("loadouts")
+        ids = table.lookup("loadout", name)
+        if not ids:
+            raise KeyError(f"loadouts: unknown {name!r}")
+        rows = [table.row(i) for i in ids]
+        spells = self.spell_dict([row.spell for row in rows])
+        uses = {self.spells.field(row.spell, "name"): row.uses for row in rows if row.uses is not None}
+        return spells, uses
+
+
+_catalog = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog()
+    return _catalog
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    import shutil
+    import tempfile
+    import tracemalloc
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    root = tempfile.mkdtemp(prefix="wizard-catalog-")
+    try:
+        data = os.path.join(root, "data")
+        os.makedirs(data)
+        shutil.copy(os.path.join(DATA_DIR, "spell_types.csv"), data)
+        rng = random.Random(1)
+        types = ["Charm", "Curse", "Defense", "Heal", "Stun", "Poison"]
+        with open(os.path.join(data, "spells.csv"), "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["name", "type", "min", "max", "color"])
+            for i in range(n):
+                lo = rng.randint(0, 20)
+                w.writerow([f"Spell {i}", rng.choice(types), lo, lo + rng.randint(0, 10), ""])
+        with open(os.path.join(data, "enemies.csv"), "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["name", "hp", "sprite", "width", "height", "spells"])
+            for i in range(n):
+                picks = ";".join(f"Spell {rng.randrange(n)}" for _ in range(3))
+                w.writerow([f"Enemy {i}", rng.randint(40, 200), "enemy_wizard.png", 150, 300, picks])
+        with open(os.path.join(data, "loadouts.csv"), "w", newline="") as f:
+            f.write("loadout,spell,uses\nplayer,Spell 0,\n")
+
+        cache = os.path.join(root, "cache")
+        start = time.perf_counter()
+        Catalog(data, cache).enemy(f"Enemy {n - 1}")
+        print(f"compile {n} spells + {n} enemies: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        cat = Catalog(data, cache)
+        row = cat.enemy(f"Enemy {n // 2}")
+        opened = time.perf_counter() - start
+        spells = cat.spell_dict(row.spells)
+        print(f"open + first enemy lookup (compiled): {opened * 1000:.2f} ms, {spells}")
+        start = time.perf_counter()
+        for i in range(10000):
+            cat.enemy(f"Enemy {rng.randrange(n)}")
+        print(f"lookup by name: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us")
+        print(f"spells of type Heal: {len(cat.spells_of_type('Heal'))}")
+        cat.close()
+
+        tracemalloc.start()
+        cat = Catalog(data, cache)
+        for i in range(100):
+            cat.spell_dict(cat.enemy(f"Enemy {rng.randrange(n)}").spells)
+        print(f"Python heap after 100 enemy lookups: {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB")
+        tracemalloc.stop()
+        cat.close()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open(os.path.join(data, "enemies.csv"), newline="") as f:
+            rows = {r["name"]: r for r in csv.DictReader(f)}
+        with open(os.path.join(data, "spells.csv"), newline="") as f:
+            rows.update({r["name"]: r for r in csv.DictReader(f)})
+        print(f"for comparison, csv.DictReader into dicts: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"{tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB")
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,233 @@
+# chunks.py
+# Streams a large overworld in fixed-size chunks. Only chunks around the
+# camera are decoded and on the canvas: the ones in view plus a prefetch
+# ring (decoded on a worker thread before they scroll in); chunks that fall
+# far enough behind are deleted. So memory and per-frame work depend on the
+# window size, not the map size.
+#   python chunks.py            1-screen vs 10,000-screen map, headless
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from asset_store import load_asset
+
+CHUNK_SIZE = (400, 300)
+PREFETCH = 1       # chunks decoded ahead of the view on every side (+1 in the direction of travel)
+EVICT_MARGIN = 1   # chunks further than this outside the view (+1 ahead) are dropped
+MAX_UPLOADS = 2    # prefetched chunks turned into PhotoImages per frame
+BACKGROUND = "overworld_bg.jpeg"
+
+
+class TileMap:
+    """cols x rows chunks cut from one background image.
+
+    The image is repeated mirrored (every other copy flipped), so it tiles
+    without seams however large the map is. render() runs on the worker thread.
+    """
+
+    def __init__(self, cols, rows, chunk=CHUNK_SIZE, source=BACKGROUND, source_size=(800, 600)):
+        self.cols = cols
+        self.rows = rows
+        self.chunk = chunk
+        self.source = source
+        self.source_size = source_size
+        self.per_x = source_size[0] // chunk[0]  # chunks per copy of the image
+        self.per_y = source_size[1] // chunk[1]
+
+    @property
+    def width(self):
+        return self.cols * self.chunk[0]
+
+    @property
+    def height(self):
+        return self.rows * self.chunk[1]
+
+    def render(self, cx, cy):
+        cw, ch = self.chunk
+        copy_x, lx = divmod(cx, self.per_x)
+        copy_y, ly = divmod(cy, self.per_y)
+        if copy_x % 2:
+            lx = self.per_x - 1 - lx
+        if copy_y % 2:
+            ly = self.per_y - 1 - ly
+        img = load_asset(self.source, self.source_size).crop((lx * cw, ly * ch, lx * cw + cw, ly * ch + ch))
+        if copy_x % 2:
+            img = img.transpose(Image.FLIP_LEFT_RIGHT)
+        if copy_y % 2:
+            img = img.transpose(Image.FLIP_TOP_BOTTOM)
+        return img
+
+
+class Chunk:
+    __slots__ = ("key", "future", "photo", "item")
+
+    def __init__(self, key, future):
+        self.key = key
+        self.future = future  # decode in flight (None once uploaded)
+        self.photo = None
+        self.item = None
+
+
+class ChunkStreamer:
+    """Keeps the chunks around the camera decoded and drawn.
+
+    make_photo(img) runs on the caller's (Tk) thread; decoding does not.
+    on_load / on_evict(cx, cy) let the scene spawn and drop what lives in
+    a chunk (NPC sprites). Chunk items are tagged with tag so the scene can
+    scroll them together with everything else in world space.
+    """
+
+    def __init__(self, tilemap, canvas, make_photo, view=(800, 600), tag="world",
+                 on_load=None, on_evict=None):
+        self.map = tilemap
+        self.canvas = canvas
+        self.make_photo = make_photo
+        self.view = view
+        self.tag = tag
+        self.on_load = on_load
+        self.on_evict = on_evict
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunks")
+        self.chunks = {}  # (cx, cy) -> Chunk, decoding or on the canvas
+        self.cam = (0.0, 0.0)
+        self._range = None  # visible chunk range at the last update
+        self._lead = (0, 0)
+        self.stats = {"decoded": 0, "evicted": 0, "sync_waits": 0}
+
+    # ---------- Frame update ----------
+    def update(self, cam_x, cam_y):
+        """Call every frame with the camera's top-left corner in world pixels."""
+        old_x, old_y = self.cam
+        self.cam = (cam_x, cam_y)
+        visible = self._visible(cam_x, cam_y)
+        if visible != self._range:
+            if cam_x != old_x or cam_y != old_y:
+                self._lead = ((cam_x > old_x) - (cam_x < old_x), (cam_y > old_y) - (cam_y < old_y))
+            self._range = visible
+            self._evict(visible)
+            self._request(visible)
+        self._upload(visible)
+
+    def _visible(self, cam_x, cam_y):
+        cw, ch = self.map.chunk
+        vw, vh = self.view
+        return (max(0, int(cam_x // cw)), max(0, int(cam_y // ch)),
+                min(self.map.cols - 1, int((cam_x + vw - 1) // cw)),
+                min(self.map.rows - 1, int((cam_y + vh - 1) // ch)))
+
+    def _around(self, visible, margin):
+        # visible range grown by margin, and one more chunk in the direction of travel
+        x1, y1, x2, y2 = visible
+        lx, ly = self._lead
+        return (max(0, x1 - margin - (lx < 0)), max(0, y1 - margin - (ly < 0)),
+                min(self.map.cols - 1, x2 + margin + (lx > 0)), min(self.map.rows - 1, y2 + margin + (ly > 0)))
+
+    def _request(self, visible):
+        x1, y1, x2, y2 = visible
+        wx1, wy1, wx2, wy2 = self._around(visible, PREFETCH)
+        mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+        wanted = [(cx, cy) for cx in range(wx1, wx2 + 1) for cy in range(wy1, wy2 + 1)
+                  if (cx, cy) not in self.chunks]
+        # the single worker runs FIFO: visible chunks first, then nearest
+        wanted.sort(key=lambda k: (not (x1 <= k[0] <= x2 and y1 <= k[1] <= y2), abs(k[0] - mx) + abs(k[1] - my)))
+        for key in wanted:
+            self.chunks[key] = Chunk(key, self.executor.submit(self.map.render, *key))
+
+    def _evict(self, visible):
+        x1, y1, x2, y2 = self._around(visible, EVICT_MARGIN)
+        for key in [k for k in self.chunks if not (x1 <= k[0] <= x2 and y1 <= k[1] <= y2)]:
+            self._drop(self.chunks.pop(key))
+
+    def _drop(self, chunk):
+        if chunk.future is not None:
+            chunk.future.cancel()
+        if chunk.item is not None:
+            self.canvas.delete(chunk.item)
+            self.stats["evicted"] += 1
+            if self.on_evict:
+                self.on_evict(*chunk.key)
+        chunk.photo = None
+
+    def _upload(self, visible):
+        x1, y1, x2, y2 = visible
+        budget = MAX_UPLOADS
+        for chunk in list(self.chunks.values()):
+            if chunk.future is None:
+                continue
+            cx, cy = chunk.key
+            in_view = x1 <= cx <= x2 and y1 <= cy <= y2
+            if chunk.future.done() and budget > 0:
+                budget -= 1
+            elif in_view:
+                # about to be on screen and not decoded yet: wait for it (startup, teleports)
+                self.stats["sync_waits"] += not chunk.future.done()
+            else:
+                continue
+            self._show(chunk, chunk.future.result())
+
+    def _show(self, chunk, img):
+        cw, ch = self.map.chunk
+        cx, cy = chunk.key
+        chunk.future = None
+        chunk.photo = self.make_photo(img)
+        chunk.item = self.canvas.create_image(cx * cw - self.cam[0], cy * ch - self.cam[1], anchor="nw",
+                                              image=chunk.photo, tags=(self.tag,))
+        self.canvas.tag_lower(chunk.item)
+        self.stats["decoded"] += 1
+        if self.on_load:
+            self.on_load(cx, cy)
+
+    # ---------- Introspection ----------
+    def resident(self):
+        """Chunks currently on the canvas."""
+        return sum(1 for c in self.chunks.values() if c.item is not None)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for chunk in self.chunks.values():
+            self._drop(chunk)
+        self.chunks.clear()
+
+
+if __name__ == "__main__":
+    import time
+
+    class NullCanvas:
+        def __init__(self):
+            self.items = {}
+            self._next = 0
+
+        def create_image(self, x, y, **kw):
+            self._next += 1
+            self.items[self._next] = kw["image"]
+            return self._next
+
+        def delete(self, item):
+            self.items.pop(item, None)
+
+        def tag_lower(self, item):
+            pass
+
+    load_asset(BACKGROUND, (800, 600))  # shared source image, same for every map size
+    for screens in (1, 10000):
+        side = int(screens ** 0.5)
+        tilemap = TileMap(side * 2, side * 2)
+        canvas = NullCanvas()
+        streamer = ChunkStreamer(tilemap, canvas, make_photo=lambda img: img.copy())
+        frame_ms = []
+        peak = 0
+        x = y = 0.0
+        # 2000 frames at 300 px/s diagonally, wrapping at the map edge
+        for frame in range(2000):
+            x = (x + 5) % max(1, tilemap.width - 800)
+            y = (y + 3.75) % max(1, tilemap.height - 600)
+            start = time.perf_counter()
+            streamer.update(x, y)
+            frame_ms.append((time.perf_counter() - start) * 1000)
+            # pixels held by chunks on the canvas (PIL buffers are invisible to tracemalloc)
+            peak = max(peak, sum(len(img.getbands()) * img.width * img.height for img in canvas.items.values()))
+            time.sleep(0.0005)  # let the worker run between frames
+        frame_ms.sort()
+        print(f"{screens:6d} screens ({tilemap.cols}x{tilemap.rows} chunks): "
+              f"{streamer.resident():3d} resident, peak {peak / 1e6:5.1f} MB of pixels, "
+              f"update p50 {frame_ms[len(frame_ms) // 2]:.3f} ms p99 {frame_ms[int(len(frame_ms) * 0.99)]:.3f} ms, "
+              f"{streamer.stats}")
+        streamer.close()
@@ -0,0 +1,396 @@
+# duel_engine.py
+# Headless duel rules. No tkinter / PIL in here: the GUI only draws the
+# events this engine emits, and simulate() can run whole campaigns in a loop.
+import random
+import copy
+
+import catalog
+from status_effects import EffectEngine
+
+# -------------------- DEFAULT CAMPAIGN --------------------
+# spells, enemies and loadouts are defined in data/*.csv (see catalog.py)
+_catalog = catalog.get_catalog()
+PLAYER_SPELLS, PLAYER_LIMITED_USES = _catalog.loadout("player")
+PLAYER_BASE_HP = 60
+
+_roster = _catalog.enemies()
+ENEMY_NAMES = [enemy.name for enemy in _roster]
+ENEMY_BASE_HP = [enemy.hp for enemy in _roster]  # base HP for each enemy
+ENEMY_HP_STEP = 20             # enemy max HP increases by 20 each time
+ENEMY_SPELL_SETS = [_catalog.spell_dict(enemy.spells) for enemy in _roster]
+ENEMY_SPELLS = ENEMY_SPELL_SETS[0]
+
+VICTORY_XP = 50
+DEFENSE_XP = 3
+STATUS_XP = 3        # casting Stun / Poison
+STUN_TURNS = 1       # enemy turns skipped per Stun
+POISON_DAMAGE = 3    # per stack, every enemy turn
+POISON_TURNS = 3
+POISON_MAX_STACKS = 3
+MAX_HP_STEP = 20  # player max HP bonus after each defeated enemy
+
+
+class Character:
+    def __init__(self, name, hp, spells, limited_uses=None):
+        self.name = name
+        self.max_hp = hp
+        self.hp = hp
+        self.spells = spells
+        self.limited_uses = limited_uses if limited_uses else {}
+        self.xp = 0
+        self.level = 1
+        self.next_level_xp = 50
+
+    def copy(self):
+        other = copy.copy(self)
+        other.limited_uses = dict(self.limited_uses)
+        return other
+
+    def cast_spell(self, spell, rng=random):
+        dmg_range, stype = self.spells[spell]
+        return rng.randint(*dmg_range), stype
+
+    def gain_xp(self, amount):
+        self.xp += amount
+        leveled_up = False
+        while self.xp >= self.next_level_xp:
+            self.xp -= self.next_level_xp
+            self.level += 1
+            self.next_level_xp = int(self.next_level_xp * 1.5)
+            leveled_up = True
+        return leveled_up
+
+
+def new_player(name="You", hp=PLAYER_BASE_HP, spells=None, limited_uses=None):
+    if spells is None:
+        spells = PLAYER_SPELLS
+    if limited_uses is None:
+        limited_uses = PLAYER_LIMITED_USES
+    return Character(name, hp, spells, dict(limited_uses))
+
+
+# -------------------- ENGINE --------------------
+# Events are plain tuples, first item is the kind:
+#   ("message", text)
+#   ("cast", side, spell, stype)      side is "player" or "enemy"
+#   ("hit", side, dmg)                side took damage
+#   ("heal", side, amount)
+#   ("shield", side)                  Protego raised
+#   ("blocked", side)                 Protego absorbed a hit on side
+#   ("status", side, kind, stacks)    stun / poison applied (or stacked) on side
+#   ("status_end", side, kind)        an effect ran out
+#   ("stunned", side)                 side loses its turn
+#   ("poison", side, dmg)
+#   ("xp", leveled_up)
+#   ("uses",)                         limited uses changed
+#   ("enemy_defeated", index)
+#   ("restore",)                      player healed / uses reset after a win
+#   ("next_enemy", index)
+#   ("victory",) / ("defeat",)
+#
+# phase tells the caller what to do next:
+#   "player"  -> player_turn(spell)
+#   "enemy"   -> enemy_turn()
+#   "advance" -> advance()   (previous enemy fainted, next one waiting)
+#   "victory" / "defeat" / "timeout" -> campaign over
+#
+# Status effects live in self.effects (status_effects.EffectEngine), with
+# "player" / "enemy" as targets. Its clock ticks once per enemy turn.
+class DuelEngine:
+    def __init__(self, player, initial_limited_uses=None, rng=None,
+                 enemy_names=ENEMY_NAMES, enemy_base_hp=ENEMY_BASE_HP,
+                 enemy_spells=ENEMY_SPELL_SETS, enemy_hp_step=ENEMY_HP_STEP):
+        self.player = player
+        if initial_limited_uses is None:
+            initial_limited_uses = player.limited_uses
+        self.initial_limited_uses = copy.deepcopy(initial_limited_uses)  # saved reset state
+        self.rng = rng if rng is not None else random.Random()
+        self.enemy_names = enemy_names
+        self.enemy_base_hp = enemy_base_hp
+        self.enemy_spells = enemy_spells  # one dict for every enemy, or a list with one per enemy
+        self.enemy_hp_step = enemy_hp_step
+        self.effects = EffectEngine()
+        self.turn = 0
+        self.enemy_turns = 0  # player turns spent on the current enemy
+        self.kill_turns = []  # enemy_turns it took to defeat each enemy
+        self.enemy_index = 0
+        self.phase = "player"
+        self.set_enemy(0)
+
+    @property
+    def player_defense(self):
+        return self.effects.has("player", "shield")
+
+    @property
+    def over(self):
+        return self.phase in ("victory", "defeat", "timeout")
+
+    def set_enemy(self, index):
+        self.enemy_index = index
+        hp = self.enemy_base_hp[index] + index * self.enemy_hp_step
+        spells = self.enemy_spells[index] if isinstance(self.enemy_spells, list) else self.enemy_spells
+        self.enemy = Character(self.enemy_names[index], hp, spells)
+        self.effects.clear("enemy")
+        self.enemy_turns = 0
+
+    def clone(self, rng=None):
+        """Independent copy for look-ahead; rng defaults to a copy of ours."""
+        other = copy.copy(self)
+        other.player = self.player.copy()
+        other.enemy = self.enemy.copy()
+        other.kill_turns = list(self.kill_turns)
+        other.effects = self.effects.copy()
+        other.rng = rng if rng is not None else copy.deepcopy(self.rng)
+        return other
+
+    def state_key(self):
+        """Compact tuple of everything that affects the rest of this fight."""
+        player, enemy = self.player, self.enemy
+        return (self.phase, self.enemy_index, player.hp, player.max_hp, enemy.hp, self.effects.snapshot(),
+                tuple(sorted(player.limited_uses.items())))
+
+    def available_spells(self):
+        uses = self.player.limited_uses
+        return [s for s in self.player.spells if uses.get(s, 1) > 0]
+
+    def step(self, spell=None):
+        """Advance one phase. spell is only used on the player's phase."""
+        if self.phase == "player":
+            return self.player_turn(spell)
+        if self.phase == "enemy":
+            return self.enemy_turn()
+        if self.phase == "advance":
+            return self.advance()
+        return []
+
+    # ---------- Player ----------
+    def player_turn(self, spell):
+        if self.phase != "player":
+            return []
+        player = self.player
+        events = []
+        if spell in player.limited_uses:
+            if player.limited_uses[spell] <= 0:
+                return [("message", f"No more uses left for {spell}!")]
+            player.limited_uses[spell] -= 1
+            events.append(("uses",))
+
+        self.turn += 1
+        self.enemy_turns += 1
+        dmg, stype = player.cast_spell(spell, self.rng)
+
+        if stype == "Defense":
+            self.effects.apply("player", "shield")
+            events.append(("message", f"{player.name} casts {spell}! Block the next attack! (+{DEFENSE_XP} XP)"))
+            events.append(("shield", "player"))
+            self._gain_xp(DEFENSE_XP, events)
+            self.phase = "enemy"
+            return events
+
+        if stype == "Heal":
+            healed = min(dmg, player.max_hp - player.hp)
+            player.hp = min(player.max_hp, player.hp + dmg)
+            events.append(("heal", "player", healed))
+            events.append(("message", f"{player.name} casts {spell}! Heals {healed} HP! (+{healed//2} XP)"))
+            self._gain_xp(healed // 2, events)
+            self.phase = "enemy"
+            return events
+
+        if stype in ("Stun", "Poison"):
+            enemy = self.enemy
+            events.append(("cast", "player", spell, stype))
+            if stype == "Stun":
+                effect = self.effects.apply("enemy", "stun", duration=STUN_TURNS)
+                text = f"{enemy.name} is stunned!"
+            else:
+                effect = self.effects.apply("enemy", "poison", duration=POISON_TURNS, amount=POISON_DAMAGE,
+                                            period=1, max_stacks=POISON_MAX_STACKS)
+                text = f"{enemy.name} is poisoned (x{effect.stacks})!"
+            events.append(("status", "enemy", effect.kind, effect.stacks))
+            events.append(("message", f"{player.name} casts {spell}! {text} (+{STATUS_XP} XP)"))
+            self._gain_xp(STATUS_XP, events)
+            self.phase = "enemy"
+            return events
+
+        # normal damage spells
+        events.append(("cast", "player", spell, stype))
+        self._damage_enemy(dmg, events)
+        events.append(("message", f"{player.name} casts {spell}! It dealt {dmg} damage! (+{dmg//2} XP)"))
+        self._gain_xp(dmg // 2, events)
+        if self.enemy.hp <= 0:
+            self._enemy_defeated(events)
+        else:
+            self.phase = "enemy"
+        return events
+
+    # ---------- Enemy ----------
+    def enemy_turn(self, spell=None):
+        """spell picks the enemy's attack (an AI); None rolls it at random."""
+        if self.phase != "enemy":
+            return []
+        enemy = self.enemy
+        events = []
+        stunned = self.effects.has("enemy", "stun")
+        self._tick_effects(events)
+        if self.phase != "enemy":  # poison finished someone off
+            return events
+        if stunned:
+            events.append(("message", f"{enemy.name} is stunned and cannot attack!"))
+            events.append(("stunned", "enemy"))
+            self.phase = "player"
+            return events
+        self._enemy_attack(events, spell)
+        return events
+
+    def _enemy_attack(self, events, spell=None):
+        enemy = self.enemy
+        player = self.player
+        if spell is None:
+            spell = self.rng.choice(list(enemy.spells.keys()))
+        dmg, stype = enemy.cast_spell(spell, self.rng)
+
+        if self.effects.consume("player", "shield"):
+            events.append(("blocked", "player"))
+            events.append(("message", f"{enemy.name} used {spell}, but Protego blocked it!"))
+            self.phase = "player"
+            return
+
+        events.append(("cast", "enemy", spell, stype))
+        player.hp = max(0, player.hp - dmg)
+        events.append(("hit", "player", dmg))
+        events.append(("message", f"{enemy.name} used {spell}! It dealt {dmg} damage!"))
+        if player.hp <= 0:
+            self._player_defeated(events)
+        else:
+            self.phase = "player"
+
+    def _tick_effects(self, events):
+        fired, expired = self.effects.advance()
+        for side, kind, amount in fired:
+            if kind == "poison":
+                target = self.player if side == "player" else self.enemy
+                target.hp = max(0, target.hp - amount)
+                events.append(("message", f"{target.name} takes {amount} poison damage!"))
+                events.append(("poison", side, amount))
+        for side, kind in expired:
+            events.append(("status_end", side, kind))
+        if self.player.hp <= 0:
+            self._player_defeated(events)
+        elif self.enemy.hp <= 0:
+            self._enemy_defeated(events)
+
+    def _player_defeated(self, events):
+        events.append(("message", f"{self.player.name} fainted... Game Over."))
+        events.append(("defeat",))
+        self.phase = "defeat"
+
+    # ---------- Campaign ----------
+    def advance(self):
+        if self.phase != "advance":
+            return []
+        self.set_enemy(self.enemy_index + 1)
+        self.phase = "player"
+        return [("next_enemy", self.enemy_index),
+                ("message", f"A wild {self.enemy.name} appeared! Your HP was restored and max HP increased by {MAX_HP_STEP}. "
+                            f"Spell uses reset. Enemy HP increased by {self.enemy_hp_step}!")]
+
+    def _damage_enemy(self, dmg, events):
+        self.enemy.hp = max(0, self.enemy.hp - dmg)
+        events.append(("hit", "enemy", dmg))
+
+    def _gain_xp(self, amount, events):
+        leveled_up = self.player.gain_xp(amount)
+        if leveled_up:
+            events.append(("message", f"{self.player.name} leveled up to Lv {self.player.level}!"))
+        events.append(("xp", leveled_up))
+
+    def _enemy_defeated(self, events):
+        player = self.player
+        # give XP for victory
+        leveled_up = player.gain_xp(VICTORY_XP)
+        events.append(("xp", leveled_up))
+        events.append(("message", f"{self.enemy.name} fainted! (+{VICTORY_XP} XP)"))
+        events.append(("enemy_defeated", self.enemy_index))
+        self.kill_turns.append(self.enemy_turns)
+
+        # increase max HP and restore current HP to full, reset limited uses
+        player.max_hp += MAX_HP_STEP
+        player.hp = player.max_hp
+        player.limited_uses = copy.deepcopy(self.initial_limited_uses)
+        events.append(("restore",))
+
+        if self.enemy_index + 1 < len(self.enemy_names):
+            self.phase = "advance"
+        else:
+            events.append(("victory",))
+            self.phase = "victory"
+
+
+# -------------------- SIMULATION --------------------
+def random_policy(engine, rng):
+    return rng.choice(engine.available_spells())
+
+
+def play_campaign(rng, policy=random_policy, max_turns=1000, player=None, enemy_policy=None, **engine_kwargs):
+    """Play one full campaign headless. Returns the finished engine.
+    enemy_policy(engine, rng) picks enemy spells; None keeps the random roll."""
+    if player is None:
+        player = new_player()
+    engine = DuelEngine(player, rng=rng, **engine_kwargs)
+    while not engine.over:
+        if engine.phase == "player":
+            if engine.turn >= max_turns:
+                engine.phase = "timeout"
+                break
+            engine.player_turn(policy(engine, rng))
+        elif engine.phase == "enemy" and enemy_policy is not None:
+            engine.enemy_turn(enemy_policy(engine, rng))
+        else:
+            engine.step()
+    return engine
+
+
+def simulate(n_duels, seed=None, policy=random_policy, max_turns=1000, **engine_kwargs):
+    """Run n_duels full campaigns and return aggregate results."""
+    rng = random.Random(seed)
+    n_enemies = len(engine_kwargs.get("enemy_names", ENEMY_NAMES))
+    wins = losses = timeouts = total_turns = 0
+    enemies_defeated = [0] * (n_enemies + 1)
+    levels = {}
+    for _ in range(n_duels):
+        engine = play_campaign(rng, policy, max_turns, **engine_kwargs)
+        if engine.phase == "victory":
+            wins += 1
+            enemies_defeated[n_enemies] += 1
+        else:
+            if engine.phase == "defeat":
+                losses += 1
+            else:
+                timeouts += 1
+            enemies_defeated[engine.enemy_index] += 1
+        total_turns += engine.turn
+        level = engine.player.level
+        levels[level] = levels.get(level, 0) + 1
+    return {
+        "duels": n_duels,
+        "wins": wins,
+        "losses": losses,
+        "timeouts": timeouts,
+        "win_rate": wins / n_duels if n_duels else 0.0,
+        "avg_turns": total_turns / n_duels if n_duels else 0.0,
+        "enemies_defeated": enemies_defeated,
+        "levels": dict(sorted(levels.items())),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    start = time.perf_counter()
+    result = simulate(n, seed)
+    elapsed = time.perf_counter() - start
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    print(f"{n / elapsed:.0f} campaigns/s")
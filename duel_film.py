@@ -0,0 +1,301 @@
+# duel_film.py
+# Renders duels without a window. A replay is played through the same
+# DuelBoard the duel window draws with, on an offscreen.OffscreenCanvas
+# stepped one FrameLoop step per video frame, and each frame is composited
+# with NumPy. Frames in which nothing moved are neither composited nor
+# encoded again.
+#   python duel_film.py duel.wdr --png frames/     PNG sequence
+#   python duel_film.py duel.wdr --video duel.mp4  video (needs ffmpeg on PATH)
+#   python duel_film.py --random 7 --png frames/   film a seeded random duel
+#   python duel_film.py --check                    compare the duel layouts with golden/
+#   python duel_film.py --update-golden            re-render golden/ after an intended change
+import os
+import sys
+import time
+import zlib
+import struct
+import shutil
+import random
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from asset_store import load_asset
+from frame_loop import FrameLoop
+from offscreen import OffscreenCanvas, Compositor
+from text_reveal import TextReveal, wrap_text
+from hogwarts_duel_ui import DuelBoard, BOARD_SIZE, REPLAY_TURN_MS, ENEMY_TURN_MS, ADVANCE_MS
+import replay as replays
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(BASE_DIR, "golden")
+FPS = 60
+LOG_HEIGHT = 60    # message strip under the board
+LOG_COLUMNS = 95
+END_HOLD_MS = 1500  # frames kept after the duel is decided
+PNG_LEVEL = 1      # zlib level; compression, not compositing, is the cost of a PNG frame (0 = stored, fastest)
+
+# (name, replay seed, game time in ms): layouts checked against golden/<name>.png
+GOLDEN_SCENES = [
+    ("start", 3, 0),            # first frame: full HP, empty log
+    ("cast", 3, 1250),          # first beam in flight, intro message typed out
+    ("status", 3, 18000),       # low HP colours, Poison x2 / Stun on the enemy, sparks
+    ("next_enemy", 12, 27500),  # second enemy's sprite, name and HP after the advance
+]
+GOLDEN_PIXEL_DIFF = 48    # a channel off by more than this counts as a changed pixel
+GOLDEN_MAX_CHANGED = 0.002  # share of changed pixels allowed (font rasterizer differences)
+
+
+class DuelFilm:
+    """A replay played back offscreen at fps frames per second of game time."""
+
+    def __init__(self, replay, fps=FPS, log=True):
+        self.replay = replay
+        self.engine = replay.make_engine()
+        width, height = BOARD_SIZE
+        self.canvas = OffscreenCanvas(width, height + (LOG_HEIGHT if log else 0), background="#111111")
+        self.frames = FrameLoop(None, hz=fps, global_scale=False)  # stepped by hand, one step per frame
+        self.board = DuelBoard(self.canvas, self.frames, self.engine, load_asset,
+                               rng=random.Random(f"{replay.seed}:fx"))
+        self.compositor = Compositor(self.canvas.width, self.canvas.height)
+        self.log = None
+        if log:
+            self.log_text = self.canvas.create_text(10, height + 8, anchor="nw", text="",
+                                                    font=("Consolas", 12, "bold"), fill="white")
+            self.log = TextReveal(self.frames, self._log_update, char_ms=25, message_pause=600)
+        self.pos = 0
+        self.result = None  # "victory" / "defeat" / "stopped" once the duel is decided
+        self.show_message(f"A wild {self.engine.enemy.name} appeared! "
+                          f"{self.engine.player.name}, what will you do?")
+        self._next_input()
+
+    @property
+    def time(self):
+        """Game time filmed so far, in ms."""
+        return self.frames.frames * self.frames.dt
+
+    # ---------- Duel flow (as DuelGUI watching a replay) ----------
+    def _input(self, enemy):
+        pos = self.pos
+        if pos >= len(self.replay.inputs) or self.replay.is_enemy(pos) != enemy:
+            return None
+        self.pos += 1
+        return self.replay.spell(pos)
+
+    def _next_input(self):
+        spell = self._input(enemy=False)
+        if spell is None:
+            self.result = "stopped"  # recording ends mid-duel
+            return
+        self.frames.wait(REPLAY_TURN_MS, lambda: self._play(self.engine.player_turn(spell)))
+
+    def _after_turn(self):
+        phase = self.engine.phase
+        if phase == "enemy":
+            self.frames.wait(ENEMY_TURN_MS, lambda: self._play(self.engine.enemy_turn(self._input(enemy=True))))
+        elif phase == "advance":
+            self.frames.wait(ADVANCE_MS, lambda: self._play(self.engine.advance()))
+        elif phase == "player":
+            self._next_input()
+
+    def _play(self, events, i=0):
+        if i >= len(events):
+            self._after_turn()
+            return
+        event = events[i]
+        kind = event[0]
+        if kind in ("victory", "defeat"):
+            self.result = kind
+            return
+        if kind == "message":
+            self.show_message(event[1])
+        self.board.render_event(event, lambda: self._play(events, i + 1))
+
+    # ---------- Message strip ----------
+    def show_message(self, text):
+        if self.log is not None:
+            self.log.show("\n".join(wrap_text(text, LOG_COLUMNS)))
+
+    def _log_update(self, text, added):
+        self.board.hud.set(self.log_text, text=text)
+
+    # ---------- Frames ----------
+    def render(self):
+        """Composite the current frame. Returns (frame, changed); the array is reused."""
+        rendered = self.compositor.rendered
+        frame = self.compositor.render(self.canvas)
+        return frame, self.compositor.rendered != rendered
+
+    def seek(self, ms):
+        """Play on, without compositing, until ms of game time have been filmed."""
+        while self.time < ms:
+            self.frames.step()
+
+    def __iter__(self):
+        """(frame, changed) for every frame until the duel is decided, then END_HOLD_MS more."""
+        end = None
+        while True:
+            yield self.render()
+            if self.result is not None:
+                if end is None:
+                    end = self.time + END_HOLD_MS
+                elif self.time >= end:
+                    return
+            self.frames.step()
+
+
+# ---------- Output ----------
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(frame, level=PNG_LEVEL):
+    """RGB frame -> PNG bytes. Rows go to zlib unfiltered: much cheaper than
+    PIL's adaptive filtering, at the price of somewhat larger files."""
+    height, width = frame.shape[:2]
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # filter byte 0 (none) per row
+    raw[:, 1:] = frame.reshape(height, -1)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + _chunk(b"IDAT", zlib.compress(raw.data, level))
+            + _chunk(b"IEND", b""))
+
+
+def write_png(film, directory, level=PNG_LEVEL, workers=None):
+    """Write the film as directory/frame_00000.png, ... Returns the frame count.
+
+    PNG encoding runs on a thread pool (zlib releases the GIL while it
+    compresses); a frame identical to the one before reuses its bytes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    pending = []  # (path, future) in frame order
+
+    def drain(limit):
+        while len(pending) > limit:
+            path, future = pending.pop(0)
+            with open(path, "wb") as f:
+                f.write(future.result())
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        last = None
+        for count, (frame, changed) in enumerate(film, 1):
+            if changed or last is None:
+                last = pool.submit(encode_png, frame.copy(), level)
+            pending.append((os.path.join(directory, f"frame_{count - 1:05d}.png"), last))
+            drain(4 * workers)
+        drain(0)
+    return count
+
+
+def write_video(film, path, fps=FPS):
+    """Pipe raw frames to ffmpeg. Returns the frame count."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found on PATH (write a PNG sequence with --png instead)")
+    width, height = film.canvas.width, film.canvas.height
+    proc = subprocess.Popen([ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                             "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                             "-pix_fmt", "yuv420p", path], stdin=subprocess.PIPE)
+    count = 0
+    try:
+        for count, (frame, _) in enumerate(film, 1):
+            proc.stdin.write(frame.data)
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    if proc.returncode:
+        raise RuntimeError(f"ffmpeg exited with status {proc.returncode}")
+    return count
+
+
+# ---------- Golden images ----------
+def golden_replay(seed):
+    return replays.record_random_duel(seed, random.Random(seed))
+
+
+def render_scene(seed, ms):
+    film = DuelFilm(golden_replay(seed))
+    film.seek(ms)
+    return film.render()[0].copy()
+
+
+def check_golden(update=False, directory=GOLDEN_DIR):
+    """Render every GOLDEN_SCENES layout and compare it with (or store it as) its golden image."""
+    failed = 0
+    out_dir = None
+    for name, seed, ms in GOLDEN_SCENES:
+        frame = render_scene(seed, ms)
+        path = os.path.join(directory, f"{name}.png")
+        if update:
+            os.makedirs(directory, exist_ok=True)
+            Image.fromarray(frame).save(path, optimize=True)
+            print(f"{name}: written to {path}")
+            continue
+        if not os.path.exists(path):
+            print(f"{name}: no golden image (run with --update-golden)")
+            failed += 1
+            continue
+        golden = np.asarray(Image.open(path).convert("RGB"))
+        if golden.shape != frame.shape:
+            print(f"{name}: size {frame.shape[1]}x{frame.shape[0]}, golden {golden.shape[1]}x{golden.shape[0]}")
+            failed += 1
+            continue
+        diff = np.abs(frame.astype(np.int16) - golden).max(axis=2)
+        changed = float((diff > GOLDEN_PIXEL_DIFF).mean())
+        ok = changed <= GOLDEN_MAX_CHANGED
+        print(f"{name}: {'ok' if ok else 'FAILED'} ({changed:.3%} of pixels changed)")
+        if not ok:
+            failed += 1
+            out_dir = out_dir or tempfile.mkdtemp(prefix="golden-")
+            Image.fromarray(frame).save(os.path.join(out_dir, f"{name}.png"))
+            Image.fromarray(((diff > GOLDEN_PIXEL_DIFF) * 255).astype(np.uint8)).save(
+                os.path.join(out_dir, f"{name}.diff.png"))
+    if out_dir:
+        print(f"rendered frames and diffs in {out_dir}")
+    return failed
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Render duels offscreen")
+    parser.add_argument("path", nargs="?", help="replay (.wdr) to film")
+    parser.add_argument("--random", type=int, default=None, metavar="SEED", help="film a random duel with this seed")
+    parser.add_argument("--png", metavar="DIR", help="write a PNG sequence")
+    parser.add_argument("--video", metavar="FILE", help="write a video through ffmpeg")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--level", type=int, default=PNG_LEVEL, help="PNG compression level (0-9)")
+    parser.add_argument("--no-log", action="store_true", help="leave out the message strip")
+    parser.add_argument("--check", action="store_true", help="compare layouts with the golden images")
+    parser.add_argument("--update-golden", action="store_true", help="re-render the golden images")
+    args = parser.parse_args()
+
+    if args.check or args.update_golden:
+        return 1 if check_golden(update=args.update_golden) else 0
+
+    if args.path:
+        replay = replays.Replay.load(args.path)
+    elif args.random is not None:
+        replay = golden_replay(args.random)
+    else:
+        parser.error("replay path or --random SEED required")
+    film = DuelFilm(replay, fps=args.fps, log=not args.no_log)
+    start = time.perf_counter()
+    if args.video:
+        count = write_video(film, args.video, args.fps)
+    elif args.png:
+        count = write_png(film, args.png, args.level)
+    else:
+        count = sum(1 for _ in film)  # composite only: how fast frames come out
+    elapsed = time.perf_counter() - start
+    print(f"{count} frames ({count / args.fps:.1f} s of duel, {film.result}) in {elapsed:.2f} s: "
+          f"{count / elapsed:.0f} fps, {film.compositor.rendered} composited, {film.compositor.skipped} unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# duel_load.py
+# Load generator for duel_server.py: thousands of simulated clients on one
+# asyncio loop, each playing matches back to back with random spells over
+# its own connection. Bots run the same lockstep engine as the duel window,
+# so every match also checks that client and server agree on the result.
+# Latency is measured from sending a spell to receiving it back as an INPUT;
+# the server's CPU time comes from its STATS counters, which gives inputs
+# per second per core even with clients and server sharing the machine.
+#   python duel_load.py                          spawn a server, 1000 solo clients for 10 s
+#   python duel_load.py --clients 4000 --pvp     2000 PvP matches at a time
+#   python duel_load.py --address :7717          load a server that is already running
+#   python duel_load.py --think 500              clients pause 500 ms before each spell
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import subprocess
+
+import duel_net as net
+from duel_engine import new_player, PLAYER_LIMITED_USES
+
+CONNECT_BATCH = 200  # connections opened at a time while ramping up
+
+
+class Run:
+    """Counters shared by every bot of one load run."""
+
+    def __init__(self):
+        self.measuring = False
+        self.stopping = False
+        self.connected = 0
+        self.latencies = []  # seconds, only our own spells, only while measuring
+        self.errors = 0
+        self.desyncs = 0
+        self.dropped = 0
+
+
+class Bot(asyncio.Protocol):
+    def __init__(self, run, mode, rng, think=0.0):
+        self.run = run
+        self.mode = mode
+        self.rng = rng
+        self.think = think  # seconds before each spell
+        self.wizard = new_player(f"bot{rng.getrandbits(16)}")
+        self.transport = None
+        self.buffer = bytearray()
+        self.replay = self.engine = self.role = None
+        self.sent_at = None  # our spell is in flight
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.run.connected += 1
+        self.join()
+
+    def connection_lost(self, exc):
+        self.run.connected -= 1
+        if not self.run.stopping:
+            self.run.dropped += 1
+
+    def join(self):
+        if not self.run.stopping:
+            self.transport.write(net.hello(self.wizard, PLAYER_LIMITED_USES, self.mode))
+
+    def data_received(self, data):
+        self.buffer += data
+        for kind, payload in net.unpack_frames(self.buffer):
+            self.handle(kind, payload)
+
+    def handle(self, kind, payload):
+        run = self.run
+        if kind == net.INPUT:
+            if self.sent_at is not None:  # our spell: no one else may cast until it is played
+                if run.measuring:
+                    run.latencies.append(time.perf_counter() - self.sent_at)
+                self.sent_at = None
+            net.apply_input(self.engine, self.replay, payload[0])
+            net.settle(self.engine, self.mode)
+            self.act()
+        elif kind == net.MATCH:
+            _, self.role, _, self.replay = net.decode_match(payload)
+            self.engine = self.replay.make_engine()
+            net.settle(self.engine, self.mode)
+            self.act()
+        elif kind == net.END:
+            self.replay.finish(self.engine)
+            if tuple(self.replay.result) != net.decode_end(payload):
+                run.desyncs += 1
+            self.join()
+        elif kind == net.ERROR:
+            run.errors += 1
+            self.sent_at = None
+            if payload[0] == net.E_LEFT:
+                self.join()
+
+    def act(self):
+        if self.sent_at is not None or net.turn_of(self.engine, self.mode) != self.role:
+            return
+        if self.role == net.ENEMY:
+            spell = self.rng.choice(list(self.engine.enemy.spells))
+        else:
+            spell = self.rng.choice(self.engine.available_spells())
+        self.sent_at = time.perf_counter()
+        if self.think:
+            asyncio.get_running_loop().call_later(self.think, self.cast, spell)
+        else:
+            self.cast(spell)
+
+    def cast(self, spell):
+        if not self.transport.is_closing():
+            self.sent_at = time.perf_counter()
+            self.transport.write(net.pack(net.CAST, bytes([net.input_code(self.replay, self.role, spell)])))
+
+
+async def server_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(net.pack(net.STATS))
+    _, payload = await net.read_frame(reader)
+    writer.close()
+    return net.decode_stats(payload)
+
+
+async def load(host, port, clients, duration, mode=net.SOLO, think=0.0, warmup=1.0, seed=1):
+    """Run clients bots against host:port for duration seconds. Returns (Run, server stats delta, client CPU s)."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    run = Run()
+    transports = []
+    for start in range(0, clients, CONNECT_BATCH):
+        batch = [loop.create_connection(lambda: Bot(run, mode, random.Random(rng.getrandbits(64)), think),
+                                        host, port)
+                 for _ in range(min(CONNECT_BATCH, clients - start))]
+        transports += [transport for transport, _ in await asyncio.gather(*batch)]
+    await asyncio.sleep(warmup)
+
+    before = await server_stats(host, port)
+    cpu = time.process_time()
+    run.measuring = True
+    await asyncio.sleep(duration)
+    run.measuring = False
+    cpu = time.process_time() - cpu
+    after = await server_stats(host, port)
+    clients = run.connected
+
+    run.stopping = True
+    for transport in transports:
+        transport.close()
+    await asyncio.sleep(0)
+    delta = {key: after[key] - before[key] for key in ("finished", "inputs", "errors", "cpu", "uptime")}
+    delta["clients"] = clients
+    delta["matches"] = after["matches"]
+    return run, delta, cpu
+
+
+def spawn_server():
+    """Start duel_server.py on a free port. Returns (process, host, port)."""
+    proc = subprocess.Popen([sys.executable, "duel_server.py", "--port", "0"], stdout=subprocess.PIPE,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError(f"duel server did not start: {line!r}")
+    host, port = net.parse_address(line.split()[-1])
+    return proc, host, port
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(run, server, client_cpu, duration):
+    lat = [x * 1000 for x in run.latencies]
+    wall = server["uptime"] or duration
+    rate = server["inputs"] / wall
+    core = server["cpu"] / wall
+    print(f"{server['clients']} clients, {server['matches']} live matches, {server['finished']} matches "
+          f"finished in {wall:.1f} s ({server['finished'] / wall:.0f}/s)")
+    print(f"server: {rate:.0f} inputs/s using {core:.0%} of a core -> "
+          f"{server['inputs'] / server['cpu'] if server['cpu'] else 0:.0f} inputs/s per core")
+    print(f"latency: p50 {percentile(lat, 0.5):.2f} ms, p90 {percentile(lat, 0.9):.2f} ms, "
+          f"p99 {percentile(lat, 0.99):.2f} ms, max {max(lat, default=0):.2f} ms ({len(lat)} spells)")
+    print(f"clients: {client_cpu / duration:.0%} of a core; {run.errors} refused, {run.desyncs} desyncs, "
+          f"{run.dropped} dropped connections")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Load generator for duel_server.py")
+    parser.add_argument("--address", help="host:port of a running server (default: spawn one)")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds played before measuring")
+    parser.add_argument("--pvp", action="store_true", help="bots play each other (two per match)")
+    parser.add_argument("--think", type=float, default=0.0, help="ms each bot waits before a spell")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.pvp and args.clients % 2:
+        parser.error("--pvp needs an even number of clients")
+
+    net.raise_fd_limit()
+    proc = None
+    if args.address:
+        host, port = net.parse_address(args.address)
+    else:
+        proc, host, port = spawn_server()
+    try:
+        mode = net.PVP if args.pvp else net.SOLO
+        run, server, cpu = asyncio.run(load(host, port, args.clients, args.duration, mode,
+                                            args.think / 1000.0, args.warmup, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    report(run, server, cpu, args.duration)
+    return 1 if run.desyncs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
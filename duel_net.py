@@ -0,0 +1,254 @@
+# duel_net.py
+# Wire protocol for networked duels (duel_server.py) and the blocking client
+# the duel window uses. A match is streamed as a replay (see replay.py): the
+# server sends the replay header once, then one byte per accepted spell, then
+# the trailer. Every client re-runs the inputs through its own DuelEngine with
+# the match seed, so events never cross the wire and both ends stay in
+# lockstep with the same rules.
+#
+# Frames are <u16 payload length><u8 kind><payload>:
+#   client -> server
+#     HELLO  u8 protocol, u8 mode, replay header of the wizard to play
+#     CAST   u8 replay input byte (ENEMY_BIT set when playing the enemy side)
+#     STATS  (empty) ask for the server's counters
+#   server -> client
+#     MATCH  u32 match id, u8 role, u8 mode, replay header (the seed is the server's)
+#     INPUT  u8 replay input byte, in the order the server accepted them
+#     END    replay trailer: phase, player hp, enemy index, level, turns
+#     ERROR  u8 code, utf-8 text
+#     STATS  see _STATS
+# Set WIZARD_SERVER=host:port to fight duels on a server (see duel_server.py).
+import os
+import socket
+import struct
+
+import replay as replays
+
+HOST = "127.0.0.1"
+PORT = 7717
+SERVER = os.environ.get("WIZARD_SERVER")
+PROTOCOL = 1
+CONNECT_TIMEOUT = 5.0
+
+HELLO, CAST, STATS = 1, 2, 3
+MATCH, INPUT, END, ERROR = 16, 17, 18, 19
+SOLO, PVP = 0, 1        # mode: against the server's enemy, or another client plays the enemies
+PLAYER, ENEMY = 0, 1    # role in a match
+E_PROTOCOL, E_TURN, E_SPELL, E_LEFT = 1, 2, 3, 4
+
+_FRAME = struct.Struct("<HB")     # payload length, kind
+_HELLO = struct.Struct("<BB")     # protocol, mode
+_MATCH = struct.Struct("<IBB")    # match id, role, mode
+_STATS = struct.Struct("<IIIQIdd")  # connections, live matches, finished matches, inputs, errors, cpu s, uptime s
+
+
+def parse_address(address):
+    """"host:port", ":port" or "host" -> (host, port)."""
+    host, _, port = (address or "").partition(":")
+    return host or HOST, int(port) if port else PORT
+
+
+def pack(kind, payload=b""):
+    return _FRAME.pack(len(payload), kind) + payload
+
+
+def error(code, text):
+    return pack(ERROR, bytes([code]) + text.encode("utf-8"))
+
+
+def hello(player, initial_limited_uses, mode=SOLO):
+    header = replays.Replay(0, player, initial_limited_uses).encode()
+    return pack(HELLO, _HELLO.pack(PROTOCOL, mode) + header)
+
+
+def decode_hello(payload):
+    """HELLO payload -> (mode, Replay with the wizard's starting state); ValueError if malformed."""
+    if len(payload) < _HELLO.size:
+        raise ValueError("short HELLO")
+    protocol, mode = _HELLO.unpack_from(payload)
+    if protocol != PROTOCOL or mode not in (SOLO, PVP):
+        raise ValueError("unsupported protocol or mode")
+    try:
+        return mode, replays.Replay.decode(payload[_HELLO.size:])
+    except (struct.error, IndexError, UnicodeDecodeError) as exc:
+        raise ValueError(f"bad wizard: {exc}") from None
+
+
+def match(match_id, role, mode, header):
+    return pack(MATCH, _MATCH.pack(match_id, role, mode) + header)
+
+
+def decode_match(payload):
+    """MATCH payload -> (match id, role, mode, Replay with no inputs yet)."""
+    match_id, role, mode = _MATCH.unpack_from(payload)
+    return match_id, role, mode, replays.Replay.decode(payload[_MATCH.size:])
+
+
+def end(result):
+    return pack(END, replays._TRAILER.pack(*result))
+
+
+def decode_end(payload):
+    """END payload -> the replay trailer tuple (compare with Replay.result)."""
+    return replays._TRAILER.unpack(payload)
+
+
+def stats(connections, matches, finished, inputs, errors, cpu, uptime):
+    return pack(STATS, _STATS.pack(connections, matches, finished, inputs, errors, cpu, uptime))
+
+
+def decode_stats(payload):
+    keys = ("connections", "matches", "finished", "inputs", "errors", "cpu", "uptime")
+    return dict(zip(keys, _STATS.unpack(payload)))
+
+
+async def read_frame(reader):
+    """Next (kind, payload) from an asyncio StreamReader."""
+    length, kind = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    return kind, await reader.readexactly(length)
+
+
+def unpack_frames(buf):
+    """Take the complete frames off the front of buf (a bytearray): [(kind, payload)]."""
+    frames = []
+    pos = 0
+    size = _FRAME.size
+    while len(buf) - pos >= size:
+        length, kind = _FRAME.unpack_from(buf, pos)
+        end = pos + size + length
+        if len(buf) < end:
+            break
+        frames.append((kind, bytes(buf[pos + size:end])))
+        pos = end
+    del buf[:pos]
+    return frames
+
+
+def raise_fd_limit():
+    """Allow as many open sockets as the system lets us (thousands of clients)."""
+    try:
+        import resource
+    except ImportError:  # not on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+# ---------- Lockstep ----------
+# Both ends run these the same way after every accepted input.
+def settle(engine, mode):
+    """Play the phases no one sends a spell for: the next enemy stepping up
+    and, in solo matches, the server's enemy. Returns the events."""
+    events = []
+    while not engine.over and (engine.phase == "advance" or (engine.phase == "enemy" and mode == SOLO)):
+        events += engine.step()
+    return events
+
+
+def turn_of(engine, mode):
+    """Role whose spell the match is waiting for, or None."""
+    if engine.phase == "player":
+        return PLAYER
+    if engine.phase == "enemy" and mode == PVP:
+        return ENEMY
+    return None
+
+
+def apply_input(engine, replay, code):
+    """Append an input byte to replay and play it on engine. Returns the events."""
+    replay.inputs.append(code)
+    spell = replay.spell(len(replay.inputs) - 1)
+    if code & replays.ENEMY_BIT:
+        return engine.enemy_turn(spell)
+    return engine.player_turn(spell)
+
+
+def input_code(replay, role, spell):
+    """Replay input byte for role's spell; ValueError if it cannot be encoded."""
+    if role == ENEMY:
+        return replay.enemy_code(spell)
+    return replay.code(spell)
+
+
+# ---------- Blocking client ----------
+class Client:
+    """One connection to a duel server. join() blocks until a match starts;
+    after that poll() never blocks, so a window can call it every frame.
+    Inputs land in self.replay.inputs in the server's order."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+        self.match_id = None
+        self.role = None
+        self.mode = None
+        self.replay = None
+        self.result = None  # END trailer
+        self.errors = []    # (code, text) in arrival order
+        self.closed = False
+
+    @classmethod
+    def connect(cls, address=None, timeout=CONNECT_TIMEOUT):
+        sock = socket.create_connection(parse_address(address or SERVER), timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(sock)
+
+    @property
+    def opponent_left(self):
+        return any(code == E_LEFT for code, _ in self.errors)
+
+    def join(self, player, initial_limited_uses, mode=SOLO, timeout=None):
+        """Ask for a match and wait for it (PvP waits for a second wizard)."""
+        self.sock.sendall(hello(player, initial_limited_uses, mode))
+        self.sock.settimeout(timeout)
+        while self.replay is None:
+            if not self._receive():
+                raise ConnectionError(self.errors[-1][1] if self.errors else "server closed the connection")
+        self.sock.setblocking(False)
+        return self
+
+    def cast(self, spell):
+        """Send our spell; it counts once it comes back as an INPUT."""
+        self.sock.sendall(pack(CAST, bytes([input_code(self.replay, self.role, spell)])))
+
+    def poll(self):
+        """Read whatever has arrived. Returns False once the connection is gone."""
+        if self.closed:
+            return False
+        try:
+            while self._receive():
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        return not self.closed
+
+    def _receive(self):
+        try:
+            data = self.sock.recv(65536)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            raise  # nothing yet: poll() / join() decide
+        except OSError:  # reset by the server
+            data = b""
+        if not data:
+            self.closed = True
+            return False
+        self.buffer += data
+        for kind, payload in unpack_frames(self.buffer):
+            self._handle(kind, payload)
+        return True
+
+    def _handle(self, kind, payload):
+        if kind == INPUT:
+            self.replay.inputs += payload
+        elif kind == MATCH:
+            self.match_id, self.role, self.mode, self.replay = decode_match(payload)
+        elif kind == END:
+            self.result = decode_end(payload)
+            self.replay.result = self.result
+        elif kind == ERROR:
+            self.errors.append((payload[0], payload[1:].decode("utf-8", "replace")))
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
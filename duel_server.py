@@ -0,0 +1,260 @@
+# duel_server.py
+# Hosts networked duels on one asyncio event loop: solo matches against the
+# server's enemy, and PvP matches where a second client plays the enemies.
+# Every match runs its own authoritative DuelEngine: the server checks whose
+# turn it is and which spells are left, then streams the accepted inputs to
+# both sides (protocol in duel_net.py). No events, rendering or timers live
+# here, only one engine turn per input, so one core holds thousands of duels.
+#   python duel_server.py                 listen on 127.0.0.1:7717
+#   python duel_server.py --port 9000     (--port 0 picks a free port)
+#   python duel_load.py                   measure it with simulated clients
+# With WIZARD_REPLAYS set, every finished match is saved as a .wdr replay.
+import sys
+import time
+import socket
+import asyncio
+import itertools
+
+import duel_net as net
+import replay as replays
+from duel_engine import new_player, PLAYER_LIMITED_USES, PLAYER_BASE_HP, MAX_HP_STEP, VICTORY_XP
+
+BACKLOG = 4096  # pending connections while thousands of clients connect at once
+
+
+def check_wizard(wizard):
+    """ValueError unless the HELLO wizard could come out of a campaign: the
+    loadout's spell uses at most, and HP / level that its XP accounts for."""
+    if wizard.initial_limited_uses != PLAYER_LIMITED_USES:
+        raise ValueError("spell uses differ from the loadout")
+    if wizard.limited_uses.keys() != PLAYER_LIMITED_USES.keys() or any(
+            uses > PLAYER_LIMITED_USES[spell] for spell, uses in wizard.limited_uses.items()):
+        raise ValueError("more spell uses than the loadout has")
+    # every level took next_level_xp, starting from a new wizard's
+    start = new_player()
+    total_xp, next_level_xp = wizard.xp, start.next_level_xp
+    for _ in range(start.level, wizard.level):
+        total_xp += next_level_xp
+        next_level_xp = int(next_level_xp * 1.5)
+        if next_level_xp > wizard.next_level_xp:
+            break
+    if wizard.level < start.level or next_level_xp != wizard.next_level_xp or wizard.xp >= next_level_xp:
+        raise ValueError("level and XP do not add up")
+    # max HP only grows by MAX_HP_STEP per defeated enemy, and each one gave VICTORY_XP
+    if wizard.max_hp > PLAYER_BASE_HP + MAX_HP_STEP * (total_xp // VICTORY_XP) or not 0 < wizard.hp <= wizard.max_hp:
+        raise ValueError("HP out of range")
+
+
+class Match:
+    def __init__(self, match_id, mode, wizard):
+        self.id = match_id
+        self.mode = mode
+        # the wizard's starting state comes from the client (checked by check_wizard), the seed from us
+        self.replay = replays.Replay(replays.new_seed(), wizard.make_player(), wizard.initial_limited_uses)
+        self.engine = self.replay.make_engine()
+        self.sessions = [None, None]  # by role
+
+    def start(self):
+        header = self.replay.encode()
+        for role, session in enumerate(self.sessions):
+            if session is not None:
+                session.send(net.match(self.id, role, self.mode, header))
+
+    def broadcast(self, data):
+        for session in self.sessions:
+            if session is not None:
+                session.send(data)
+
+    def cast(self, role, code):
+        """Play one input byte from role. Returns (error code, text) if it was refused."""
+        engine = self.engine
+        if net.turn_of(engine, self.mode) != role:
+            return net.E_TURN, "not your turn"
+        enemy = bool(code & replays.ENEMY_BIT)
+        if enemy != (role == net.ENEMY):
+            return net.E_SPELL, "spell of the wrong side"
+        names = self.replay.enemy_spell_names if enemy else self.replay.spell_names
+        index = code & ~replays.ENEMY_BIT
+        if index >= len(names):
+            return net.E_SPELL, "unknown spell"
+        spell = names[index]
+        if enemy and spell not in engine.enemy.spells:
+            return net.E_SPELL, f"{engine.enemy.name} does not know {spell}"
+        if not enemy and engine.player.limited_uses.get(spell, 1) <= 0:
+            return net.E_SPELL, f"no more uses left for {spell}"
+        net.apply_input(engine, self.replay, code)
+        self.broadcast(net.pack(net.INPUT, bytes([code])))
+        net.settle(engine, self.mode)
+        return None
+
+    def finish(self):
+        self.replay.finish(self.engine)
+        self.broadcast(net.end(self.replay.result))
+        replays.autosave(self.replay)
+
+
+class Session(asyncio.Protocol):
+    """One client connection."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.match = None
+        self.role = None
+        self.wizard = None  # PvP: the Replay from HELLO while waiting for an opponent
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+
+    def data_received(self, data):
+        self.buffer += data
+        for kind, payload in net.unpack_frames(self.buffer):
+            if not self.server.dispatch(self, kind, payload):
+                self.transport.close()
+                return
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+        self.server.leave(self)
+
+    # a client that stops reading stops being read
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+    def send(self, data):
+        self.transport.write(data)
+
+
+class DuelServer:
+    def __init__(self):
+        self.matches = {}     # match id -> Match
+        self.waiting = None   # PvP session waiting for an opponent
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.finished = 0
+        self.inputs = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def protocol(self):
+        return Session(self)
+
+    def dispatch(self, session, kind, payload):
+        """Handle one message. False drops the connection (protocol error)."""
+        if kind == net.CAST and session.match is not None and len(payload) == 1:
+            match = session.match
+            refused = match.cast(session.role, payload[0])
+            if refused:
+                self.errors += 1
+                session.send(net.error(*refused))
+            else:
+                self.inputs += 1
+                if match.engine.over:
+                    self.end(match)
+            return True
+        if kind == net.HELLO and session.match is None and session is not self.waiting:
+            try:
+                mode, wizard = net.decode_hello(payload)
+                check_wizard(wizard)
+            except ValueError as exc:
+                session.send(net.error(net.E_PROTOCOL, str(exc)))
+                return False
+            if mode == net.SOLO:
+                self.start(net.SOLO, wizard, session)
+            elif self.waiting is None:
+                session.wizard = wizard
+                self.waiting = session
+            else:
+                first, self.waiting = self.waiting, None
+                self.start(net.PVP, first.wizard, first, session)
+                first.wizard = None
+            return True
+        if kind == net.STATS:
+            session.send(self.stats())
+            return True
+        self.errors += 1
+        session.send(net.error(net.E_PROTOCOL, f"unexpected message {kind}"))
+        return False
+
+    # ---------- Matches ----------
+    def start(self, mode, wizard, player, enemy=None):
+        match = Match(next(self.ids), mode, wizard)
+        for role, session in ((net.PLAYER, player), (net.ENEMY, enemy)):
+            if session is not None:
+                match.sessions[role] = session
+                session.match, session.role = match, role
+        self.matches[match.id] = match
+        match.start()
+
+    def end(self, match):
+        match.finish()
+        self._drop(match)
+        self.finished += 1
+
+    def leave(self, session):
+        if self.waiting is session:
+            self.waiting = None
+        match = session.match
+        if match is None:
+            return
+        self._drop(match)
+        for other in match.sessions:
+            if other is not None and other is not session:
+                other.send(net.error(net.E_LEFT, "opponent left the duel"))
+
+    def _drop(self, match):
+        self.matches.pop(match.id, None)
+        for session in match.sessions:
+            if session is not None:
+                session.match = session.role = None
+
+    def stats(self):
+        return net.stats(self.connections, len(self.matches), self.finished, self.inputs, self.errors,
+                         time.process_time(), time.perf_counter() - self.started)
+
+
+async def serve(host=net.HOST, port=net.PORT, on_ready=None):
+    """Run a DuelServer until cancelled. on_ready(server, (host, port)) once listening."""
+    server = DuelServer()
+    loop = asyncio.get_running_loop()
+    listener = await loop.create_server(server.protocol, host, port, backlog=BACKLOG, reuse_address=True)
+    if on_ready:
+        on_ready(server, listener.sockets[0].getsockname()[:2])
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Networked duel server")
+    parser.add_argument("--host", default=net.HOST)
+    parser.add_argument("--port", type=int, default=net.PORT)
+    args = parser.parse_args()
+    net.raise_fd_limit()
+    servers = []
+
+    def ready(server, address):
+        servers.append(server)
+        print(f"listening on {address[0]}:{address[1]}", flush=True)  # duel_load.py waits for this line
+
+    try:
+        asyncio.run(serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    if servers:
+        server = servers[0]
+        print(f"{server.finished} matches finished, {server.inputs} inputs, {server.errors} refused, "
+              f"{time.process_time():.1f} s CPU")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# enemy_ai.py
+# Search-based opponent. Monte Carlo tree search over the real DuelEngine
+# rules: every playout runs on engine.clone(), so damage rolls, Protego,
+# stun, poison and limited uses behave exactly as in a real duel. Node
+# statistics live in a transposition table keyed on engine.state_key(), and
+# the table is kept between moves. Each decision stops at a time budget.
+#
+# The search works for whichever side is to move; EnemyAI runs it on one
+# worker thread and returns a Future, so the Tk loop only polls for it.
+#   WIZARD_AI=mcts       enemy uses the search (WIZARD_AI=mcts:500 for a 500 ms budget)
+#   python enemy_ai.py   random vs search-driven enemy against the same random player
+import os
+import math
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+TIME_BUDGET_MS = 250
+EXPLORATION = 1.0
+HORIZON = 8          # turns per playout before the heuristic scores the position
+MAX_NODES = 200000   # transposition table is cleared when it grows past this
+
+
+def legal_moves(engine):
+    if engine.phase == "player":
+        return engine.available_spells()
+    if engine.phase == "enemy":
+        return list(engine.enemy.spells)
+    return []
+
+
+def apply_move(engine, move):
+    if engine.phase == "player":
+        engine.player_turn(move)
+    else:
+        engine.enemy_turn(move)
+
+
+def evaluate(engine):
+    """Score from the enemy's side: 1 = player fainted, 0 = enemy fainted."""
+    if engine.phase == "defeat":
+        return 1.0
+    if engine.phase in ("advance", "victory"):
+        return 0.0
+    player, enemy = engine.player, engine.enemy
+    return 0.5 + 0.5 * (enemy.hp / enemy.max_hp - player.hp / player.max_hp)
+
+
+class MCTS:
+    def __init__(self, budget_ms=TIME_BUDGET_MS, seed=None, exploration=EXPLORATION,
+                 horizon=HORIZON, max_nodes=MAX_NODES):
+        self.budget_ms = budget_ms
+        self.rng = random.Random(seed)
+        self.exploration = exploration
+        self.horizon = horizon
+        self.max_nodes = max_nodes
+        self.table = {}  # state_key -> [visits, {move: [visits, enemy value sum]}]
+        self.iterations = 0  # playouts in the last choose()
+        self.hits = 0        # playouts that started from a known table entry
+
+    def choose(self, engine, budget_ms=None):
+        """Best move for the side to move in engine (engine is not modified)."""
+        moves = legal_moves(engine)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        if len(self.table) > self.max_nodes:
+            self.table.clear()
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        deadline = time.perf_counter() + budget
+        root_key = engine.state_key()
+        self.hits = self.table[root_key][0] if root_key in self.table else 0
+        self.iterations = 0
+        while True:
+            self._playout(engine)
+            self.iterations += 1
+            if time.perf_counter() >= deadline:
+                break
+        stats = self.table[root_key][1]
+        return max(moves, key=lambda m: stats[m][0] if m in stats else -1)
+
+    def _playout(self, root):
+        sim = root.clone(random.Random(self.rng.getrandbits(64)))
+        table = self.table
+        path = []
+        depth = 0
+        # selection / expansion: walk known states, add the first new one
+        while depth < self.horizon and sim.phase in ("player", "enemy"):
+            key = sim.state_key()
+            node = table.get(key)
+            expanded = node is None
+            if expanded:
+                node = table[key] = [0, {m: [0, 0.0] for m in legal_moves(sim)}]
+            move = self._select(node, sim.phase == "enemy")
+            path.append((node, move))
+            apply_move(sim, move)
+            depth += 1
+            if expanded:
+                break
+        # random playout for the rest of the horizon
+        rng = self.rng
+        while depth < self.horizon and sim.phase in ("player", "enemy"):
+            apply_move(sim, rng.choice(legal_moves(sim)))
+            depth += 1
+        value = evaluate(sim)
+        for node, move in path:
+            node[0] += 1
+            stat = node[1][move]
+            stat[0] += 1
+            stat[1] += value
+
+    def _select(self, node, enemy_to_move):
+        stats = node[1]
+        for move, stat in stats.items():
+            if stat[0] == 0:
+                return move
+        log_n = math.log(node[0])
+        c = self.exploration
+        best, best_score = None, -1.0
+        for move, (n, total) in stats.items():
+            q = total / n
+            if not enemy_to_move:
+                q = 1.0 - q
+            score = q + c * math.sqrt(log_n / n)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+
+class EnemyAI:
+    """MCTS on a single worker thread; the search only ever sees clones."""
+
+    def __init__(self, budget_ms=TIME_BUDGET_MS, seed=None):
+        self.search = MCTS(budget_ms, seed)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enemy-ai")
+        self.think_ms = []  # wall time of each decision
+
+    def submit(self, engine):
+        """Start thinking about engine's current position. Returns a Future."""
+        return self.executor.submit(self._think, engine.clone())
+
+    def _think(self, engine):
+        start = time.perf_counter()
+        move = self.search.choose(engine)
+        self.think_ms.append((time.perf_counter() - start) * 1000.0)
+        return move
+
+    def policy(self, engine, rng=None):
+        """Synchronous, for play_campaign(enemy_policy=...) and tournaments."""
+        return self.search.choose(engine)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def from_env():
+    """EnemyAI configured by WIZARD_AI, or None for the classic random enemy."""
+    value = os.environ.get("WIZARD_AI", "")
+    if not value.startswith("mcts"):
+        return None
+    _, _, budget = value.partition(":")
+    return EnemyAI(int(budget) if budget else TIME_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    import sys
+    from duel_engine import play_campaign
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    search = MCTS(budget, 1)
+    for label, enemy_policy in (("random", None), (f"mcts {budget} ms", lambda engine, rng: search.choose(engine))):
+        rng = random.Random(7)
+        engines = [play_campaign(rng, enemy_policy=enemy_policy, max_turns=200) for _ in range(n)]
+        lost = sum(e.phase == "defeat" for e in engines)
+        turns = sum(e.turn for e in engines) / n
+        beaten = sum(len(e.kill_turns) for e in engines) / n
+        print(f"enemy {label:12s}: player lost {lost}/{n}, {turns:.2f} turns per campaign, "
+              f"{beaten:.2f} enemies defeated")
@@ -0,0 +1,308 @@
+# frame_loop.py
+# One fixed-timestep loop per window. Every animation, tween and delayed
+# callback is a Task stepped from a single Tk timer, instead of each effect
+# re-scheduling itself with its own self.after(...) closure.
+#
+# One global time scale (WIZARD_SPEED=0.5, 4, ... or "instant") multiplies
+# every loop's own time_scale, so the duel, game-master and overworld windows
+# speed up or slow down together. Instant makes each step infinitely long:
+# tweens jump to their end, waits fire at once, and the loop keeps stepping
+# within a tick while tasks keep finishing, so a chain of effects and game
+# events runs in the same order as at 1x, just without the pauses.
+#   python frame_loop.py      self-check: stopping from a task, instant-mode stepping
+import os
+import time
+
+import profiler
+
+FRAME_HZ = 60
+MAX_CATCHUP = 5  # fixed steps allowed per tick before the backlog is dropped
+MIN_TIME_SCALE = 0.1
+INSTANT = float("inf")
+INSTANT_BUDGET = 0.02  # seconds of back-to-back steps per tick in instant mode
+
+
+def parse_time_scale(value):
+    """"instant" -> INSTANT, otherwise a number clamped to at least MIN_TIME_SCALE."""
+    value = str(value).strip().lower()
+    if value in ("instant", "inf", "max"):
+        return INSTANT
+    return max(MIN_TIME_SCALE, float(value))
+
+
+_time_scale = parse_time_scale(os.environ.get("WIZARD_SPEED") or 1.0)
+
+
+def get_time_scale():
+    return _time_scale
+
+
+def set_time_scale(scale):
+    """Set the global speed (a number or "instant") for every FrameLoop."""
+    global _time_scale
+    _time_scale = parse_time_scale(scale)
+    return _time_scale
+
+
+def instant():
+    return _time_scale == INSTANT
+
+
+class Task:
+    def __init__(self, step, on_done=None, name=None):
+        self.step = step  # step(dt_ms) -> True to keep running
+        self.on_done = on_done
+        self.name = name  # named tasks get their own frame-time histogram when profiling
+        self.last_run = None
+        self.paused = False
+        self.cancelled = False
+        self.finished = False
+
+    @property
+    def alive(self):
+        return not (self.cancelled or self.finished)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+class FrameLoop:
+    def __init__(self, widget, hz=FRAME_HZ, time_scale=1.0, global_scale=True):
+        self.widget = widget  # None for a loop stepped by hand (offscreen rendering)
+        self.dt = 1000.0 / hz  # fixed step in ms
+        self.time_scale = time_scale
+        self.global_scale = global_scale  # follow WIZARD_SPEED / set_time_scale
+        self.paused = False
+        self.tasks = []
+        self.frames = 0
+        self.time = 0.0  # scaled game time in ms
+        self._job = None
+        self._acc = 0.0
+        self._last = None
+        self._deadline = None
+
+    # ---------- Loop control ----------
+    @property
+    def running(self):
+        return self._job is not None
+
+    def start(self):
+        if self._job is None:
+            self._last = self._deadline = time.perf_counter()
+            self._schedule()
+
+    def stop(self):
+        """Stop ticking and cancel every task."""
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    @property
+    def scale(self):
+        """Effective time scale: this loop's time_scale times the global one."""
+        return self.time_scale * _time_scale if self.global_scale else self.time_scale
+
+    def _schedule(self, immediate=False):
+        if immediate:
+            # instant mode with work still chaining: come back as soon as Tk has run
+            self._deadline = time.perf_counter()
+            self._job = self.widget.after(0, self._tick)
+            return
+        # aim at absolute deadlines so rounding in after() doesn't accumulate
+        self._deadline += self.dt / 1000.0
+        now = time.perf_counter()
+        if now - self._deadline > 0.25:
+            self._deadline = now  # blocked for a while (modal dialog): resync
+        delay = max(0, int((self._deadline - now) * 1000))
+        self._job = self.widget.after(delay, self._tick)
+
+    def _tick(self):
+        job = self._job  # a task that stops (or restarts) the loop replaces this
+        now = time.perf_counter()
+        elapsed = (now - self._last) * 1000.0
+        prof = profiler.active()
+        if prof is not None:
+            prof.frame("frame", elapsed)
+        self._last = now
+        if not self.paused and self.scale == INSTANT:
+            more = self._run_instant(job)
+            if self._job is job:
+                self._schedule(more)
+            return
+        if not self.paused:
+            self._acc += elapsed
+            steps = 0
+            while self._acc >= self.dt and steps < MAX_CATCHUP:
+                self._acc -= self.dt
+                self.step()
+                steps += 1
+                if self._job is not job:
+                    return  # stopped from inside a task (scene destroyed by its own callback)
+            if self._acc >= self.dt:
+                self._acc = 0.0
+        self._schedule()
+
+    def _run_instant(self, job):
+        # every task steps at most once per tick: open-ended ones (the
+        # movement loop, AI and network polls) advance one frame as at any
+        # other speed, while tasks chained on by finished ones get their
+        # first step in the same tick, so waits and tweens unwind at once.
+        # True if the time budget ran out with work still chaining.
+        self._acc = 0.0
+        end = time.perf_counter() + INSTANT_BUDGET
+        stepped = set()
+        self.step(stepped)
+        while self._job is job and any(task not in stepped for task in self.tasks):
+            if time.perf_counter() >= end:
+                return True
+            self.step(stepped)
+        return False
+
+    def step(self, skip=None):
+        """Advance every live task by one fixed (time-scaled) step.
+
+        skip: set of tasks already stepped this tick; they are left alone
+        and every task stepped now is added to it.
+        Returns the number of tasks that finished during it.
+        """
+        dt = self.dt * self.scale
+        finished = 0
+        self.frames += 1
+        self.time += dt
+        prof = profiler.active()
+        for task in list(self.tasks):
+            if not task.alive or task.paused:
+                continue
+            if skip is not None:
+                if task in skip:
+                    continue
+                skip.add(task)
+            if prof is not None:
+                keep = self._profiled_step(prof, task, dt)
+            else:
+                keep = task.step(dt)
+            if not keep:
+                self._finish(task)
+                finished += 1
+        self.tasks = [task for task in self.tasks if task.alive]
+        return finished
+
+    def _profiled_step(self, prof, task, dt):
+        start = time.perf_counter()
+        keep = task.step(dt)
+        end = time.perf_counter()
+        name = task.name or profiler.callback_name(task.step)
+        prof.record(name, start, end, "task")
+        if task.name is not None:
+            if task.last_run is not None:
+                prof.frame(task.name, (start - task.last_run) * 1000.0)
+            task.last_run = start
+        return keep
+
+    def _finish(self, task):
+        if task.alive:
+            task.finished = True
+            if task.on_done:
+                task.on_done()
+
+    # ---------- Task helpers ----------
+    def add(self, step, on_done=None, name=None):
+        task = Task(step, on_done, name)
+        self.tasks.append(task)
+        return task
+
+    def wait(self, ms, callback):
+        """Run callback after ms of game time (after() replacement)."""
+        remaining = [ms]
+        def _step(dt):
+            remaining[0] -= dt
+            return remaining[0] > 0
+        return self.add(_step, callback)
+
+    def tween(self, duration, update, on_done=None):
+        """Call update(t) each step with t going 0 -> 1 over duration ms."""
+        elapsed = [0.0]
+        def _step(dt):
+            elapsed[0] += dt
+            t = min(1.0, elapsed[0] / duration) if duration > 0 else 1.0
+            update(t)
+            return t < 1.0
+        return self.add(_step, on_done)
+
+
+if __name__ == "__main__":
+    # self-check with a fake widget: a task that stops the loop (a scene
+    # destroyed from its own callback) must leave no timer behind
+    class FakeWidget:
+        def __init__(self):
+            self.jobs = {}
+            self.ids = 0
+
+        def after(self, ms, callback):
+            self.ids += 1
+            self.jobs[self.ids] = callback
+            return self.ids
+
+        def after_cancel(self, job):
+            self.jobs.pop(job, None)
+
+        def run_pending(self):
+            jobs, self.jobs = self.jobs, {}
+            for callback in jobs.values():
+                callback()
+
+    failed = 0
+    for speed in (1.0, "instant"):
+        set_time_scale(speed)
+        widget = FakeWidget()
+        loop = FrameLoop(widget)
+        loop.start()
+        loop.wait(10, loop.stop)
+        for _ in range(10):
+            loop._last -= 0.1  # pretend 100 ms passed between ticks
+            widget.run_pending()
+        ok = not loop.running and not widget.jobs and not loop.tasks
+        failed += not ok
+        print(f"stop from a task at speed {speed}: {'ok' if ok else 'FAILED'} "
+              f"(running {loop.running}, timers {len(widget.jobs)})")
+
+    # instant mode: a chain of waits unwinds in one tick, while an open-ended
+    # task (the overworld's movement loop) still steps once per tick
+    set_time_scale("instant")
+    widget = FakeWidget()
+    loop = FrameLoop(widget)
+    moves = []
+    loop.add(lambda dt: moves.append(dt) or True)
+    chain = []
+
+    def link(n):
+        chain.append(n)
+        if n < 5:
+            loop.wait(100, lambda: link(n + 1))
+    loop.wait(100, lambda: link(1))
+    loop.start()
+    widget.run_pending()
+    ok = chain == [1, 2, 3, 4, 5] and len(moves) == 1
+    failed += not ok
+    print(f"instant chain of 5 waits in one tick: {'ok' if ok else 'FAILED'} "
+          f"(chain {chain}, open-ended task stepped {len(moves)}x)")
+    loop.stop()
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,111 @@
+# fx_pool.py
+# Reusable canvas items for short-lived effects (spell beams, orbs, impact
+# flashes, sparks). Items are created hidden up front and handed out and
+# taken back, so a cast never creates or deletes canvas items and item IDs
+# stop growing. A handed-out item is raised, so effects draw over the HUD
+# even though the pool was filled before it. All particles of a Particles
+# system are moved by one frame task, however many bursts are in flight.
+import math
+import random
+
+MAX_PARTICLES = 600  # live sparks per system; bursts beyond this are trimmed
+
+
+class ItemPool:
+    """Hidden canvas items of one kind ("oval", "line", ...), reused."""
+
+    def __init__(self, canvas, kind, prewarm=8, **options):
+        self.canvas = canvas
+        self.kind = kind
+        self.options = options  # given to every item at creation
+        self.free = []
+        self.created = 0
+        self.in_use = 0
+        self.peak = 0
+        self.grow(prewarm)
+
+    def grow(self, count):
+        create = getattr(self.canvas, f"create_{self.kind}")
+        for _ in range(count):
+            self.free.append(create(0, 0, 0, 0, state="hidden", **self.options))
+        self.created += count
+
+    def reserve(self, count):
+        """Make sure count items can be acquired without creating any."""
+        if len(self.free) < count:
+            self.grow(count - len(self.free))
+
+    def acquire(self, *coords, **options):
+        """Show a pooled item at coords with options (fill=..., width=...)."""
+        if not self.free:
+            self.grow(max(4, self.created // 2))
+        item = self.free.pop()
+        self.canvas.coords(item, *coords)
+        self.canvas.itemconfigure(item, state="normal", **options)
+        self.canvas.tag_raise(item)  # on top, like a freshly created item, whatever was created since
+        self.in_use += 1
+        self.peak = max(self.peak, self.in_use)
+        return item
+
+    def release(self, item):
+        self.canvas.itemconfigure(item, state="hidden")
+        self.free.append(item)
+        self.in_use -= 1
+
+
+class Particles:
+    """Sparks drawn with pooled ovals, stepped together by one frame task."""
+
+    def __init__(self, frames, pool, rng=None, gravity=0.0008, max_particles=MAX_PARTICLES):
+        self.frames = frames
+        self.pool = pool
+        self.rng = rng or random.Random()
+        self.gravity = gravity  # px / ms^2
+        self.max_particles = max_particles
+        self.live = []  # [item, x, y, vx, vy, age, ttl, radius]
+        self.task = None
+
+    def burst(self, x, y, count, color, speed=(0.05, 0.3), ttl=(250, 600), radius=3):
+        """count sparks flying out of (x, y); speed in px per ms, ttl in ms."""
+        count = min(count, self.max_particles - len(self.live))
+        self.pool.reserve(count)
+        rng = self.rng
+        for _ in range(count):
+            angle = rng.uniform(0, 2 * math.pi)
+            v = rng.uniform(*speed)
+            item = self.pool.acquire(x - radius, y - radius, x + radius, y + radius, fill=color)
+            self.live.append([item, x, y, v * math.cos(angle), v * math.sin(angle), 0.0,
+                              rng.uniform(*ttl), radius])
+        if self.live and self.task is None:
+            self.task = self.frames.add(self._step, name="particles")
+        return count
+
+    def _step(self, dt):
+        coords = self.pool.canvas.coords
+        release = self.pool.release
+        g = self.gravity * dt
+        live = []
+        for p in self.live:
+            p[5] += dt
+            if p[5] >= p[6]:
+                release(p[0])
+                continue
+            p[4] += g
+            x = p[1] = p[1] + p[3] * dt
+            y = p[2] = p[2] + p[4] * dt
+            r = p[7] * (1.0 - p[5] / p[6])
+            coords(p[0], x - r, y - r, x + r, y + r)
+            live.append(p)
+        self.live = live
+        if not live:
+            self.task = None
+            return False
+        return True
+
+    def clear(self):
+        for p in self.live:
+            self.pool.release(p[0])
+        self.live = []
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
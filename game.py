@@ -0,0 +1,76 @@
+# game.py
+# One Tk root for the whole adventure: the overworld and the duel are scenes
+# swapped in place, so the player's Character, the decoded art and the
+# PhotoImages survive every encounter.
+import time
+import tkinter as tk
+from tkinter import simpledialog, messagebox
+
+from duel_engine import Character, PLAYER_SPELLS, PLAYER_LIMITED_USES, PLAYER_BASE_HP
+from overworld import Game
+from hogwarts_duel_ui import DuelGUI, DUEL_ASSETS
+import enemy_ai
+import duel_net
+
+
+class SceneManager(tk.Tk):
+    def __init__(self, player):
+        super().__init__()
+        self.geometry("800x600")
+        self.resizable(False, False)
+        self.player = player
+        self.photos = {}  # shared PhotoImage cache, see Scene.load_photo
+        self.scene = None
+        self.last_switch_ms = 0.0
+        self.ai = enemy_ai.from_env()  # shared by every duel, so its table carries over
+
+    def show(self, factory):
+        start = time.perf_counter()
+        if self.scene is not None:
+            self.scene.destroy()
+        self.scene = factory()
+        self.title(self.scene.title)
+        self.last_switch_ms = (time.perf_counter() - start) * 1000
+        return self.scene
+
+    # ---------- Scenes ----------
+    def show_overworld(self):
+        return self.show(lambda: Game(self, self.photos, on_duel=self.show_duel, preload=DUEL_ASSETS))
+
+    def show_duel(self):
+        net = None
+        if duel_net.SERVER:  # WIZARD_SERVER: the duel is fought on the server, this window only shows it
+            try:
+                net = duel_net.Client.connect()
+                net.join(self.player, PLAYER_LIMITED_USES, timeout=duel_net.CONNECT_TIMEOUT)
+            except OSError as exc:  # refused, timed out, or turned away by the server (ConnectionError)
+                if net is not None:
+                    net.close()
+                messagebox.showerror("Duel server", f"Could not start a duel on {duel_net.SERVER}:\n{exc}")
+                return None  # stay in the overworld
+        return self.show(lambda: DuelGUI(self.player, PLAYER_LIMITED_USES, self, self.photos,
+                                         on_finish=self.duel_finished, ai=self.ai, net=net))
+
+    def duel_finished(self, result):
+        if result in ("victory", "stopped"):  # stopped: the opponent left or the server dropped us
+            self.show_overworld()
+        else:
+            self.destroy()
+
+
+def main():
+    root = tk.Tk()
+    root.withdraw()
+    name = simpledialog.askstring("Name", "Enter your wizard's name:")
+    if not name:
+        name = "You"
+    root.destroy()
+
+    player = Character(name, PLAYER_BASE_HP, PLAYER_SPELLS, PLAYER_LIMITED_USES.copy())
+    app = SceneManager(player)
+    app.show_overworld()
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 # hogwarts_duel_safe.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
+from asset_store import load_asset, get_store
+from catalog import get_catalog
+from fx_pool import ItemPool
+from frame_loop import FrameLoop
 import random
-import os
 
 # -------------------- CONFIG --------------------
 CANVAS_WIDTH = 700
@@ -21,13 +24,19 @@ class Wizard:
         self.hp = max_hp
         self.spells = spells
 
-player = Wizard("Harry", 50, ["Expelliarmus", "Stupefy", "Lumos"])
-enemy = Wizard("Draco", 50, ["Serpensortia", "Stupefy"])
+# spell lists come from the "harry" / "draco" loadouts in data/loadouts.csv
+player = Wizard("Harry", 50, list(get_catalog().loadout("harry")[0]))
+enemy = Wizard("Draco", 50, list(get_catalog().loadout("draco")[0]))
 
 # -------------------- GUI --------------------
 class DuelGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, seed=None):
         super().__init__()
+        # rules and visual jitter draw from separate seeded streams, so the same
+        # seed gives the same duel however the animations are timed
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.fx_rng = random.Random(f"{self.seed}:fx")
         self.title("Hogwarts Duel")
         self.geometry("800x550")
 
@@ -35,16 +44,10 @@ class DuelGUI(tk.Tk):
         self.canvas = tk.Canvas(self, width=CANVAS_WIDTH, height=CANVAS_HEIGHT)
         self.canvas.pack(pady=10)
 
-        # ---------- Paths ----------
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        bg_path = os.path.join(BASE_DIR, "assets", "duel_bg.jpeg")  # <-- updated to .jpeg
-        player_path = os.path.join(BASE_DIR, "assets", "player_wizard.png")
-        enemy_path = os.path.join(BASE_DIR, "assets", "enemy_wizard.png")
-
-        # ---------- Load Images Safely ----------
-        self.bg_photo = self.load_image(bg_path, CANVAS_WIDTH, CANVAS_HEIGHT)
-        self.player_photo = self.load_image(player_path, 80, 80)
-        self.enemy_photo = self.load_image(enemy_path, 80, 80)
+        # ---------- Load Images Safely (assets.zip or assets/) ----------
+        self.bg_photo = self.load_image("duel_bg.jpeg", CANVAS_WIDTH, CANVAS_HEIGHT)
+        self.player_photo = self.load_image("player_wizard.png", 80, 80)
+        self.enemy_photo = self.load_image("enemy_wizard.png", 80, 80)
 
         # Draw images
         self.canvas.create_image(0,0,image=self.bg_photo, anchor="nw")
@@ -74,6 +77,13 @@ class DuelGUI(tk.Tk):
                                                         ENEMY_POS[1]-60+HP_BAR_HEIGHT,
                                                         fill="green")
 
+        # spell orbs and impact flashes are pooled, not created per cast
+        self.orbs = ItemPool(self.canvas, "oval", prewarm=2, outline="")
+        self.flashes = ItemPool(self.canvas, "oval", prewarm=2, fill="white", outline="")
+        # orb flights and turn delays run on a frame loop, so WIZARD_SPEED applies here too
+        self.frames = FrameLoop(self)
+        self.frames.start()
+
         # Status label
         self.status_var = tk.StringVar(value="Your turn!")
         self.status_label = ttk.Label(self, textvariable=self.status_var, font=("Helvetica", 12))
@@ -91,12 +101,12 @@ class DuelGUI(tk.Tk):
         self.turn = "player"
 
     # ---------- SAFE IMAGE LOADING ----------
-    def load_image(self, path, width, height):
-        if not os.path.isfile(path):
-            messagebox.showerror("Image Not Found", f"Cannot find image: {path}\nMake sure it exists in the assets folder.")
+    def load_image(self, name, width, height):
+        if not get_store().exists(name):
+            messagebox.showerror("Image Not Found", f"Cannot find image: {name}\nMake sure assets.zip sits next to this file.")
             self.destroy()
             exit()
-        img = Image.open(path).resize((width, height))
+        img = load_asset(name, (width, height))
         return ImageTk.PhotoImage(img)
 
     # -------------------- HP BAR UPDATE --------------------
@@ -108,9 +118,7 @@ class DuelGUI(tk.Tk):
 
     # -------------------- SPELL ANIMATION --------------------
     def animate_spell(self, spell_name, player_to_enemy=True):
-        colors = {"Expelliarmus":"red", "Stupefy":"blue", "Lumos":"yellow",
-                  "Serpensortia":"purple"}
-        color = colors.get(spell_name, "white")
+        color = get_catalog().spell_color(spell_name)
 
         if player_to_enemy:
             start_x, start_y = PLAYER_POS
@@ -119,29 +127,26 @@ class DuelGUI(tk.Tk):
             start_x, start_y = ENEMY_POS
             target_x, target_y = PLAYER_POS
 
-        target_x += random.randint(-10,10)
-        target_y += random.randint(-10,10)
+        target_x += self.fx_rng.randint(-10,10)
+        target_y += self.fx_rng.randint(-10,10)
 
-        spell_id = self.canvas.create_oval(start_x-10, start_y-10, start_x+10, start_y+10, fill=color, outline="")
+        spell_id = self.orbs.acquire(start_x-10, start_y-10, start_x+10, start_y+10, fill=color)
 
-        steps = 30
-        dx = (target_x - start_x)/steps
-        dy = (target_y - start_y)/steps
+        def move(t):
+            x = start_x + (target_x - start_x) * t
+            y = start_y + (target_y - start_y) * t
+            self.canvas.coords(spell_id, x-10, y-10, x+10, y+10)
 
-        def move_step(step=0):
-            if step < steps:
-                self.canvas.move(spell_id, dx, dy)
-                self.after(15, lambda: move_step(step+1))
-            else:
-                flash = self.canvas.create_oval(target_x-15,target_y-15,target_x+15,target_y+15,fill="white",outline="")
-                self.after(150, lambda: self.canvas.delete(spell_id))
-                self.after(200, lambda: self.canvas.delete(flash))
-                self.apply_damage(player_to_enemy)
-        move_step()
+        def hit():
+            flash = self.flashes.acquire(target_x-15,target_y-15,target_x+15,target_y+15)
+            self.frames.wait(150, lambda: self.orbs.release(spell_id))
+            self.frames.wait(200, lambda: self.flashes.release(flash))
+            self.apply_damage(player_to_enemy)
+        self.frames.tween(450, move, hit)  # 30 steps of 15 ms
 
     # -------------------- APPLY DAMAGE --------------------
     def apply_damage(self, player_to_enemy):
-        dmg = random.randint(5,10)
+        dmg = self.rng.randint(5,10)
         if player_to_enemy:
             enemy.hp = max(0, enemy.hp - dmg)
             self.update_hp_bar(enemy, self.enemy_hp_fg)
@@ -159,7 +164,7 @@ class DuelGUI(tk.Tk):
             self.disable_spells()
         else:
             if player_to_enemy:
-                self.after(500, self.enemy_attack)
+                self.frames.wait(500, self.enemy_attack)
 
     # -------------------- PLAYER ATTACK --------------------
     def player_attack(self, spell_name):
@@ -172,7 +177,7 @@ class DuelGUI(tk.Tk):
 
     # -------------------- ENEMY ATTACK --------------------
     def enemy_attack(self):
-        spell = random.choice(enemy.spells)
+        spell = self.rng.choice(enemy.spells)
         self.status_var.set(f"{enemy.name} casts {spell}!")
         self.animate_spell(spell, player_to_enemy=False)
         self.turn = "player"
@@ -188,5 +193,6 @@ class DuelGUI(tk.Tk):
 
 # -------------------- RUN --------------------
 if __name__=="__main__":
-    app = DuelGUI()
+    import sys
+    app = DuelGUI(int(sys.argv[1]) if len(sys.argv) > 1 else None)
     app.mainloop()
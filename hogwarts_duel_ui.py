@@ -1,77 +1,88 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox
-from PIL import Image, ImageTk
-import os, random, math
-import copy
+import math
+import time
+import random
+import threading
+import traceback
+from scene import Scene
+from text_reveal import TextReveal
+from hud import CanvasHUD
+from fx_pool import ItemPool, Particles
+import profiler
+import replay as replays
+import enemy_ai
+import duel_net
+from duel_engine import Character, DuelEngine, PLAYER_SPELLS, PLAYER_LIMITED_USES, PLAYER_BASE_HP
+from catalog import get_catalog
 
 HP_BAR_WIDTH = 200
 HP_BAR_HEIGHT = 20
+BOARD_SIZE = (800, 400)
+PLAYER_SPRITE_POS = (100, 120)
+ENEMY_SPRITE_POS = (350, 150)
+PLAYER_BAR_X = 50
+ENEMY_BAR_X = 550
+BAR_Y = 350
+
+# sprite name and on-screen size for each enemy in ENEMY_NAMES order (data/enemies.csv)
+ENEMY_SPRITES = [(enemy.sprite, (enemy.width, enemy.height)) for enemy in get_catalog().enemies()]
+# everything __init__ and set_enemy load, in the order they need it (see Scene.preload)
+DUEL_ASSETS = [("duel_bg.jpeg", BOARD_SIZE), ("player_wizard.png", (400, 300))] + ENEMY_SPRITES
+REPLAY_TURN_MS = 700  # pause before each recorded spell when watching a replay
+ENEMY_TURN_MS = 800   # pause before the enemy answers
+ADVANCE_MS = 900      # pause on a defeated enemy before the next one steps up
+SPARKS_PER_HIT = 24
+
+
+def hp_color(ratio):
+    if ratio > 0.6: return "#4caf50"
+    if ratio > 0.25: return "#f0ad4e"
+    return "#e53935"
+
+
+def status_text(effects, side):
+    labels = []
+    for effect in sorted(effects.on(side), key=lambda e: e.kind):
+        label = effect.kind.capitalize()
+        if effect.stacks > 1:
+            label += f" x{effect.stacks}"
+        if effect.expires is not None:
+            label += f" ({effect.expires - effects.now})"
+        labels.append(label)
+    return "  ".join(labels)
+
+
+class DuelBoard:
+    """Everything drawn on the duel canvas: background, sprites, HP bars,
+    status lines and spell effects, driven by DuelEngine events.
+
+    Works on a tk.Canvas or an offscreen.OffscreenCanvas; load_image(name, size)
+    returns what that canvas draws (a PhotoImage or a PIL image).
+    """
+
+    def __init__(self, canvas, frames, engine, load_image, rng=None):
+        self.canvas = canvas
+        self.frames = frames
+        self.engine = engine
+        self.load_image = load_image
+
+        # Load background and player sprite
+        self.bg = load_image("duel_bg.jpeg", BOARD_SIZE)
+        self.player_sprite = load_image("player_wizard.png", (400, 300))
+        # enemy sprites (sizes kept as in your last code) are loaded per enemy
+        self.enemy_sprite = load_image(*ENEMY_SPRITES[engine.enemy_index])
 
-class Character:
-    def __init__(self, name, hp, spells, limited_uses=None):
-        self.name = name
-        self.max_hp = hp
-        self.hp = hp
-        self.spells = spells
-        self.status_effects = {}
-        self.limited_uses = limited_uses if limited_uses else {}
-        self.xp = 0
-        self.level = 1
-        self.next_level_xp = 50
-
-    def cast_spell(self, spell):
-        dmg_range, stype = self.spells[spell]
-        return random.randint(*dmg_range), stype
-
-    def gain_xp(self, amount):
-        self.xp += amount
-        leveled_up = False
-        while self.xp >= self.next_level_xp:
-            self.xp -= self.next_level_xp
-            self.level += 1
-            self.next_level_xp = int(self.next_level_xp * 1.5)
-            leveled_up = True
-        return leveled_up
-
-class DuelGUI(tk.Tk):
-    def __init__(self, player, initial_limited_uses):
-        super().__init__()
-        self.title("Hogwarts Duel")
-        self.geometry("800x600")
-        self.resizable(False, False)
-
-        self.player = player
-        self.initial_limited_uses = copy.deepcopy(initial_limited_uses)  # saved reset state
-        self.player_defense = False
-        self.BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-        # Load background
-        self.bg_img = Image.open(os.path.join(self.BASE_DIR, "assets", "duel_bg.jpeg")).resize((800, 400))
-        self.bg = ImageTk.PhotoImage(self.bg_img)
-
-        # Load player sprite
-        self.player_img = Image.open(os.path.join(self.BASE_DIR, "assets", "player_wizard.png")).resize((400, 300))
-        self.player_sprite = ImageTk.PhotoImage(self.player_img)
-
-        # Load enemy sprites (sizes kept as in your last code)
-        self.enemy_imgs = [
-            Image.open(os.path.join(self.BASE_DIR, "assets", "enemy_wizard.png")).resize((400, 300)),
-            Image.open(os.path.join(self.BASE_DIR, "assets", "enemy_wizard2.png")).resize((150, 190)),
-            Image.open(os.path.join(self.BASE_DIR, "assets", "enemy_wizard3.png")).resize((150, 300))
-        ]
-        self.enemy_names = ["Dark Wizard", "Dark Sorcerer", "Necromancer"]
-        self.enemy_index = 0
-        self.enemy_base_hp = [60, 80, 100]  # base HP for each enemy
-        self.set_enemy(self.enemy_index)  # creates self.enemy and self.enemy_sprite
-
-        # Canvas (battlefield)
-        self.canvas = tk.Canvas(self, width=800, height=400)
-        self.canvas.pack()
         self.canvas.create_image(0, 0, image=self.bg, anchor="nw")
 
         # place sprites (player and enemy)
-        self.player_sprite_id = self.canvas.create_image(100, 120, image=self.player_sprite, anchor="nw")
-        self.enemy_sprite_id = self.canvas.create_image(350, 150, image=self.enemy_sprite, anchor="nw")
+        self.player_sprite_id = self.canvas.create_image(*PLAYER_SPRITE_POS, image=self.player_sprite, anchor="nw")
+        self.enemy_sprite_id = self.canvas.create_image(*ENEMY_SPRITE_POS, image=self.enemy_sprite, anchor="nw")
+
+        # spell effects reuse hidden items instead of creating / deleting per cast
+        self.beams = ItemPool(self.canvas, "line", prewarm=2, width=5)
+        self.sparks = Particles(self.frames, ItemPool(self.canvas, "oval", prewarm=2 * SPARKS_PER_HIT, outline=""),
+                                rng)
 
         # Level/XP display text
         self.level_text = self.canvas.create_text(80, 20,
@@ -81,397 +92,550 @@ class DuelGUI(tk.Tk):
 
         # HP bars and name texts (store references so we can update them)
         self.create_hp_display()
+        # all HUD updates go through here: only changed values reach Tk, once per frame
+        self.hud = CanvasHUD(self.canvas)
+        self.update_hp_display()
+        self.update_level_xp()
+        self.hud.flush()
+        self.hud.take_stats()
 
-        # Control panel (spells + messages)
-        self.control_frame = tk.Frame(self, height=200, bg="#111111")
-        self.control_frame.pack(fill="x", side="bottom")
-
-        self.spell_frame = tk.Frame(self.control_frame, bg="#111111")
-        self.spell_frame.pack(side="left", padx=10, pady=10, fill="y")
-
-        self.spell_buttons = {}
-        self.create_spell_buttons()
-
-        self.message_box = tk.Text(self.control_frame, height=10, width=50, wrap="word",
-                                   bg="#000000", fg="#ffffff",
-                                   font=("Consolas", 12, "bold"),
-                                   padx=8, pady=8, relief="ridge")
-        self.message_box.pack(side="right", fill="both", expand=True, padx=10, pady=10)
-        self.message_box.configure(state="disabled")
-
-        self._message_queue = []
-        self._message_running = False
+    @property
+    def player(self):
+        return self.engine.player
 
-        # initial message
-        self.show_message(f"A wild {self.enemy.name} appeared! {self.player.name}, what will you do?")
+    @property
+    def enemy(self):
+        return self.engine.enemy
 
-    # --- Enemy setup ---
     def set_enemy(self, index):
-        # enemy max HP increases by 20 each time
-        hp = self.enemy_base_hp[index] + index * 20
-        self.enemy = Character(self.enemy_names[index], hp, {
-            "Crucio":((7,14),"Curse"),
-            "Avada Kedavra":((15,25),"Curse"),
-            "Imperio":((5,10),"Curse")
-        })
-        # enemy sprite image object (ImageTk.PhotoImage)
-        self.enemy_sprite = ImageTk.PhotoImage(self.enemy_imgs[index])
-        # if canvas sprite exists, update its image; otherwise it will be used when created
-        if hasattr(self, 'enemy_sprite_id'):
-            self.canvas.itemconfigure(self.enemy_sprite_id, image=self.enemy_sprite)
-        # update enemy name text on HUD if created
-        if hasattr(self, 'enemy_name_text'):
-            self.canvas.itemconfigure(self.enemy_name_text, text=self.enemy.name)
-        # ensure enemy HP text is updated
-        if hasattr(self, 'enemy_hp_text'):
-            self.canvas.itemconfigure(self.enemy_hp_text, text=f"{self.enemy.hp}/{self.enemy.max_hp}")
-
-    # --- Spell buttons (create) ---
-    def create_spell_buttons(self):
-        type_colors = {"Charm":"blue","Curse":"red","Defense":"green","Heal":"lime","Stun":"purple","Poison":"orange"}
-        for spell, (dmg_range, stype) in self.player.spells.items():
-            frame = tk.Frame(self.spell_frame, bg="#111111")
-            frame.pack(anchor="w", pady=5)
-
-            btn_text = spell
-            if spell in self.player.limited_uses:
-                btn_text = f"{spell} ({self.player.limited_uses[spell]})"
-
-            btn = tk.Button(frame, text=btn_text, width=15, font=("Arial",13,"bold"),
-                            bg="#dddddd", fg="black",
-                            activebackground="#bbbbbb", activeforeground="black",
-                            command=lambda s=spell: self.player_attack(s))
-            btn.pack(side="left")
-
-            lbl = tk.Label(frame, text=f"[{stype}]", font=("Arial",12,"bold"),
-                           bg="#111111", fg=type_colors.get(stype,"white"))
-            lbl.pack(side="left", padx=6)
-
-            self.spell_buttons[spell] = btn
-
-    def update_spell_buttons(self):
-        for spell, btn in self.spell_buttons.items():
-            if spell in self.player.limited_uses:
-                remaining = self.player.limited_uses[spell]
-                btn.configure(text=f"{spell} ({remaining})")
-                if remaining <= 0:
-                    btn.configure(state="disabled")
-            else:
-                btn.configure(state="normal")
+        self.enemy_sprite = self.load_image(*ENEMY_SPRITES[index])
+        self.hud.set(self.enemy_sprite_id, image=self.enemy_sprite)
+        self.hud.set(self.enemy_name_text, text=self.enemy.name)
+        self.hud.set(self.enemy_hp_text, text=f"{self.enemy.hp}/{self.enemy.max_hp}")
 
     def update_level_xp(self):
-        self.canvas.itemconfigure(self.level_text, text=f"Lv {self.player.level} XP {self.player.xp}/{self.player.next_level_xp}")
+        self.hud.set(self.level_text, text=f"Lv {self.player.level} XP {self.player.xp}/{self.player.next_level_xp}")
 
     # --- HP display (creates and stores references) ---
     def create_hp_display(self):
         # player name and HP bar
-        self.player_name_text = self.canvas.create_text(50+HP_BAR_WIDTH//2, 330,
+        self.player_name_text = self.canvas.create_text(PLAYER_BAR_X+HP_BAR_WIDTH//2, BAR_Y-20,
                                                         text=self.player.name,
                                                         font=("Consolas", 12, "bold"),
                                                         fill="white")
-        self.canvas.create_rectangle(50,350,50+HP_BAR_WIDTH,350+HP_BAR_HEIGHT,fill="#555555")
-        self.player_hp_fg = self.canvas.create_rectangle(50,350,50+HP_BAR_WIDTH,350+HP_BAR_HEIGHT,fill="#4caf50")
-        self.player_hp_text = self.canvas.create_text(50+HP_BAR_WIDTH//2, 360,
+        self.canvas.create_rectangle(PLAYER_BAR_X,BAR_Y,PLAYER_BAR_X+HP_BAR_WIDTH,BAR_Y+HP_BAR_HEIGHT,fill="#555555")
+        self.player_hp_fg = self.canvas.create_rectangle(PLAYER_BAR_X,BAR_Y,PLAYER_BAR_X+HP_BAR_WIDTH,BAR_Y+HP_BAR_HEIGHT,fill="#4caf50")
+        self.player_hp_text = self.canvas.create_text(PLAYER_BAR_X+HP_BAR_WIDTH//2, BAR_Y+10,
                                                       text=f"{self.player.hp}/{self.player.max_hp}",
                                                       font=("Consolas",10,"bold"), fill="white")
 
         # enemy name and HP bar (store references)
-        self.enemy_name_text = self.canvas.create_text(550+HP_BAR_WIDTH//2, 330,
+        self.enemy_name_text = self.canvas.create_text(ENEMY_BAR_X+HP_BAR_WIDTH//2, BAR_Y-20,
                                                        text=self.enemy.name,
                                                        font=("Consolas", 12, "bold"),
                                                        fill="white")
-        self.canvas.create_rectangle(550,350,550+HP_BAR_WIDTH,350+HP_BAR_HEIGHT,fill="#555555")
-        self.enemy_hp_fg = self.canvas.create_rectangle(550,350,550+HP_BAR_WIDTH,350+HP_BAR_HEIGHT,fill="#4caf50")
-        self.enemy_hp_text = self.canvas.create_text(550+HP_BAR_WIDTH//2, 360,
+        self.canvas.create_rectangle(ENEMY_BAR_X,BAR_Y,ENEMY_BAR_X+HP_BAR_WIDTH,BAR_Y+HP_BAR_HEIGHT,fill="#555555")
+        self.enemy_hp_fg = self.canvas.create_rectangle(ENEMY_BAR_X,BAR_Y,ENEMY_BAR_X+HP_BAR_WIDTH,BAR_Y+HP_BAR_HEIGHT,fill="#4caf50")
+        self.enemy_hp_text = self.canvas.create_text(ENEMY_BAR_X+HP_BAR_WIDTH//2, BAR_Y+10,
                                                      text=f"{self.enemy.hp}/{self.enemy.max_hp}",
                                                      font=("Consolas",10,"bold"), fill="white")
 
+        # active status effects under each bar
+        self.player_status_text = self.canvas.create_text(PLAYER_BAR_X+HP_BAR_WIDTH//2, BAR_Y+35, text="",
+                                                          font=("Consolas", 10), fill="#c0c0ff")
+        self.enemy_status_text = self.canvas.create_text(ENEMY_BAR_X+HP_BAR_WIDTH//2, BAR_Y+35, text="",
+                                                         font=("Consolas", 10), fill="#c0c0ff")
+
     def update_hp_display(self):
         pr = max(0, min(1, self.player.hp / self.player.max_hp))
         pw = HP_BAR_WIDTH * pr
-        self.canvas.coords(self.player_hp_fg, 50, 350, 50 + pw, 350 + HP_BAR_HEIGHT)
-        self.canvas.itemconfigure(self.player_hp_text, text=f"{self.player.hp}/{self.player.max_hp}")
-        self.canvas.itemconfigure(self.player_hp_fg, fill=self.hp_color(pr))
+        self.hud.coords(self.player_hp_fg, PLAYER_BAR_X, BAR_Y, PLAYER_BAR_X + pw, BAR_Y + HP_BAR_HEIGHT)
+        self.hud.set(self.player_hp_text, text=f"{self.player.hp}/{self.player.max_hp}")
+        self.hud.set(self.player_hp_fg, fill=hp_color(pr))
 
         er = max(0, min(1, self.enemy.hp / self.enemy.max_hp))
         ew = HP_BAR_WIDTH * er
-        self.canvas.coords(self.enemy_hp_fg, 550, 350, 550 + ew, 350 + HP_BAR_HEIGHT)
-        self.canvas.itemconfigure(self.enemy_hp_text, text=f"{self.enemy.hp}/{self.enemy.max_hp}")
-        self.canvas.itemconfigure(self.enemy_hp_fg, fill=self.hp_color(er))
+        self.hud.coords(self.enemy_hp_fg, ENEMY_BAR_X, BAR_Y, ENEMY_BAR_X + ew, BAR_Y + HP_BAR_HEIGHT)
+        self.hud.set(self.enemy_hp_text, text=f"{self.enemy.hp}/{self.enemy.max_hp}")
+        self.hud.set(self.enemy_hp_fg, fill=hp_color(er))
 
         # update names (in case changed)
-        self.canvas.itemconfigure(self.player_name_text, text=self.player.name)
-        self.canvas.itemconfigure(self.enemy_name_text, text=self.enemy.name)
-
-    def hp_color(self, ratio):
-        if ratio > 0.6: return "#4caf50"
-        if ratio > 0.25: return "#f0ad4e"
-        return "#e53935"
+        self.hud.set(self.player_name_text, text=self.player.name)
+        self.hud.set(self.enemy_name_text, text=self.enemy.name)
+        self.update_status_display()
+
+    def update_status_display(self):
+        effects = self.engine.effects
+        for side, item in (("player", self.player_status_text), ("enemy", self.enemy_status_text)):
+            self.hud.set(item, text=status_text(effects, side))
+
+    # --- Event rendering (DuelEngine -> canvas) ---
+    def render_event(self, event, done):
+        """Show one engine event; done() once its animation / pause is over."""
+        kind = event[0]
+        if kind == "cast":
+            side, stype = event[1], event[3]
+            if side == "player":
+                caster, target, distance = self.player_sprite_id, self.enemy_sprite_id, 30
+            else:
+                caster, target, distance = self.enemy_sprite_id, self.player_sprite_id, -30
+            self.attack_animation(caster, distance, 150,
+                                  callback=lambda: self.cast_spell_visual(caster, target, stype, callback=done))
+            return
+        elif kind == "hit":
+            self.flash_sprite(self.player_sprite_id if event[1] == "player" else self.enemy_sprite_id)
+            self.update_hp_display()
+        elif kind == "heal":
+            self.update_hp_display()
+            self.flash_sprite(self.player_sprite_id, times=6, interval=80)
+        elif kind in ("shield", "blocked"):
+            self.flash_sprite(self.player_sprite_id, times=6, interval=80)
+            self.update_status_display()
+        elif kind == "status":
+            self.flash_sprite(self.player_sprite_id if event[1] == "player" else self.enemy_sprite_id,
+                              times=6, interval=80)
+            self.update_status_display()
+        elif kind == "status_end":
+            self.update_status_display()
+        elif kind == "stunned":
+            self.frames.wait(1000, done)
+            return
+        elif kind == "poison":
+            self.update_hp_display()
+            self.frames.wait(800, done)
+            return
+        elif kind == "xp":
+            self.update_level_xp()
+        elif kind == "restore":
+            self.update_hp_display()
+        elif kind == "next_enemy":
+            self.set_enemy(event[1])
+            self.update_hp_display()
+        done()
 
-    # --- Sprite effects ---
+    # --- Sprite effects (tasks on self.frames) ---
     def shake_sprite(self,sprite_id,amplitude=8,cycles=8,interval=30):
         orig = self.canvas.coords(sprite_id)
         if not orig: return
         ox, oy = orig[0], orig[1]
-        def _step(i=0):
-            if i >= cycles:
-                cur = self.canvas.coords(sprite_id)
-                if cur:
-                    cx, cy = cur[0], cur[1]
-                    self.canvas.move(sprite_id, ox - cx, oy - cy)
-                return
-            offset = amplitude * math.cos(2 * math.pi * i / cycles)
-            cur = self.canvas.coords(sprite_id)
-            if cur:
-                cx, cy = cur[0], cur[1]
-                self.canvas.move(sprite_id, (ox + offset) - cx, 0)
-            self.after(interval, lambda: _step(i+1))
-        _step(0)
+        def _update(t):
+            offset = 0 if t >= 1 else amplitude * math.cos(2 * math.pi * t)
+            self.canvas.coords(sprite_id, ox + offset, oy)
+        return self.frames.tween(cycles * interval, _update)
 
     def flash_sprite(self,sprite_id,times=4,interval=100):
-        def _flash(i=0):
-            if i >= times * 2:
+        total = times * 2 * interval
+        shown = ['normal']
+        def _update(t):
+            i = int(t * total // interval)
+            state = 'hidden' if i % 2 == 0 and t < 1 else 'normal'
+            if state != shown[0]:
+                shown[0] = state
                 try:
-                    self.canvas.itemconfigure(sprite_id, state='normal')
+                    self.canvas.itemconfigure(sprite_id, state=state)
                 except:
                     pass
-                return
-            state = 'hidden' if i % 2 == 0 else 'normal'
-            try:
-                self.canvas.itemconfigure(sprite_id, state=state)
-            except:
-                pass
-            self.after(interval, lambda: _flash(i+1))
-        _flash()
+        return self.frames.tween(total, _update)
 
     def attack_animation(self,sprite_id,distance=30,duration=150,callback=None):
-        steps = 10
-        delay = max(1, duration // (2 * steps))
-        def forward(i=0):
-            if i >= steps:
-                backward()
-                return
+        offset = [0.0]
+        def _update(t):
+            # out and back: 0 -> distance -> 0
+            target = distance * (1 - abs(2 * t - 1))
             try:
-                self.canvas.move(sprite_id, distance/steps, 0)
+                self.canvas.move(sprite_id, target - offset[0], 0)
             except:
                 pass
-            self.after(delay, lambda: forward(i+1))
-        def backward(i=0):
-            if i >= steps:
-                if callback: callback()
-                return
-            try:
-                self.canvas.move(sprite_id, -distance/steps, 0)
-            except:
-                pass
-            self.after(delay, lambda: backward(i+1))
-        forward()
+            offset[0] = target
+        return self.frames.tween(duration, _update, callback)
 
     def cast_spell_visual(self,caster_id,target_id,spell_type,callback=None):
         cx, cy = self.canvas.coords(caster_id)
         tx, ty = self.canvas.coords(target_id)
-        color = {"Charm":"blue","Curse":"red","Defense":"green","Heal":"lime","Stun":"purple","Poison":"orange"}.get(spell_type,"white")
-        beam = self.canvas.create_line(cx+200, cy+150, cx+200, cy+150, fill=color, width=5)
-        steps = 20
-        dx = (tx - cx) / steps
-        dy = (ty - cy) / steps
-        def animate(i=0):
-            if i >= steps:
-                try:
-                    self.canvas.delete(beam)
-                except:
-                    pass
-                if callback: callback()
-                return
+        color = get_catalog().type_color(spell_type)
+        sx, sy = cx+200, cy+150
+        beam = self.beams.acquire(sx, sy, sx, sy, fill=color)
+        def _update(t):
+            x, y = sx + (tx - cx) * t, sy + (ty - cy) * t
+            try:
+                self.canvas.coords(beam, x, y, x, y)
+            except:
+                pass
+        def _done():
             try:
-                self.canvas.move(beam, dx, dy)
+                self.beams.release(beam)
+                self.sparks.burst(sx + tx - cx, sy + ty - cy, SPARKS_PER_HIT, color)
             except:
                 pass
-            self.after(25, lambda: animate(i+1))
-        animate()
+            if callback: callback()
+        return self.frames.tween(500, _update, _done)
 
-    # --- Player attack ---
-    def player_attack(self, spell):
-        # check limited uses
-        if spell in self.player.limited_uses:
-            if self.player.limited_uses[spell] <= 0:
-                self.show_message(f"No more uses left for {spell}!")
-                return
-            self.player.limited_uses[spell] -= 1
-            self.update_spell_buttons()
 
-        dmg, stype = self.player.cast_spell(spell)
-        stype = self.player.spells[spell][1]
+class DuelGUI(Scene):
+    title = "Hogwarts Duel"
 
-        if stype == "Defense":
-            self.player_defense = True
-            self.show_message(f"{self.player.name} casts {spell}! Block the next attack! (+3 XP)")
-            self.flash_sprite(self.player_sprite_id, times=6, interval=80)
-            if self.player.gain_xp(3):
-                self.show_message(f"{self.player.name} leveled up to Lv {self.player.level}!")
-            self.update_level_xp()
-            self.after(800, self.enemy_turn)
-            return
+    def __init__(self, player, initial_limited_uses, master=None, photos=None, on_finish=None,
+                 seed=None, replay=None, ai=None, net=None):
+        super().__init__(master, photos, on_finish)
 
-        if stype == "Heal":
-            healed = min(dmg, self.player.max_hp - self.player.hp)
-            self.player.hp = min(self.player.max_hp, self.player.hp + dmg)
-            self.update_hp_display()
-            self.show_message(f"{self.player.name} casts {spell}! Heals {healed} HP! (+{healed//2} XP)")
-            if self.player.gain_xp(healed//2):
-                self.show_message(f"{self.player.name} leveled up to Lv {self.player.level}!")
-            self.update_level_xp()
-            self.flash_sprite(self.player_sprite_id, times=6, interval=80)
-            self.after(800, self.enemy_turn)
-            return
+        # net: a duel_net.Client in a match. The server decides; this window
+        # replays its inputs in lockstep and sends our spells when it is our turn.
+        self.net = net
+        if net is not None:
+            seed, replay = net.replay.seed, net.replay
+            initial_limited_uses = net.replay.initial_limited_uses
+            if net.role == duel_net.ENEMY:
+                player = net.replay.make_player()  # the other client's wizard; we cast for the enemies
+        self.player = player
+        # every duel runs on its own seeded stream so it can be replayed exactly
+        self.seed = replays.new_seed() if seed is None else seed
+        self.engine = DuelEngine(player, initial_limited_uses, rng=random.Random(self.seed))
+        self.recording = replays.Replay(self.seed, player, initial_limited_uses)
+        self.replay = replay  # watching a recorded duel: inputs come from here
+        self.replay_pos = 0
+        self.ai = ai  # enemy_ai.EnemyAI, or None for random enemy spells
+        self.enemy_plan = None  # Future with the AI's next spell
+
+        # Canvas (battlefield): sprites, HP bars and spell effects
+        self.canvas = tk.Canvas(self, width=BOARD_SIZE[0], height=BOARD_SIZE[1])
+        self.canvas.pack()
+        self.board = DuelBoard(self.canvas, self.frames, self.engine, self.load_photo)
+        self.hud = self.board.hud
+        self.hud_turn = (0, 0, 0)  # (requested, tk_calls, saved) of the last player+enemy turn
+        self.hud_saved = 0  # Tk calls saved over the whole duel
+        self.profile_overlay = profiler.overlay(self.canvas, self.frames)
+        if self.profile_overlay is not None:
+            self.profile_overlay.lines.append(self.hud_stats_line)
 
-        # normal damage spells
-        self.attack_animation(self.player_sprite_id, 30, 150,
-                              callback=lambda:
-                                  self.cast_spell_visual(self.player_sprite_id, self.enemy_sprite_id, stype,
-                                                         callback=lambda: self._finish_player_attack(spell, dmg)))
+        # Control panel (spells + messages)
+        self.control_frame = tk.Frame(self, height=200, bg="#111111")
+        self.control_frame.pack(fill="x", side="bottom")
 
-    def _finish_player_attack(self, spell, dmg):
-        self.enemy.hp = max(0, self.enemy.hp - dmg)
-        self.flash_sprite(self.enemy_sprite_id)
-        self.update_hp_display()
-        self.show_message(f"{self.player.name} casts {spell}! It dealt {dmg} damage! (+{dmg//2} XP)")
-        if self.player.gain_xp(dmg//2):
-            self.show_message(f"{self.player.name} leveled up to Lv {self.player.level}!")
-        self.update_level_xp()
+        self.spell_frame = tk.Frame(self.control_frame, bg="#111111")
+        self.spell_frame.pack(side="left", padx=10, pady=10, fill="y")
 
-        if self.enemy.hp <= 0:
-            # give XP for victory
-            self.player.gain_xp(50)
-            self.update_level_xp()
-            self.show_message(f"{self.enemy.name} fainted! (+50 XP)")
+        self.spell_buttons = {}
+        self.create_spell_buttons()
 
-            # --- Reset player and advance enemy ---
-            # increase max HP by 20 and restore current HP to full
-            self.player.max_hp += 20
-            self.player.hp = self.player.max_hp
+        self.message_box = tk.Text(self.control_frame, height=10, width=50, wrap="word",
+                                   bg="#000000", fg="#ffffff",
+                                   font=("Consolas", 12, "bold"),
+                                   padx=8, pady=8, relief="ridge")
+        self.message_box.pack(side="right", fill="both", expand=True, padx=10, pady=10)
+        self.message_box.configure(state="disabled")
 
-            # reset limited uses to initial values
-            self.player.limited_uses = copy.deepcopy(self.initial_limited_uses)
-            self.update_spell_buttons()
-            self.update_hp_display()
+        # typewriter log; clicking the log skips ahead
+        self.log = TextReveal(self.frames, self._log_update, on_start=self._log_clear,
+                              char_ms=25, message_pause=600)
+        self.message_box.bind("<Button-1>", lambda e: self.log.fast_forward())
 
-            # advance enemy index and either set next enemy or end game
-            self.enemy_index += 1
-            if self.enemy_index < len(self.enemy_imgs):
-                # small delay so player sees victory message first
-                self.after(900, lambda: self.set_enemy(self.enemy_index))
-                # update sprite image on canvas (set_enemy handles sprite update)
-                # update HP display after sprite set
-                self.after(1000, self.update_hp_display)
-                self.after(1100, lambda: self.show_message(
-                    f"A wild {self.enemy.name} appeared! Your HP was restored and max HP increased by 20. Spell uses reset. "
-                    f"Enemy HP increased by 20!"))
-            else:
-                # defeated all enemies: final victory
-                messagebox.showinfo("Victory", "You defeated all enemies!")
-                self.destroy()
-            return
+        # initial message
+        self.show_message(f"A wild {self.enemy.name} appeared! {self.player.name}, what will you do?")
+        if net is not None:
+            self.net_errors = 0
+            self.frames.add(self._poll_net, name="net")
+        if self.replay is not None:
+            for btn in self.spell_buttons.values():
+                btn.configure(state="disabled")
+            self.replay_next()
+
+    @property
+    def enemy(self):
+        return self.engine.enemy
+
+    @property
+    def caster(self):
+        """Whose spells the buttons cast: the enemy's when we play that side of a PvP match."""
+        if self.net is not None and self.net.role == duel_net.ENEMY:
+            return self.engine.enemy
+        return self.player
+
+    # --- Spell buttons (create) ---
+    def create_spell_buttons(self):
+        catalog = get_catalog()
+        for child in self.spell_frame.winfo_children():
+            child.destroy()
+        self.spell_buttons = {}
+        caster = self.caster
+        for spell, (dmg_range, stype) in caster.spells.items():
+            frame = tk.Frame(self.spell_frame, bg="#111111")
+            frame.pack(anchor="w", pady=5)
+
+            btn_text = spell
+            if spell in caster.limited_uses:
+                btn_text = f"{spell} ({caster.limited_uses[spell]})"
+
+            btn = tk.Button(frame, text=btn_text, width=15, font=("Arial",13,"bold"),
+                            bg="#dddddd", fg="black",
+                            activebackground="#bbbbbb", activeforeground="black",
+                            command=lambda s=spell: self.player_attack(s))
+            btn.pack(side="left")
+
+            lbl = tk.Label(frame, text=f"[{stype}]", font=("Arial",12,"bold"),
+                           bg="#111111", fg=catalog.type_color(stype))
+            lbl.pack(side="left", padx=6)
+
+            self.spell_buttons[spell] = btn
+
+    def update_spell_buttons(self):
+        uses = self.caster.limited_uses
+        for spell, btn in self.spell_buttons.items():
+            if spell in uses:
+                remaining = uses[spell]
+                btn.configure(text=f"{spell} ({remaining})")
+                if remaining <= 0:
+                    btn.configure(state="disabled")
+            elif self.replay is None:
+                btn.configure(state="normal")
+
+    def destroy(self):
+        self.hud.close()
+        if self.net is not None:
+            self.net.close()
+        super().destroy()
 
-        # otherwise enemy turn
-        self.after(800, self.enemy_turn)
+    # --- Player attack ---
+    def player_attack(self, spell):
+        if self.net is not None:
+            if self.net_turn():
+                self.net.cast(spell)  # played when the server sends it back
+                for btn in self.spell_buttons.values():
+                    btn.configure(state="disabled")
+            return
+        if self.replay is not None:
+            return
+        self.take_turn(spell)
+
+    def take_turn(self, spell):
+        turn = self.engine.turn
+        events = self.engine.player_turn(spell)
+        if self.engine.turn != turn:
+            self.recording.record(spell)
+        self.play_events(events, callback=self._after_player_turn)
+
+    def replay_input(self, enemy):
+        """Next recorded spell if it belongs to this side, else None."""
+        pos = self.replay_pos
+        if pos >= len(self.replay.inputs) or self.replay.is_enemy(pos) != enemy:
+            return None
+        self.replay_pos += 1
+        return self.replay.spell(pos)
+
+    def replay_next(self):
+        if self.net is not None:
+            self.wait_input(False, self.take_turn)
+            return
+        spell = self.replay_input(enemy=False)
+        if spell is not None:
+            self.schedule(REPLAY_TURN_MS, lambda: self.take_turn(spell))
+
+    def _after_player_turn(self):
+        if self.engine.phase == "enemy" and self.net is not None and self.net.mode == duel_net.PVP:
+            self.wait_input(True, self.play_enemy_turn)  # the other client's spell (or ours)
+        elif self.engine.phase == "enemy":
+            if self.ai is not None and self.replay is None:
+                # start thinking now; the search overlaps the pause below
+                self.enemy_plan = self.ai.submit(self.engine)
+            self.schedule(ENEMY_TURN_MS, self.enemy_turn)
+        elif self.engine.phase == "advance":
+            # small delay so player sees victory message first
+            self.schedule(ADVANCE_MS, self.advance_enemy)
+        elif self.engine.phase == "player":
+            self.record_hud_stats()
+            if self.replay is not None:
+                self.replay_next()
+
+    def record_hud_stats(self):
+        self.hud.flush()
+        self.hud_turn = self.hud.take_stats()
+        self.hud_saved += self.hud_turn[2]
+
+    def hud_stats_line(self):
+        requested, sent, saved = self.hud_turn
+        return f"hud last turn: {requested} updates, {sent} Tk calls, {saved} saved ({self.hud_saved} this duel)"
 
     # --- Enemy turn ---
     def enemy_turn(self):
-        if "stun" in self.enemy.status_effects and self.enemy.status_effects["stun"] > 0:
-            self.show_message(f"{self.enemy.name} is stunned and cannot attack!")
-            self.enemy.status_effects["stun"] = 0
-            self.after(1000, self.check_poison)
+        if self.replay is not None:
+            self.play_enemy_turn(self.replay_input(enemy=True))
+        elif self.enemy_plan is not None:
+            plan, self.enemy_plan = self.enemy_plan, None
+            # the search runs on a worker thread; the frame loop polls for its answer
+            self.frames.add(lambda dt: not plan.done(), lambda: self.play_planned_turn(plan))
+        else:
+            self.play_enemy_turn(None)
+
+    def play_planned_turn(self, plan):
+        try:
+            spell = plan.result()
+        except Exception:  # a failed search must not stall the duel: classic random spell instead
+            traceback.print_exc()
+            spell = None
+        self.play_enemy_turn(spell)
+
+    def play_enemy_turn(self, spell):
+        events = self.engine.enemy_turn(spell)
+        if spell is not None:
+            self.recording.record_enemy(spell)
+        self.play_events(events, callback=self._after_player_turn)
+
+    # --- Network (thin client, see duel_net) ---
+    def net_turn(self):
+        """True if the match waits for a spell from us and we have not sent one."""
+        return (duel_net.turn_of(self.engine, self.net.mode) == self.net.role
+                and self.replay_pos >= len(self.replay.inputs) and not self.engine.over)
+
+    def net_buttons(self):
+        mine = self.net_turn()
+        uses = self.caster.limited_uses
+        for spell, btn in self.spell_buttons.items():
+            btn.configure(state="normal" if mine and uses.get(spell, 1) > 0 else "disabled")
+
+    def wait_input(self, enemy, then):
+        """then(spell) once the server has sent the next input; our buttons work meanwhile if it is our turn."""
+        self.net_buttons()
+        self.frames.add(lambda dt: self.replay_pos >= len(self.replay.inputs),
+                        lambda: then(self.replay_input(enemy)))
+
+    def _poll_net(self, dt):
+        net = self.net
+        alive = net.poll()
+        for code, text in net.errors[self.net_errors:]:
+            self.show_message(f"Server: {text}")
+            if code == duel_net.E_LEFT:
+                messagebox.showinfo("Duel over", "Your opponent left the duel.")
+                self.finish("stopped")
+                return False
+            self.net_buttons()  # our spell was refused: pick another
+        self.net_errors = len(net.errors)
+        if not alive and not self.engine.over:
+            messagebox.showinfo("Duel over", "Lost the connection to the duel server.")
+            self.finish("stopped")
+        return alive
+
+    def advance_enemy(self):
+        self.play_events(self.engine.advance(), callback=self._after_player_turn)
+
+    # --- Event rendering (DuelEngine -> canvas) ---
+    def play_events(self, events, callback=None):
+        def _next(i=0):
+            if i >= len(events):
+                if callback: callback()
+                return
+            self.render_event(events[i], lambda: _next(i+1))
+        _next()
+
+    def render_event(self, event, done):
+        kind = event[0]
+        if kind == "message":
+            self.show_message(event[1])
+        elif kind in ("uses", "restore"):
+            self.update_spell_buttons()
+        elif kind == "next_enemy" and self.caster is self.engine.enemy:
+            self.create_spell_buttons()  # playing the enemies: the new one's spells
+        elif kind in ("victory", "defeat"):
+            self.recording.finish(self.engine)
+            if self.replay is None:
+                replays.autosave(self.recording)
+            self.end_duel(kind)
             return
-        self.enemy_attack()
-
-    def check_poison(self):
-        if "poison" in self.enemy.status_effects and self.enemy.status_effects["poison"] > 0:
-            dmg = 3
-            self.enemy.hp = max(0, self.enemy.hp - dmg)
-            self.enemy.status_effects["poison"] -= 1
-            self.show_message(f"{self.enemy.name} takes {dmg} poison damage!")
-            self.update_hp_display()
-            if self.enemy.hp <= 0:
-                # handle death from poison same as normal finish
-                self._finish_player_attack("<poison>", 0)
+        self.board.render_event(event, done)
+
+    def end_duel(self, kind):
+        if self.net is not None:
+            self.net.poll()
+            if self.net.result is not None and tuple(self.net.result) != tuple(self.recording.result):
+                messagebox.showwarning("Out of sync", "This window and the duel server disagree on the result.")
+            if self.net.role == duel_net.ENEMY:
+                # we played the enemies: their defeat is ours
+                if kind == "defeat":
+                    messagebox.showinfo("Victory", f"{self.player.name} fainted!")
+                    self.finish("victory")
+                else:
+                    messagebox.showinfo("Defeat", f"{self.player.name} defeated all your enemies...")
+                    self.finish("defeat")
                 return
-        self.after(800, self.enemy_attack)
-
-    def enemy_attack(self):
-        spell = random.choice(list(self.enemy.spells.keys()))
-        dmg, stype = self.enemy.cast_spell(spell)
-        stype = self.enemy.spells[spell][1]
-
-        if self.player_defense:
-            self.show_message(f"{self.enemy.name} used {spell}, but Protego blocked it!")
-            self.player_defense = False
-            self.flash_sprite(self.player_sprite_id, times=6, interval=80)
+        if kind == "victory":
+            # defeated all enemies: final victory
+            messagebox.showinfo("Victory", "You defeated all enemies!")
+            self.finish("victory")
         else:
-            # animate enemy attack then apply damage
-            def finish_hit():
-                self.player.hp = max(0, self.player.hp - dmg)
-                self.flash_sprite(self.player_sprite_id)
-                self.update_hp_display()
-                self.show_message(f"{self.enemy.name} used {spell}! It dealt {dmg} damage!")
-                if self.player.hp <= 0:
-                    self.show_message(f"{self.player.name} fainted... Game Over.")
-                    messagebox.showinfo("Defeat", f"{self.player.name} fainted...")
-                    self.destroy()
-            self.attack_animation(self.enemy_sprite_id, -30, 150,
-                                  callback=lambda: self.cast_spell_visual(self.enemy_sprite_id, self.player_sprite_id, stype, callback=finish_hit))
-
-    # --- Message queue (typewriter) ---
+            messagebox.showinfo("Defeat", f"{self.player.name} fainted...")
+            self.finish("defeat")
+
+    # --- Message log (typewriter, see text_reveal.TextReveal) ---
     def show_message(self, text):
-        self._message_queue.append(text)
-        if not self._message_running:
-            self._run_next_message()
+        self.log.show(text)
 
-    def _run_next_message(self):
-        if not self._message_queue:
-            self._message_running = False
-            return
-        self._message_running = True
-        msg = self._message_queue.pop(0)
-        self._type_message(msg, 0)
+    def _log_clear(self, text):
+        self.message_box.configure(state="normal")
+        self.message_box.delete("1.0", tk.END)
+        self.message_box.configure(state="disabled")
 
-    def _type_message(self, msg, i, delay=25):
+    def _log_update(self, text, added):
         self.message_box.configure(state="normal")
-        if i == 0:
-            self.message_box.delete("1.0", tk.END)
-        if i < len(msg):
-            self.message_box.insert(tk.END, msg[i])
-            self.message_box.see(tk.END)
-            self.message_box.configure(state="disabled")
-            self.after(delay, lambda: self._type_message(msg, i+1, delay))
-        else:
-            self.after(600, self._run_next_message)
+        self.message_box.insert(tk.END, added)
+        self.message_box.see(tk.END)
+        self.message_box.configure(state="disabled")
 
 # ----------------- Main -----------------
+def join_server(root, player, mode):
+    """Connect to WIZARD_SERVER and wait for a match, showing that in root meanwhile.
+    Returns the duel_net.Client, or None if the player closed the window or it failed (reported)."""
+    waiting = "Waiting for an opponent" if mode == duel_net.PVP else "Connecting"
+    tk.Label(root, text=f"{waiting} on {duel_net.SERVER}...", padx=30, pady=20).pack()
+    root.title("Wizard Duel")
+    root.deiconify()
+    outcome = {}
+
+    def connect():  # worker thread: join() blocks until the match starts
+        try:
+            client = outcome["client"] = duel_net.Client.connect()
+            client.join(player, PLAYER_LIMITED_USES, mode,
+                        timeout=None if mode == duel_net.PVP else duel_net.CONNECT_TIMEOUT)
+        except OSError as exc:  # refused, timed out, or turned away by the server (ConnectionError)
+            outcome["error"] = exc
+
+    root.protocol("WM_DELETE_WINDOW", lambda: outcome.setdefault("cancelled", True))
+    worker = threading.Thread(target=connect, daemon=True)
+    worker.start()
+    while worker.is_alive() and "cancelled" not in outcome:
+        root.update()
+        time.sleep(0.02)
+    if "cancelled" in outcome:
+        return None
+    if "error" in outcome:
+        if "client" in outcome:
+            outcome["client"].close()
+        messagebox.showerror("Duel server", f"Could not start a duel on {duel_net.SERVER}:\n{outcome['error']}")
+        return None
+    return outcome["client"]
+
+
 if __name__ == "__main__":
+    import sys
+    # optional seed: python hogwarts_duel_ui.py 1234
+    # on a duel server: WIZARD_SERVER=127.0.0.1:7717 python hogwarts_duel_ui.py [pvp]
+    args = sys.argv[1:]
+    seed = int(args[0]) if args and args[0].isdigit() else None
+
     # ask player name
     root = tk.Tk()
     root.withdraw()
     name = simpledialog.askstring("Name", "Enter your wizard's name:")
     if not name:
         name = "You"
-    root.destroy()
-
-    # player spells
-    player_spells = {
-        "Expelliarmus":((8,15),"Charm"),
-        "Stupefy":((5,12),"Charm"),
-        "Sectumsempra":((10,20),"Curse"),
-        "Protego":((0,0),"Defense"),
-        "Episkey":((10,20),"Heal"),
-        "Stupefying Stun":((0,0),"Stun"),
-        "Poison Cloud":((0,0),"Poison")
-    }
-
-    # limited uses initial set (used for resetting on new enemy)
-    limited_uses = {"Episkey":2, "Sectumsempra":1}
-
-    player = Character(name, 60, player_spells, limited_uses.copy())
 
-    app = DuelGUI(player, limited_uses)
+    # player spells and limited uses initial set (used for resetting on new enemy)
+    player = Character(name, PLAYER_BASE_HP, PLAYER_SPELLS, PLAYER_LIMITED_USES.copy())
+
+    if duel_net.SERVER:
+        net = join_server(root, player, duel_net.PVP if "pvp" in args else duel_net.SOLO)
+        root.destroy()
+        if net is None:
+            sys.exit(1)
+        app = DuelGUI(player, PLAYER_LIMITED_USES, net=net)
+    else:
+        root.destroy()
+        app = DuelGUI(player, PLAYER_LIMITED_USES, seed=seed, ai=enemy_ai.from_env())
     app.mainloop()
@@ -0,0 +1,71 @@
+# hud.py
+# Canvas items that only hear from Tk when their value actually changes.
+# Every set()/coords() lands in a pending table; one flush per event-loop
+# pass (after_idle) sends just the options that differ from what Tk has.
+
+
+class CanvasHUD:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.last = {}     # (item, option) -> value Tk currently has
+        self.pending = {}  # item -> {option: value}
+        self._flush_job = None
+        self.requested = 0  # updates asked for (one Tk call each before this layer)
+        self.calls = 0      # Tk calls actually made
+
+    # ---------- Updates ----------
+    def track(self, item, coords=None, **options):
+        """Record what an item was created with, without touching Tk."""
+        if coords is not None:
+            self.last[(item, "coords")] = tuple(float(c) for c in coords)
+        for option, value in options.items():
+            self.last[(item, option)] = value
+
+    def set(self, item, **options):
+        self.requested += len(options)
+        self.pending.setdefault(item, {}).update(options)
+        self._request_flush()
+
+    def coords(self, item, *coords):
+        self.requested += 1
+        self.pending.setdefault(item, {})["coords"] = tuple(float(c) for c in coords)
+        self._request_flush()
+
+    def _request_flush(self):
+        if self._flush_job is None:
+            self._flush_job = self.canvas.after_idle(self.flush)
+
+    def flush(self):
+        self._flush_job = None
+        pending, self.pending = self.pending, {}
+        last = self.last
+        for item, options in pending.items():
+            changed = {k: v for k, v in options.items() if last.get((item, k)) != v}
+            if not changed:
+                continue
+            coords = changed.pop("coords", None)
+            if coords is not None:
+                self.canvas.coords(item, *coords)
+                last[(item, "coords")] = coords
+                self.calls += 1
+            if changed:
+                self.canvas.itemconfigure(item, **changed)
+                for option, value in changed.items():
+                    last[(item, option)] = value
+                self.calls += 1
+
+    def close(self):
+        if self._flush_job is not None:
+            try:
+                self.canvas.after_cancel(self._flush_job)
+            except Exception:
+                pass
+            self._flush_job = None
+        self.pending = {}
+
+    # ---------- Stats ----------
+    def take_stats(self):
+        """(requested, tk_calls, saved) since the last call; resets the counters."""
+        stats = (self.requested, self.calls, self.requested - self.calls)
+        self.requested = self.calls = 0
+        return stats
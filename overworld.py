@@ -1,48 +1,63 @@
 import tkinter as tk
-from PIL import Image, ImageTk
-import os
-import sys
-import subprocess
 from tkinter import messagebox
-import textwrap
-
-class Game(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("Wizard Adventure - Overworld")
-        self.geometry("800x600")
-        self.resizable(False, False)
+from PIL import ImageTk
+from scene import Scene
+from text_reveal import TextReveal, wrap_text
+from world import World
+from chunks import TileMap, ChunkStreamer
+from asset_store import get_store
+from preloader import get_preloader
+import profiler
+
+PLAYER_SPEED = 5 * 1000 / 30  # px per second (was 5 px every 30 ms)
+MAX_MOVE_STEP = 100  # ms of movement per step at most, so fast / instant speeds can't jump through NPCs
+SPRITE_SIZE = (180, 180)
+VIEW_SIZE = (800, 600)
+MAP_CHUNKS = (16, 16)  # map size in chunks (chunks.CHUNK_SIZE px each): 8x8 screens
+WORLD_TAG = "world"    # every canvas item placed in world space; scrolled with the camera
+
+# NPCs on the map; every one of them is a duel trigger zone
+NPCS = [
+    {"name": "Dark Wizard", "sprite": "overworld_npc1.png", "pos": (380, 150)},
+]
+
+class Game(Scene):
+    title = "Wizard Adventure - Overworld"
+
+    def __init__(self, master=None, photos=None, on_duel=None, npcs=NPCS, map_chunks=MAP_CHUNKS, preload=()):
+        super().__init__(master, photos)
+        self.on_duel = on_duel
 
         # --- Canvas ---
-        self.canvas = tk.Canvas(self, width=800, height=600)
+        self.canvas = tk.Canvas(self, width=VIEW_SIZE[0], height=VIEW_SIZE[1])
         self.canvas.pack()
 
-        # --- Background ---
-        bg_path = os.path.join("assets", "overworld_bg.jpeg")
-        if not os.path.exists(bg_path):
-            raise FileNotFoundError(f"Background not found: {bg_path}")
-        self.bg_img = ImageTk.PhotoImage(
-            Image.open(bg_path).resize((800, 600))
-        )
-        self.canvas.create_image(0, 0, anchor="nw", image=self.bg_img)
+        # --- World model (positions + spatial index, no canvas.bbox) ---
+        self.tilemap = TileMap(*map_chunks)
+        self.world = World(self.tilemap.width, self.tilemap.height)
 
         # --- Player ---
-        player_path = os.path.join("assets", "overworld_player.png")
-        if not os.path.exists(player_path):
-            raise FileNotFoundError(f"Player sprite not found: {player_path}")
-        self.player_img = ImageTk.PhotoImage(
-            Image.open(player_path).resize((180, 180))
-        )
-        self.player = self.canvas.create_image(100, 400, anchor="nw", image=self.player_img)
-
-        # --- Enemy NPC ---
-        enemy_path = os.path.join("assets", "overworld_npc1.png")
-        if not os.path.exists(enemy_path):
-            raise FileNotFoundError(f"Enemy sprite not found: {enemy_path}")
-        self.enemy_img = ImageTk.PhotoImage(
-            Image.open(enemy_path).resize((180, 180))
-        )
-        self.enemy = self.canvas.create_image(380, 150, anchor="nw", image=self.enemy_img)
+        # canvas position = world position - camera; the camera follows the player
+        self.player_img = self.load_photo("overworld_player.png", SPRITE_SIZE)
+        self.player_entity = self.world.add("player", 100, 400, *SPRITE_SIZE,
+                                            mask=get_store().mask("overworld_player.png", SPRITE_SIZE))
+        self.cam_x, self.cam_y = self.camera_target()
+        self.player = self.canvas.create_image(100 - self.cam_x, 400 - self.cam_y, anchor="nw",
+                                               image=self.player_img, tags=(WORLD_TAG,))
+
+        # --- Enemy NPCs (drawn while the chunk they stand in is loaded) ---
+        # the trigger zone is the NPC's visible pixels: talk when the sprites touch
+        self.npc_items = {}  # world entity id -> canvas item
+        for npc in npcs:
+            x, y = npc["pos"]
+            self.world.add("npc", x, y, *SPRITE_SIZE, data=npc, mask=get_store().mask(npc["sprite"], SPRITE_SIZE))
+        self.enemy = None  # world id of the NPC the player is standing next to
+
+        # --- Background, streamed in chunks around the camera ---
+        self.chunks = ChunkStreamer(self.tilemap, self.canvas, lambda img: ImageTk.PhotoImage(img, master=self),
+                                    view=VIEW_SIZE, tag=WORLD_TAG,
+                                    on_load=self._chunk_loaded, on_evict=self._chunk_evicted)
+        self.chunks.update(self.cam_x, self.cam_y)
 
         # --- Dialogue Box Elements ---
         self.dialogue_rect = None
@@ -51,8 +66,9 @@ class Game(tk.Tk):
 
         # --- Movement ---
         self.keys_pressed = {"Up": False, "Down": False, "Left": False, "Right": False}
-        self.bind("<KeyPress>", self.key_press)
-        self.bind("<KeyRelease>", self.key_release)
+        top = self.winfo_toplevel()
+        top.bind("<KeyPress>", self.key_press)
+        top.bind("<KeyRelease>", self.key_release)
         self.bind_all("<space>", self.space_pressed)
         self.canvas.focus_set()
 
@@ -60,10 +76,18 @@ class Game(tk.Tk):
         self.enemy_nearby = False
         self.duel_prompted = False
         self.dialogue_animating = False
-        self.dialogue_done = False  # Ensure dialogue plays only once
+        self.dialogue_done = set()  # NPCs whose dialogue already played (plays only once)
+        self.dialogue_reveal = TextReveal(self.frames, self._dialogue_update, on_idle=self._dialogue_idle,
+                                          char_ms=20, line_pause=200, message_pause=0)
+
+        # --- Next scene's art (the duel), decoded while the player walks around ---
+        self.preload_assets = list(preload)
+        if self.preload_assets:
+            self.preload(self.preload_assets)
 
-        # Start movement loop
-        self.move_loop()
+        # Start movement loop (one task on the frame loop, stepped every frame)
+        self.move_task = self.frames.add(self.move_loop, name="move_loop")
+        self.profile_overlay = profiler.overlay(self.canvas, self.frames, "move_loop")
 
     def key_press(self, event):
         if event.keysym in self.keys_pressed:
@@ -73,9 +97,9 @@ class Game(tk.Tk):
         if event.keysym in self.keys_pressed:
             self.keys_pressed[event.keysym] = False
 
-    def move_loop(self):
+    def move_loop(self, dt):
         dx = dy = 0
-        speed = 5
+        speed = PLAYER_SPEED * min(dt, MAX_MOVE_STEP) / 1000.0
         if self.keys_pressed["Up"]:
             dy -= speed
         if self.keys_pressed["Down"]:
@@ -86,35 +110,76 @@ class Game(tk.Tk):
             dx += speed
 
         if dx != 0 or dy != 0:
-            x1, y1, x2, y2 = self.canvas.bbox(self.player)
-
-            # --- Edge boundaries ---
-            if x1 + dx < 0: dx = -x1
-            if y1 + dy < 0: dy = -y1
-            if x2 + dx > 800: dx = 800 - x2
-            if y2 + dy > 600: dy = 600 - y2
-
-            self.canvas.move(self.player, dx, dy)
+            # edge clamping and solid obstacles are resolved in the world model
+            dx, dy = self.world.move_player(self.player_entity, dx, dy)
+            if dx or dy:
+                self.canvas.move(self.player, dx, dy)
+        self.update_camera()
 
         # Always check enemy proximity
         self.check_enemy_proximity()
 
-        # Continue loop
-        self.after(30, self.move_loop)
+        return True  # keep running
+
+    # --- Camera / streaming ---
+    def camera_target(self):
+        x1, y1, x2, y2 = self.world.bbox(self.player_entity)
+        vw, vh = VIEW_SIZE
+        x = min(max(0, (x1 + x2 - vw) // 2), self.world.width - vw)
+        y = min(max(0, (y1 + y2 - vh) // 2), self.world.height - vh)
+        return max(0, int(x)), max(0, int(y))
+
+    def update_camera(self):
+        x, y = self.camera_target()
+        if x != self.cam_x or y != self.cam_y:
+            self.canvas.move(WORLD_TAG, self.cam_x - x, self.cam_y - y)
+            self.cam_x, self.cam_y = x, y
+        self.chunks.update(x, y)
+
+    def _chunk_npcs(self, cx, cy):
+        # an NPC belongs to the chunk its top-left corner is in
+        cw, ch = self.tilemap.chunk
+        x1, y1 = cx * cw, cy * ch
+        return [eid for eid in self.world.query(x1, y1, x1 + cw, y1 + ch, kind="npc")
+                if x1 <= self.world.x[eid] < x1 + cw and y1 <= self.world.y[eid] < y1 + ch]
+
+    def _chunk_loaded(self, cx, cy):
+        for eid in self._chunk_npcs(cx, cy):
+            if eid not in self.npc_items:
+                npc = self.world.data[eid]
+                self.npc_items[eid] = self.canvas.create_image(
+                    self.world.x[eid] - self.cam_x, self.world.y[eid] - self.cam_y, anchor="nw",
+                    image=self.load_photo(npc["sprite"], SPRITE_SIZE), tags=(WORLD_TAG,))
+
+    def _chunk_evicted(self, cx, cy):
+        for eid in self._chunk_npcs(cx, cy):
+            item = self.npc_items.pop(eid, None)
+            if item is not None:
+                self.canvas.delete(item)
 
     def check_enemy_proximity(self):
-        px1, py1, px2, py2 = self.canvas.bbox(self.player)
-        ex1, ey1, ex2, ey2 = self.canvas.bbox(self.enemy)
-        horizontal_overlap = (px2 > ex1 + 20) and (px1 < ex2 - 20)
-        vertical_overlap = (py2 > ey1 + 20) and (py1 < ey2 - 20)
+        # only NPCs in the grid cells around the player are tested
+        hits = self.world.triggers(self.player_entity, kind="npc")
+        if hits and self.enemy not in hits:
+            # walked from one NPC straight into another
+            self.dialogue_reveal.cancel()
+            self.hide_dialogue()
+            self.dialogue_animating = False
+            self.duel_prompted = False
+        self.enemy = hits[0] if hits else None
+        if self.preload_assets:
+            # a duel may be accepted any moment now: stop pacing the decodes
+            get_preloader().boost(bool(hits))
 
-        if horizontal_overlap and vertical_overlap:
+        if hits:
             self.enemy_nearby = True
-            if not self.dialogue_animating and not self.dialogue_done:
-                text = "Dark Wizard: Do you dare challenge me to a duel? Press SPACE to accept!"
+            if not self.dialogue_animating and self.enemy not in self.dialogue_done:
+                name = self.world.data[self.enemy]["name"]
+                text = f"{name}: Do you dare challenge me to a duel? Press SPACE to accept!"
                 self.animate_dialogue(text)
-        else:
+        elif self.enemy_nearby or self.dialogue_rect:
             self.enemy_nearby = False
+            self.dialogue_reveal.cancel()
             self.hide_dialogue()
             self.duel_prompted = False
             self.dialogue_animating = False
@@ -122,22 +187,23 @@ class Game(tk.Tk):
     def animate_dialogue(self, text):
         """Multi-line RPG style dialogue box with typing animation (no overflow)."""
         self.dialogue_animating = True
-        self.dialogue_done = True  # Ensure it plays once
-        ex1, ey1, ex2, ey2 = self.canvas.bbox(self.enemy)
+        self.dialogue_done.add(self.enemy)  # Ensure it plays once
+        ex1, ey1, ex2, ey2 = self.world.bbox(self.enemy)
+        ex1, ey1, ex2, ey2 = ex1 - self.cam_x, ey1 - self.cam_y, ex2 - self.cam_x, ey2 - self.cam_y
         width = 250
         height = 70
         x = ex1 + (ex2-ex1)//2 - width//2
         y = ey1 - height - 10
 
         # Wrap text to fit box
-        wrapped_text = textwrap.wrap(text, width=35)
+        wrapped_text = wrap_text(text, 35)
 
         # Draw rectangle
         if self.dialogue_rect:
             self.canvas.coords(self.dialogue_rect, x, y, x+width, y+height)
         else:
             self.dialogue_rect = self.canvas.create_rectangle(
-                x, y, x+width, y+height, fill="#222222", outline="#00FF00", width=2
+                x, y, x+width, y+height, fill="#222222", outline="#00FF00", width=2, tags=(WORLD_TAG,)
             )
 
         # Draw tail
@@ -148,7 +214,7 @@ class Game(tk.Tk):
                 x+width//2-5, y+height,
                 x+width//2+5, y+height,
                 x+width//2, y+height+10,
-                fill="#222222", outline="#00FF00"
+                fill="#222222", outline="#00FF00", tags=(WORLD_TAG,)
             )
 
         # Prepare text object
@@ -157,27 +223,18 @@ class Game(tk.Tk):
             self.canvas.coords(self.dialogue_text, x+10, y+10)
         else:
             self.dialogue_text = self.canvas.create_text(x+10, y+10, text="", fill="white",
-                                                         font=("Arial", 14, "bold"), anchor="nw")
+                                                         font=("Arial", 14, "bold"), anchor="nw",
+                                                         tags=(WORLD_TAG,))
 
         # Animate each character
-        self._animate_text_step(wrapped_text, line_index=0, char_index=0)
+        self.dialogue_reveal.show("\n".join(wrapped_text))
 
-    def _animate_text_step(self, lines, line_index, char_index):
-        if not self.enemy_nearby:
-            self.dialogue_animating = False
-            return  # stop if player moved away
-
-        if line_index < len(lines):
-            current_line = lines[line_index]
-            if char_index <= len(current_line):
-                text_to_show = "\n".join(lines[:line_index] + [current_line[:char_index]])
-                self.canvas.itemconfigure(self.dialogue_text, text=text_to_show)
-                self.after(20, lambda: self._animate_text_step(lines, line_index, char_index+1))
-            else:
-                # Move to next line
-                self.after(200, lambda: self._animate_text_step(lines, line_index+1, 0))
-        else:
-            self.dialogue_animating = False
+    def _dialogue_update(self, text, added):
+        if self.dialogue_text:
+            self.canvas.itemconfigure(self.dialogue_text, text=text)
+
+    def _dialogue_idle(self):
+        self.dialogue_animating = False
 
     def hide_dialogue(self):
         if self.dialogue_rect:
@@ -193,21 +250,27 @@ class Game(tk.Tk):
     def space_pressed(self, event):
         if self.enemy_nearby and not self.duel_prompted:
             self.duel_prompted = True
-            if messagebox.askyesno("Duel Invitation", "The Dark Wizard challenges you to a duel! Accept?"):
+            name = self.world.data[self.enemy]["name"]
+            if messagebox.askyesno("Duel Invitation", f"The {name} challenges you to a duel! Accept?"):
                 self.start_duel()
             else:
                 self.duel_prompted = False
 
     def start_duel(self):
-        self.destroy()
-        python_exe = sys.executable
-        duel_file = "hogwarts_duel_ui.py"
-        if not os.path.exists(duel_file):
-            raise FileNotFoundError(f"Duel file not found: {duel_file}")
-        subprocess.Popen([python_exe, duel_file])
+        # the scene manager (game.py) swaps this scene for the duel in the same window
+        if self.on_duel and self.on_duel() is None:
+            self.duel_prompted = False  # the duel did not start, the enemy can challenge again
+
+    def destroy(self):
+        top = self.winfo_toplevel()
+        top.unbind("<KeyPress>")
+        top.unbind("<KeyRelease>")
+        self.unbind_all("<space>")
+        self.chunks.close()
+        super().destroy()
 
 
 # --- Run Overworld ---
 if __name__ == "__main__":
-    game = Game()
-    game.mainloop()
+    from game import main
+    main()
@@ -0,0 +1,170 @@
+# preloader.py
+# Decodes (and resizes) art for the next scene on a worker thread while the
+# current one is running, e.g. the duel's sprites while the player walks the
+# overworld. Only PIL work happens here: Scene.preload() turns finished
+# images into PhotoImages on the Tk thread, one per frame.
+#
+# Normally the worker rests between assets so the overworld keeps its frame
+# rate; boost() (player standing in an NPC trigger zone) drops the rest so
+# everything is ready before the duel can be accepted.
+import heapq
+import threading
+
+from asset_store import get_store, asset_key
+
+IDLE_PAUSE = 0.05  # seconds between decodes while not boosted
+URGENT, NORMAL = 0, 1
+
+
+class Entry:
+    __slots__ = ("name", "size", "priority", "state", "image", "error", "event")
+
+    def __init__(self, name, size, priority):
+        self.name = name
+        self.size = size
+        self.priority = priority
+        self.state = "queued"  # queued -> loading -> ready / failed
+        self.image = None
+        self.error = None
+        self.event = threading.Event()
+
+
+class Preloader:
+    def __init__(self, store=None, pause=IDLE_PAUSE):
+        self.store = store or get_store()
+        self.pause = pause
+        self.cond = threading.Condition()
+        self.entries = {}  # (asset key, size) -> Entry
+        self._queue = []   # (priority, seq, key); stale duplicates are skipped
+        self._seq = 0
+        self.boosted = False
+        self.closed = False
+        self._thread = None
+
+    @staticmethod
+    def _key(name, size):
+        return asset_key(name), tuple(size)
+
+    # ---------- Requests ----------
+    def request(self, assets, priority=NORMAL):
+        """Queue [(name, size)] for decoding, in order within a priority."""
+        with self.cond:
+            for name, size in assets:
+                key = self._key(name, size)
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = self.entries[key] = Entry(name, tuple(size), priority)
+                elif entry.state != "queued" or priority >= entry.priority:
+                    continue
+                entry.priority = priority
+                self._seq += 1
+                heapq.heappush(self._queue, (priority, self._seq, key))
+            self.cond.notify_all()
+            if self._thread is None and not self.closed:
+                self._thread = threading.Thread(target=self._run, name="preloader", daemon=True)
+                self._thread.start()
+
+    def boost(self, on=True):
+        """Decode back to back (no rest between assets) while on."""
+        with self.cond:
+            if on != self.boosted:
+                self.boosted = on
+                self.cond.notify_all()  # cut a rest short
+
+    # ---------- Worker ----------
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self._queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                _, _, key = heapq.heappop(self._queue)
+                entry = self.entries[key]
+                if entry.state != "queued":
+                    continue
+                entry.state = "loading"
+            try:
+                image, error = self.store.image(entry.name, entry.size), None
+            except Exception as exc:  # reported to whoever waits for it
+                image, error = None, exc
+            with self.cond:
+                entry.image, entry.error = image, error
+                entry.state = "ready" if error is None else "failed"
+                entry.event.set()
+                if not self.boosted and self.pause and self._queue:
+                    self.cond.wait(self.pause)
+
+    # ---------- Queries ----------
+    def ready(self, name, size):
+        entry = self.entries.get(self._key(name, size))
+        return entry is not None and entry.state == "ready"
+
+    def wait(self, name, size, timeout=None):
+        """The decoded image of a requested asset, waiting for it if needed.
+
+        Moves it to the front of the queue. None if it was never requested
+        (decode it yourself) or the timeout ran out; re-raises decode errors.
+        """
+        entry = self.entries.get(self._key(name, size))
+        if entry is None:
+            return None
+        if entry.state == "queued":
+            self.request([(name, size)], URGENT)
+        if not entry.event.wait(timeout):
+            return None
+        if entry.error is not None:
+            raise entry.error
+        return entry.image
+
+    def progress(self, assets=None):
+        """(finished, total) for the given [(name, size)], or for everything requested."""
+        with self.cond:
+            if assets is None:
+                entries = list(self.entries.values())
+            else:
+                entries = [self.entries.get(self._key(n, s)) for n, s in assets]
+            done = sum(1 for e in entries if e is not None and e.state in ("ready", "failed"))
+            return done, len(entries)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+_preloader = None
+
+
+def get_preloader():
+    global _preloader
+    if _preloader is None:
+        _preloader = Preloader()
+    return _preloader
+
+
+def current():
+    """The preloader if anything has been preloaded, else None."""
+    return _preloader
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import sprite_cache
+    from asset_store import STARTUP_SPRITES
+
+    assets = list(dict.fromkeys(STARTUP_SPRITES))
+    for boosted in (False, True):
+        if "--cold" in sys.argv:
+            sprite_cache.clear()  # decode + resize from the archive, not the resized-sprite cache
+        get_store().forget()
+        loader = Preloader()
+        loader.boost(boosted)
+        start = time.perf_counter()
+        loader.request(assets)
+        while loader.progress()[0] < len(assets):
+            time.sleep(0.001)
+        print(f"{'boosted' if boosted else 'idle pace'}: {len(assets)} assets in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        loader.close()
@@ -0,0 +1,228 @@
+# profiler.py
+# Opt-in event-loop profiler. Enable with WIZARD_PROFILE=trace.json (or
+# profiler.enable("trace.json")) before the window is built. It then:
+#   - wraps every Tk callback (after/after_idle timers, bindings, button
+#     commands) and records wall time plus how late timers fired,
+#   - records a frame-time histogram per FrameLoop task (e.g. move_loop),
+#   - shows a live overlay on the scene canvas,
+#   - writes a Chrome trace (chrome://tracing, Perfetto, speedscope) at exit.
+import os
+import json
+import time
+import atexit
+import threading
+import tkinter as tk
+
+MAX_TRACE_EVENTS = 200000
+HIST_BUCKETS = (4, 8, 12, 17, 20, 25, 33, 50, 100, 250, 1000)  # ms upper bounds
+
+_active = None
+
+
+def active():
+    return _active
+
+
+def enable(path="trace.json"):
+    global _active
+    if _active is None:
+        _active = Profiler(path)
+        _active.install()
+        atexit.register(_active.dump)
+    return _active
+
+
+def callback_name(func):
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", None)
+    if name is None:
+        name = type(func).__name__
+    return name
+
+
+class Stat:
+    __slots__ = ("count", "total", "worst", "lag_total", "lag_worst")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.lag_total = 0.0
+        self.lag_worst = 0.0
+
+
+class Profiler:
+    def __init__(self, path="trace.json"):
+        self.path = path
+        self.t0 = time.perf_counter()
+        self.stats = {}       # callback name -> Stat
+        self.histograms = {}  # name -> [count per HIST_BUCKETS bucket + overflow]
+        self.frame_times = {} # name -> recent frame times (ms) for percentiles
+        self.events = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self._originals = None
+
+    # ---------- Recording ----------
+    def record(self, name, start, end, cat="callback", lag=None):
+        ms = (end - start) * 1000.0
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.count += 1
+            stat.total += ms
+            stat.worst = max(stat.worst, ms)
+            args = {}
+            if lag is not None:
+                lag_ms = lag * 1000.0
+                stat.lag_total += lag_ms
+                stat.lag_worst = max(stat.lag_worst, lag_ms)
+                args["lag_ms"] = round(lag_ms, 3)
+            if len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append({"name": name, "cat": cat, "ph": "X",
+                                    "ts": (start - self.t0) * 1e6, "dur": (end - start) * 1e6,
+                                    "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+            else:
+                self.dropped += 1
+
+    def frame(self, name, ms):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = [0] * (len(HIST_BUCKETS) + 1)
+                self.frame_times[name] = []
+            for i, bound in enumerate(HIST_BUCKETS):
+                if ms <= bound:
+                    hist[i] += 1
+                    break
+            else:
+                hist[-1] += 1
+            recent = self.frame_times[name]
+            recent.append(ms)
+            if len(recent) > 600:
+                del recent[:300]
+
+    def wrap(self, func, cat="callback", due=None):
+        name = callback_name(func)
+        def _profiled(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                end = time.perf_counter()
+                self.record(name, start, end, cat, None if due is None else max(0.0, start - due))
+        _profiled.__qualname__ = name
+        return _profiled
+
+    # ---------- Tk hooks ----------
+    def install(self):
+        """Wrap every callback Tk will run from now on."""
+        if self._originals is not None:
+            return
+        after = tk.Misc.after
+        register = tk.Misc._register
+        self._originals = (after, register)
+        profiler = self
+
+        def profiled_after(widget, ms, func=None, *args):
+            if func is None:
+                return after(widget, ms)
+            delay = 0 if ms == "idle" else ms
+            due = time.perf_counter() + delay / 1000.0
+            return after(widget, ms, profiler.wrap(func, "timer", due), *args)
+
+        def profiled_register(widget, func, subst=None, needcleanup=1):
+            # after() registers its own internal callit; that one is already wrapped
+            if not callback_name(func).endswith("callit"):
+                func = profiler.wrap(func, "input" if subst is not None else "command")
+            return register(widget, func, subst, needcleanup)
+
+        tk.Misc.after = profiled_after
+        tk.Misc._register = profiled_register
+
+    def uninstall(self):
+        if self._originals is not None:
+            tk.Misc.after, tk.Misc._register = self._originals
+            self._originals = None
+
+    # ---------- Reports ----------
+    def percentile(self, name, q):
+        recent = sorted(self.frame_times.get(name, ()))
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+    def slowest(self, n=5):
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda kv: kv[1].worst, reverse=True)
+        return items[:n]
+
+    def summary(self):
+        lines = ["callback                                   calls   avg ms   max ms  max lag"]
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda kv: kv[1].total, reverse=True)
+        for name, stat in items[:25]:
+            lines.append(f"{name[:42]:42s} {stat.count:6d} {stat.total / stat.count:8.2f} "
+                         f"{stat.worst:8.2f} {stat.lag_worst:8.2f}")
+        for name, hist in self.histograms.items():
+            bounds = [f"<={b}" for b in HIST_BUCKETS] + [f">{HIST_BUCKETS[-1]}"]
+            cells = ", ".join(f"{b}: {c}" for b, c in zip(bounds, hist) if c)
+            lines.append(f"frame time {name}: {cells}")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        path = path or self.path
+        with self.lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                    "otherData": {"dropped_events": self.dropped,
+                                  "frame_histograms": {k: list(v) for k, v in self.histograms.items()},
+                                  "histogram_buckets_ms": list(HIST_BUCKETS)}}
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+
+# -------------------- LIVE OVERLAY --------------------
+class Overlay:
+    """Small text box in the canvas corner, refreshed a few times a second."""
+
+    def __init__(self, canvas, frames, profiler, frame_name="frame", period=250):
+        self.canvas = canvas
+        self.profiler = profiler
+        self.frame_name = frame_name
+        self.period = period
+        self.lines = []  # callables returning extra lines (e.g. the duel's HUD savings)
+        self.text = canvas.create_text(int(canvas.cget("width")) - 8, 8, anchor="ne", text="",
+                                       fill="#00ff00", font=("Consolas", 9))
+        self._elapsed = 0.0
+        self.task = frames.add(self._step)
+
+    def _step(self, dt):
+        self._elapsed += dt
+        if self._elapsed < self.period:
+            return True
+        self._elapsed = 0.0
+        p = self.profiler
+        name = self.frame_name
+        p50 = p.percentile(name, 0.5)
+        lines = [f"{name}: {1000.0 / p50 if p50 else 0:.0f} fps  p50 {p50:.1f}  "
+                 f"p95 {p.percentile(name, 0.95):.1f}  max {p.percentile(name, 1.0):.1f} ms"]
+        for cb, stat in p.slowest(3):
+            lines.append(f"{cb[-28:]}: max {stat.worst:.1f} ms lag {stat.lag_worst:.1f}")
+        lines += [line() for line in self.lines]
+        self.canvas.itemconfigure(self.text, text="\n".join(lines))
+        self.canvas.tag_raise(self.text)
+        return True
+
+
+def overlay(canvas, frames, frame_name="frame"):
+    """Attach the overlay if profiling is on; returns None otherwise."""
+    if _active is None:
+        return None
+    return Overlay(canvas, frames, _active, frame_name)
+
+
+if os.environ.get("WIZARD_PROFILE"):
+    _path = os.environ["WIZARD_PROFILE"]
+    enable("trace.json" if _path == "1" else _path)
+    atexit.register(lambda: print(_active.summary()))
@@ -0,0 +1,277 @@
+# replay.py
+# Compact duel replays: the duel seed, the player's starting state and one
+# byte per player turn (the spell index). Re-running the inputs through
+# DuelEngine with the same seed rebuilds the exact same duel. When the enemy
+# is driven by a search AI its choices are recorded too (ENEMY_BIT set),
+# since they depend on how long it got to think.
+#   python replay.py duel.wdr                 instant re-run, print result
+#   python replay.py duel.wdr --speed 2       watch it in the duel window at 2x
+#   python replay.py --selftest 10000         encode/verify random duels
+# Set WIZARD_REPLAYS=<dir> to keep a .wdr file for every duel played.
+import os
+import time
+import struct
+import zlib
+import random
+
+from duel_engine import DuelEngine, Character, PLAYER_SPELLS, PLAYER_LIMITED_USES, ENEMY_SPELL_SETS
+
+MAGIC = b"WDR"
+VERSION = 2  # 2: Stun / Poison apply status effects
+END = 0xFF  # marks the end of the inputs, followed by the trailer
+ENEMY_BIT = 0x80  # input byte is an enemy spell index
+
+_HEADER = struct.Struct("<3sBQIHHHII")  # magic, version, seed, spells crc, max_hp, hp, level, xp, next_level_xp
+_TRAILER = struct.Struct("<BHBHI")      # phase, player hp, enemy index, level, turns
+PHASES = ["player", "enemy", "advance", "victory", "defeat", "timeout"]
+REPLAY_DIR = os.environ.get("WIZARD_REPLAYS")
+
+
+ENEMY_SPELL_NAMES = list(dict.fromkeys(spell for spells in ENEMY_SPELL_SETS for spell in spells))
+
+
+_crcs = {}  # (id(spells), id(enemy sets)) -> (spells, enemy sets, crc); spell tables never change once loaded
+
+
+def spells_crc(spells, enemy_spell_sets=ENEMY_SPELL_SETS):
+    cached = _crcs.get((id(spells), id(enemy_spell_sets)))
+    if cached is not None and cached[0] is spells and cached[1] is enemy_spell_sets:
+        return cached[2]  # every replay header (and duel server match) checks the same tables
+    enemy = [sorted(s.items()) for s in enemy_spell_sets]
+    crc = zlib.crc32(repr((sorted(spells.items()), enemy)).encode("utf-8"))
+    _crcs[(id(spells), id(enemy_spell_sets))] = (spells, enemy_spell_sets, crc)
+    return crc
+
+
+def new_seed():
+    return random.SystemRandom().getrandbits(64)
+
+
+def _pack_uses(spell_names, uses):
+    out = bytearray([len(uses)])
+    for spell, count in uses.items():
+        out += bytes([spell_names.index(spell), count])
+    return bytes(out)
+
+
+def _unpack_uses(spell_names, data, pos):
+    count = data[pos]
+    pos += 1
+    uses = {}
+    for _ in range(count):
+        uses[spell_names[data[pos]]] = data[pos + 1]
+        pos += 2
+    return uses, pos
+
+
+class Replay:
+    def __init__(self, seed, player, initial_limited_uses, inputs=None, result=None):
+        self.seed = seed
+        self.spells = player.spells
+        self.spell_names = list(player.spells)
+        self.enemy_spell_names = ENEMY_SPELL_NAMES
+        # starting state of the player (they carry XP/levels between duels)
+        self.name = player.name
+        self.max_hp = player.max_hp
+        self.hp = player.hp
+        self.level = player.level
+        self.xp = player.xp
+        self.next_level_xp = player.next_level_xp
+        self.limited_uses = dict(player.limited_uses)
+        self.initial_limited_uses = dict(initial_limited_uses)
+        self.inputs = bytearray(inputs or b"")
+        self.result = result  # trailer tuple once finished
+
+    # ---------- Recording ----------
+    def code(self, spell):
+        """Input byte of a player spell; ValueError if the loadout has too many spells to encode."""
+        index = self.spell_names.index(spell)
+        if index >= ENEMY_BIT:
+            raise ValueError(f"{spell}: only {ENEMY_BIT} player spells fit in a replay")
+        return index
+
+    def enemy_code(self, spell):
+        """Input byte of an enemy spell (ENEMY_BIT set, never END)."""
+        index = self.enemy_spell_names.index(spell)
+        if ENEMY_BIT | index >= END:
+            raise ValueError(f"{spell}: only {END & ~ENEMY_BIT} enemy spells fit in a replay")
+        return ENEMY_BIT | index
+
+    def record(self, spell):
+        self.inputs.append(self.code(spell))
+
+    def record_enemy(self, spell):
+        self.inputs.append(self.enemy_code(spell))
+
+    def finish(self, engine):
+        self.result = (PHASES.index(engine.phase), engine.player.hp, engine.enemy_index,
+                       engine.player.level, engine.turn)
+
+    # ---------- Playback ----------
+    def make_player(self):
+        player = Character(self.name, self.max_hp, self.spells, dict(self.limited_uses))
+        player.hp = self.hp
+        player.level = self.level
+        player.xp = self.xp
+        player.next_level_xp = self.next_level_xp
+        return player
+
+    def make_engine(self):
+        return DuelEngine(self.make_player(), self.initial_limited_uses, rng=random.Random(self.seed))
+
+    def spell(self, index):
+        code = self.inputs[index]
+        if code & ENEMY_BIT:
+            return self.enemy_spell_names[code & ~ENEMY_BIT]
+        return self.spell_names[code]
+
+    def is_enemy(self, index):
+        return index < len(self.inputs) and bool(self.inputs[index] & ENEMY_BIT)
+
+    def run(self, on_events=None):
+        """Re-run the whole duel instantly. Returns the finished engine."""
+        engine = self.make_engine()
+        pos = 0
+        while not engine.over:
+            if engine.phase == "player":
+                if pos >= len(self.inputs):
+                    break  # recording stopped mid-duel
+                events = engine.player_turn(self.spell(pos))
+                pos += 1
+            elif engine.phase == "enemy" and self.is_enemy(pos):
+                events = engine.enemy_turn(self.spell(pos))
+                pos += 1
+            else:
+                events = engine.step()
+            if on_events:
+                on_events(events)
+        return engine
+
+    def verify(self):
+        """True if the re-run ends exactly where the recording ended."""
+        engine = self.run()
+        if self.result is None:
+            return True
+        return (PHASES.index(engine.phase), engine.player.hp, engine.enemy_index,
+                engine.player.level, engine.turn) == tuple(self.result)
+
+    # ---------- Encoding ----------
+    def encode(self):
+        name = self.name.encode("utf-8")[:255]
+        out = bytearray(_HEADER.pack(MAGIC, VERSION, self.seed, spells_crc(self.spells),
+                                     self.max_hp, self.hp, self.level, self.xp, self.next_level_xp))
+        out.append(len(name))
+        out += name
+        out += _pack_uses(self.spell_names, self.limited_uses)
+        out += _pack_uses(self.spell_names, self.initial_limited_uses)
+        out += self.inputs
+        if self.result is not None:
+            out.append(END)
+            out += _TRAILER.pack(*self.result)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data, spells=PLAYER_SPELLS):
+        magic, version, seed, crc, max_hp, hp, level, xp, next_level_xp = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a duel replay (or unsupported version)")
+        if crc != spells_crc(spells):
+            raise ValueError("replay was recorded with a different spell table")
+        pos = _HEADER.size
+        name_len = data[pos]
+        name = data[pos + 1:pos + 1 + name_len].decode("utf-8")
+        pos += 1 + name_len
+        spell_names = list(spells)
+        limited_uses, pos = _unpack_uses(spell_names, data, pos)
+        initial_limited_uses, pos = _unpack_uses(spell_names, data, pos)
+        end = data.find(bytes([END]), pos)
+        inputs = data[pos:] if end < 0 else data[pos:end]
+        result = None if end < 0 else _TRAILER.unpack_from(data, end + 1)
+
+        player = Character(name, max_hp, spells, limited_uses)
+        player.hp, player.level, player.xp, player.next_level_xp = hp, level, xp, next_level_xp
+        return cls(seed, player, initial_limited_uses, inputs, result)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.encode())
+
+    @classmethod
+    def load(cls, path, spells=PLAYER_SPELLS):
+        with open(path, "rb") as f:
+            return cls.decode(f.read(), spells)
+
+
+def autosave(replay):
+    """Write replay to REPLAY_DIR if replays are being kept. Returns the path."""
+    if not REPLAY_DIR:
+        return None
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    path = os.path.join(REPLAY_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{replay.seed:016x}.wdr")
+    replay.save(path)
+    return path
+
+
+def record_random_duel(seed, policy_rng, enemy_choices=False):
+    """Play one campaign with random inputs and return its finished Replay."""
+    player = Character("You", 60, PLAYER_SPELLS, dict(PLAYER_LIMITED_USES))
+    replay = Replay(seed, player, PLAYER_LIMITED_USES)
+    engine = replay.make_engine()
+    while not engine.over:
+        if engine.phase == "player":
+            spell = policy_rng.choice(engine.available_spells())
+            replay.record(spell)
+            engine.player_turn(spell)
+        elif engine.phase == "enemy" and enemy_choices:
+            spell = policy_rng.choice(list(engine.enemy.spells))
+            replay.record_enemy(spell)
+            engine.enemy_turn(spell)
+        else:
+            engine.step()
+    replay.finish(engine)
+    return replay
+
+
+def play_in_gui(replay, speed=1.0):
+    from hogwarts_duel_ui import DuelGUI
+    app = DuelGUI(replay.make_player(), replay.initial_limited_uses, seed=replay.seed, replay=replay)
+    app.frames.time_scale = speed
+    app.mainloop()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Duel replays")
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--speed", type=float, default=None, help="watch in the duel window at this speed")
+    parser.add_argument("--selftest", type=int, default=0, help="record, encode and verify N random duels")
+    args = parser.parse_args()
+
+    if args.selftest:
+        rng = random.Random(1)
+        replays = [record_random_duel(rng.getrandbits(64), rng, i % 2 == 1) for i in range(args.selftest)]
+        blobs = [r.encode() for r in replays]
+        start = time.perf_counter()
+        ok = sum(Replay.decode(blob).verify() for blob in blobs)
+        elapsed = time.perf_counter() - start
+        inputs = sum(len(r.inputs) for r in replays)
+        size = sum(len(b) for b in blobs)
+        print(f"{ok}/{len(blobs)} verified, {size / len(blobs):.1f} bytes/duel, "
+              f"{inputs / len(blobs):.1f} inputs/duel, {len(blobs) / elapsed:.0f} duels/s re-run")
+        return 0 if ok == len(blobs) else 1
+
+    if not args.path:
+        parser.error("replay path required")
+    replay = Replay.load(args.path)
+    if args.speed:
+        play_in_gui(replay, args.speed)
+        return 0
+    engine = replay.run()
+    print(f"seed {replay.seed}: {engine.phase} after {engine.turn} turns, "
+          f"enemy {engine.enemy_index + 1}, {engine.player.name} Lv {engine.player.level} HP {engine.player.hp}")
+    print("verified" if replay.verify() else "MISMATCH")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
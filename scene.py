@@ -0,0 +1,81 @@
+# scene.py
+# Base class for screens that live inside one shared Tk root (see game.py).
+# A scene can also run on its own: with no master it makes its own window.
+import tkinter as tk
+from PIL import ImageTk
+
+from asset_store import load_asset
+from frame_loop import FrameLoop
+import preloader
+
+
+class Scene(tk.Frame):
+    title = "Wizard Adventure"
+
+    def __init__(self, master=None, photos=None, on_finish=None):
+        if master is None:
+            master = tk.Tk()
+            master.title(self.title)
+            master.geometry("800x600")
+            master.resizable(False, False)
+            self.standalone = True
+        else:
+            self.standalone = False
+        super().__init__(master)
+        self.pack(fill="both", expand=True)
+        self.photos = photos if photos is not None else {}  # (name, size) -> PhotoImage
+        self.on_finish = on_finish
+        self.frames = FrameLoop(self)  # every animation / delay of this scene
+        self.frames.start()
+
+    # ---------- Assets ----------
+    def load_photo(self, name, size):
+        key = (name.lower(), tuple(size))
+        photo = self.photos.get(key)
+        if photo is None:
+            loader = preloader.current()
+            img = loader.wait(name, size) if loader else None  # already on its way: don't decode twice
+            if img is None:
+                img = load_asset(name, size)
+            photo = ImageTk.PhotoImage(img, master=self)
+            self.photos[key] = photo
+        return photo
+
+    def preload(self, assets):
+        """Decode [(name, size)] in the background for a later scene.
+
+        The PhotoImages are made here on the Tk thread, one per frame as the
+        decodes finish, and land in the shared photo cache. Returns the task.
+        """
+        loader = preloader.get_preloader()
+        loader.request(assets)
+        pending = [(name, tuple(size)) for name, size in assets]
+
+        def _upload(dt):
+            for i, (name, size) in enumerate(pending):
+                if (name.lower(), size) in self.photos or loader.ready(name, size):
+                    self.load_photo(name, size)
+                    del pending[i]
+                    break
+            return bool(pending)
+        return self.frames.add(_upload, name="preload")
+
+    # ---------- Timers ----------
+    def schedule(self, ms, callback):
+        """Delayed callback on the scene's frame loop (dies with the scene)."""
+        return self.frames.wait(ms, callback)
+
+    def cancel_all(self):
+        self.frames.stop()
+
+    # ---------- Lifetime ----------
+    def finish(self, result=None):
+        """Leave the scene: hand control back to the manager, or close the window."""
+        if self.on_finish:
+            self.on_finish(result)
+        else:
+            self.winfo_toplevel().destroy()
+
+    def destroy(self):
+        self.cancel_all()
+        super().destroy()
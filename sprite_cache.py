@@ -0,0 +1,78 @@
+# sprite_cache.py
+# On-disk cache of already-resized sprites. The source art is 1024-1536 px
+# PNG/JPEG; every window only needs small versions, so store those as raw
+# pixel bytes (no decode, no resample on a hit).
+import os
+import hashlib
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".sprite_cache")
+RAW_MODES = ("RGB", "RGBA", "L", "LA")
+
+
+def cache_key(ident, size):
+    return hashlib.sha1(f"{ident}|{size[0]}x{size[1]}".encode("utf-8")).hexdigest()
+
+
+def file_ident(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def cache_path(key, size, mode):
+    return os.path.join(CACHE_DIR, f"{key}_{size[0]}x{size[1]}_{mode}.raw")
+
+
+def _find_cached(key, size):
+    for mode in RAW_MODES:
+        path = cache_path(key, size, mode)
+        if os.path.isfile(path):
+            return path, mode
+    return None, None
+
+
+def resize_image(source, size):
+    return Image.open(source).resize(size)
+
+
+def load_cached(ident, size, build):
+    """Cached resized image for a source identified by ident (path/mtime/etc).
+
+    build() is only called on a miss and must return the image at size.
+    """
+    size = (int(size[0]), int(size[1]))
+    key = cache_key(ident, size)
+    cached, mode = _find_cached(key, size)
+    if cached:
+        with open(cached, "rb") as f:
+            data = f.read()
+        try:
+            return Image.frombytes(mode, size, data)
+        except ValueError:
+            pass  # truncated / stale entry, rebuild below
+    img = build()
+    if img.mode not in RAW_MODES:
+        img = img.convert("RGBA")
+    store(key, img)
+    return img
+
+
+def store(key, img):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        target = cache_path(key, img.size, img.mode)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(img.tobytes())
+        os.replace(tmp, target)
+    except OSError:
+        pass  # read-only install: just run uncached
+
+
+def clear():
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".raw"):
+            os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,194 @@
+# status_effects.py
+# Status effects (stun, poison, shields, ...) scheduled on one heap, keyed
+# by the tick at which each effect next fires or expires. Advancing the
+# clock only pops what is due, so a tick costs O(k log n) for k due
+# effects out of n active ones, however many targets carry effects.
+#   python status_effects.py 10000     tick cost with many active effects
+import heapq
+
+
+class Effect:
+    __slots__ = ("target", "kind", "stacks", "max_stacks", "amount", "period", "expires", "next_fire", "version")
+
+    def __init__(self, target, kind, amount=0, period=None, max_stacks=1):
+        self.target = target
+        self.kind = kind
+        self.stacks = 0
+        self.max_stacks = max_stacks
+        self.amount = amount    # per stack, per firing (damage over time) or shield charges
+        self.period = period    # ticks between firings; None = never fires
+        self.expires = None     # tick it ends; None = until consumed/removed
+        self.next_fire = None
+        self.version = 0        # bumped on every reschedule; stale heap entries are skipped
+
+    def copy(self):
+        other = Effect(self.target, self.kind, self.amount, self.period, self.max_stacks)
+        other.stacks = self.stacks
+        other.expires = self.expires
+        other.next_fire = self.next_fire
+        return other
+
+
+class EffectEngine:
+    def __init__(self):
+        self.now = 0
+        self.active = {}  # (target, kind) -> Effect
+        self._heap = []   # (tick, seq, version, effect)
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.active)
+
+    # ---------- Applying ----------
+    def apply(self, target, kind, duration=None, amount=0, period=None, stacks=1, max_stacks=1):
+        """Add an effect, or stack/refresh it if the target already has it.
+
+        duration: ticks until it expires (None = until consumed or removed)
+        period:   fire every period ticks (damage over time); None = passive
+        Re-applying adds stacks up to max_stacks and restarts the duration.
+        """
+        key = (target, kind)
+        effect = self.active.get(key)
+        if effect is None:
+            effect = self.active[key] = Effect(target, kind, amount, period, max_stacks)
+            if period:
+                effect.next_fire = self.now + period
+        effect.max_stacks = max(effect.max_stacks, max_stacks)
+        effect.stacks = min(effect.stacks + stacks, effect.max_stacks)
+        effect.expires = None if duration is None else self.now + duration
+        self._schedule(effect)
+        return effect
+
+    def _schedule(self, effect):
+        effect.version += 1
+        when, expires = effect.next_fire, effect.expires
+        if when is None or (expires is not None and expires < when):
+            when = expires
+        if when is not None:
+            self._seq += 1
+            heapq.heappush(self._heap, (when, self._seq, effect.version, effect))
+
+    # ---------- Queries ----------
+    def get(self, target, kind):
+        return self.active.get((target, kind))
+
+    def has(self, target, kind):
+        return (target, kind) in self.active
+
+    def stacks(self, target, kind):
+        effect = self.active.get((target, kind))
+        return effect.stacks if effect else 0
+
+    def on(self, target):
+        """Active effects on target (a scan: for display, not for the tick path)."""
+        return [effect for (t, _), effect in self.active.items() if t == target]
+
+    def clear(self, target):
+        for effect in self.on(target):
+            self.remove(target, effect.kind)
+
+    def remove(self, target, kind):
+        effect = self.active.pop((target, kind), None)
+        if effect is not None:
+            effect.version += 1  # orphan its heap entries
+        return effect
+
+    def consume(self, target, kind, stacks=1):
+        """Use up stacks of an effect (e.g. a shield absorbing a hit). True if there were any."""
+        effect = self.active.get((target, kind))
+        if effect is None:
+            return False
+        effect.stacks -= stacks
+        if effect.stacks <= 0:
+            self.remove(target, kind)
+        return True
+
+    # ---------- Clock ----------
+    def advance(self, ticks=1):
+        """Move the clock on. Returns (fired, expired):
+        fired   [(target, kind, amount * stacks)] for every periodic firing due
+        expired [(target, kind)] for effects whose duration ran out
+        """
+        self.now += ticks
+        now = self.now
+        heap = self._heap
+        fired = []
+        expired = []
+        while heap and heap[0][0] <= now:
+            _, _, version, effect = heapq.heappop(heap)
+            if version != effect.version:
+                continue
+            while effect.next_fire is not None and effect.next_fire <= now:
+                if effect.expires is not None and effect.next_fire > effect.expires:
+                    break
+                fired.append((effect.target, effect.kind, effect.amount * effect.stacks))
+                effect.next_fire += effect.period
+            if effect.expires is not None and effect.expires <= now:
+                del self.active[(effect.target, effect.kind)]
+                effect.version += 1
+                expired.append((effect.target, effect.kind))
+            else:
+                self._schedule(effect)
+        return fired, expired
+
+    # ---------- Copies ----------
+    def copy(self):
+        other = EffectEngine()
+        other.now = self.now
+        for key, effect in self.active.items():
+            clone = other.active[key] = effect.copy()
+            other._schedule(clone)
+        return other
+
+    def snapshot(self):
+        """Hashable summary (times relative to now) for search / transposition keys."""
+        now = self.now
+        return tuple(sorted(
+            (str(e.target), e.kind, e.stacks,
+             -1 if e.expires is None else e.expires - now,
+             -1 if e.next_fire is None else e.next_fire - now)
+            for e in self.active.values()))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ticks = 200
+    rng = random.Random(1)
+    # a big fight: everyone shielded, a quarter poisoned, some stunned / buffed for a while
+    specs = []
+    for i in range(n):
+        specs.append((i, "shield", None, 0, None))
+        if i % 4 == 0:
+            specs.append((i, "poison", rng.randint(5, 50), 3, rng.randint(1, 3)))
+        if i % 3 == 0:
+            specs.append((i, "stun", rng.randint(1, 400), 0, None))
+
+    engine = EffectEngine()
+    for target, kind, duration, amount, period in specs:
+        engine.apply(target, kind, duration, amount, period)
+    start = time.perf_counter()
+    due = 0
+    for _ in range(ticks):
+        fired, expired = engine.advance()
+        due += len(fired) + len(expired)
+    heap_us = (time.perf_counter() - start) / ticks * 1e6
+
+    # the per-character dict way: visit every effect every tick
+    scan = {(t, k): [0 if d is None else d, p] for t, k, d, _, p in specs}
+    start = time.perf_counter()
+    for now in range(1, ticks + 1):
+        fired, expired = [], []
+        for key, (expires, period) in list(scan.items()):
+            if period and now % period == 0:
+                fired.append(key)
+            if expires and now >= expires:
+                del scan[key]
+                expired.append(key)
+    scan_us = (time.perf_counter() - start) / ticks * 1e6
+    print(f"{len(specs)} effects on {n} targets, {due / ticks:.0f} firing/expiring per tick")
+    print(f"  heap: {heap_us:8.0f} us/tick")
+    print(f"  scan: {scan_us:8.0f} us/tick")
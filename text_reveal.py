@@ -0,0 +1,125 @@
+# text_reveal.py
+# Typewriter text shared by the duel log and overworld dialogue. Characters
+# are revealed by elapsed time on a FrameLoop (several per frame when
+# needed) and the widget is touched at most once per frame.
+import bisect
+import textwrap
+from collections import deque
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def wrap_text(text, width):
+    """textwrap.wrap, cached: the same prompts are laid out over and over."""
+    return tuple(textwrap.wrap(text, width=width))
+
+
+def reveal_times(text, char_ms, line_pause=0):
+    """Game time (ms) at which each character of text appears."""
+    times = []
+    t = 0.0
+    for ch in text:
+        times.append(t)
+        t += line_pause if ch == "\n" else char_ms
+    return times
+
+
+class TextReveal:
+    """Queue of messages typed out one after another.
+
+    on_start(text)         a new message begins (clear the widget)
+    on_update(text, added) once per frame with the visible text and the new part
+    on_idle()              queue drained
+    """
+
+    def __init__(self, frames, on_update, on_start=None, on_idle=None,
+                 char_ms=25, line_pause=0, message_pause=600, backlog=3):
+        self.frames = frames
+        self.on_update = on_update
+        self.on_start = on_start
+        self.on_idle = on_idle
+        self.char_ms = char_ms
+        self.line_pause = line_pause
+        self.message_pause = message_pause
+        self.backlog = backlog  # queued messages allowed before we stop waiting on each one
+        self.queue = deque()
+        self.text = ""
+        self.shown = 0
+        self.task = None
+        self.revealing = False
+        self._times = []
+        self._elapsed = 0.0
+
+    @property
+    def busy(self):
+        return self.task is not None or bool(self.queue)
+
+    def show(self, text):
+        self.queue.append(text)
+        if self.task is None:
+            self._next()
+        elif len(self.queue) > self.backlog:
+            self.skip()
+
+    # ---------- Controls ----------
+    def skip(self):
+        """Finish the current message now (or cut the pause after it)."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        if self.revealing:
+            self._reveal(len(self.text))
+            self._message_done()
+        else:
+            self._next()
+
+    def fast_forward(self):
+        """Drop the backlog and show the newest message in full."""
+        if self.queue:
+            last = self.queue.pop()
+            self.queue.clear()
+            if self.task is not None:
+                self.task.cancel()
+            self.queue.append(last)
+            self._next()
+        self.skip()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.task = None
+        self.revealing = False
+        self.queue.clear()
+
+    # ---------- Internals ----------
+    def _next(self):
+        if not self.queue:
+            self.task = None
+            self.revealing = False
+            if self.on_idle:
+                self.on_idle()
+            return
+        self.text = self.queue.popleft()
+        self.shown = 0
+        self._times = reveal_times(self.text, self.char_ms, self.line_pause)
+        self._elapsed = 0.0
+        if self.on_start:
+            self.on_start(self.text)
+        self.revealing = True
+        self.task = self.frames.add(self._step, on_done=self._message_done)
+
+    def _step(self, dt):
+        self._elapsed += dt
+        self._reveal(bisect.bisect_right(self._times, self._elapsed))
+        return self.shown < len(self.text)
+
+    def _reveal(self, n):
+        if n > self.shown:
+            added = self.text[self.shown:n]
+            self.shown = n
+            self.on_update(self.text[:n], added)
+
+    def _message_done(self):
+        self.revealing = False
+        pause = self.message_pause if len(self.queue) <= self.backlog else 0
+        self.task = self.frames.wait(pause, self._next)
@@ -0,0 +1,272 @@
+# tournament.py
+# Headless AI-vs-AI ladder. Entrants are player policies ("random",
+# "greedy", "mcts:5") and enemy configurations (an enemy from ENEMY_NAMES
+# plus the policy picking its spells, e.g. "Necromancer/mcts:5"). Every
+# match is one duel of a player entrant against an enemy entrant; all of
+# them share one Elo pool, so both sides get ranked.
+#   python tournament.py --rounds 20 --games 200
+#   python tournament.py --mode swiss --player greedy --player mcts:2 --enemy Necromancer/greedy
+#   python tournament.py --checkpoint ladder.json --resume
+# Duels run on a process pool. Results come back in job order, so ratings
+# only depend on the seed. A checkpoint is written after every round.
+import os
+import json
+import time
+import random
+import argparse
+from multiprocessing import Pool, cpu_count
+
+from duel_engine import (play_campaign, random_policy, new_player,
+                         ENEMY_NAMES, ENEMY_BASE_HP, ENEMY_HP_STEP, ENEMY_SPELL_SETS)
+
+ELO_START = 1500.0
+ELO_K = 16.0
+DUEL_MAX_TURNS = 100  # Protego can stall forever; a stalled duel counts as a draw
+DEFAULT_GAMES = 100   # duels per pairing per round (one worker job)
+
+
+# -------------------- POLICIES --------------------
+def mean_damage(spells, spell):
+    (lo, hi), _ = spells[spell]
+    return (lo + hi) / 2
+
+
+def greedy_player(engine, rng):
+    """Heal when low, otherwise the hardest-hitting spell still available."""
+    player = engine.player
+    available = engine.available_spells()
+    heals = [s for s in available if player.spells[s][1] == "Heal"]
+    if heals and player.hp < 0.4 * player.max_hp:
+        return heals[0]
+    attacks = [s for s in available if player.spells[s][1] in ("Charm", "Curse")]
+    return max(attacks, key=lambda s: mean_damage(player.spells, s)) if attacks else rng.choice(available)
+
+
+def greedy_enemy(engine, rng):
+    spells = engine.enemy.spells
+    return max(spells, key=lambda s: mean_damage(spells, s))
+
+
+_searches = {}  # one MCTS per budget per worker process, so tables carry over between duels
+
+
+def _mcts(budget_ms):
+    if budget_ms not in _searches:
+        from enemy_ai import MCTS
+        _searches[budget_ms] = MCTS(budget_ms, seed=budget_ms)
+    return _searches[budget_ms]
+
+
+def make_policy(spec, side):
+    """Policy callable for a spec string; None means the engine's random enemy roll."""
+    name, _, arg = spec.partition(":")
+    if name == "random":
+        return random_policy if side == "player" else None
+    if name == "greedy":
+        return greedy_player if side == "player" else greedy_enemy
+    if name == "mcts":
+        budget = float(arg or 5)
+        return lambda engine, rng: _mcts(budget).choose(engine)
+    raise ValueError(f"unknown policy: {spec}")
+
+
+def enemy_config(spec):
+    """'Necromancer/greedy' -> (enemy name, base HP, spells, policy spec)."""
+    name, _, policy = spec.partition("/")
+    if name not in ENEMY_NAMES:
+        raise ValueError(f"unknown enemy: {name}")
+    index = ENEMY_NAMES.index(name)
+    return name, ENEMY_BASE_HP[index] + index * ENEMY_HP_STEP, ENEMY_SPELL_SETS[index], policy or "random"
+
+
+# -------------------- WORKERS --------------------
+def job_rng(seed, round_index, pair_index):
+    # one stream per pairing per round: results don't depend on worker count
+    return random.Random(f"{seed}:{round_index}:{pair_index}")
+
+
+def run_pairing(args):
+    """Play games duels; returns (player_id, enemy_id, player wins, enemy wins, draws)."""
+    seed, round_index, pair_index, player_id, enemy_id, games = args
+    rng = job_rng(seed, round_index, pair_index)
+    policy = make_policy(player_id, "player")
+    name, hp, spells, enemy_spec = enemy_config(enemy_id)
+    enemy_policy = make_policy(enemy_spec, "enemy")
+    wins = losses = draws = 0
+    for _ in range(games):
+        engine = play_campaign(rng, policy, DUEL_MAX_TURNS, player=new_player(), enemy_policy=enemy_policy,
+                               enemy_names=[name], enemy_base_hp=[hp], enemy_spells=spells)
+        if engine.phase == "victory":
+            wins += 1
+        elif engine.phase == "defeat":
+            losses += 1
+        else:
+            draws += 1
+    return player_id, enemy_id, wins, losses, draws
+
+
+# -------------------- LADDER --------------------
+def expected_score(rating, other):
+    return 1.0 / (1.0 + 10 ** ((other - rating) / 400.0))
+
+
+class Ladder:
+    def __init__(self, players, enemies, mode="round-robin", seed=0, games=DEFAULT_GAMES):
+        self.players = list(players)
+        self.enemies = list(enemies)
+        self.mode = mode
+        self.seed = seed
+        self.games = games
+        self.ratings = {e: ELO_START for e in self.players + self.enemies}
+        self.records = {e: [0, 0, 0] for e in self.ratings}  # wins, losses, draws
+        self.pairings = {}  # "player|enemy" -> [player wins, enemy wins, draws]
+        self.rounds_done = 0
+        self.duels = 0
+
+    # ---------- Pairing ----------
+    def pairings_for_round(self):
+        if self.mode == "round-robin":
+            return [(p, e) for p in self.players for e in self.enemies]
+        # swiss: strongest player against the closest-rated enemy still free this round
+        players = sorted(self.players, key=self.ratings.get, reverse=True)
+        free = list(self.enemies)
+        pairs = []
+        for player in players:
+            if not free:
+                free = list(self.enemies)
+            enemy = min(free, key=lambda e: (abs(self.ratings[e] - self.ratings[player]), e))
+            free.remove(enemy)
+            pairs.append((player, enemy))
+        return pairs
+
+    # ---------- Results ----------
+    def record(self, player, enemy, wins, losses, draws):
+        games = wins + losses + draws
+        if not games:
+            return
+        # one Elo step per duel at the batch's mean score, so the order of
+        # wins and losses inside a batch doesn't matter
+        score = (wins + 0.5 * draws) / games
+        rp, re = self.ratings[player], self.ratings[enemy]
+        for _ in range(games):
+            delta = ELO_K * (score - expected_score(rp, re))
+            rp += delta
+            re -= delta
+        self.ratings[player] = rp
+        self.ratings[enemy] = re
+        for entrant, row in ((player, (wins, losses, draws)), (enemy, (losses, wins, draws))):
+            record = self.records[entrant]
+            for i, value in enumerate(row):
+                record[i] += value
+        pairing = self.pairings.setdefault(f"{player}|{enemy}", [0, 0, 0])
+        for i, value in enumerate((wins, losses, draws)):
+            pairing[i] += value
+        self.duels += games
+
+    def standings(self):
+        return sorted(self.ratings.items(), key=lambda kv: kv[1], reverse=True)
+
+    def table(self):
+        lines = [f"{'entrant':32s} {'side':6s} {'elo':>7s} {'W':>8s} {'L':>8s} {'D':>8s}"]
+        for entrant, rating in self.standings():
+            side = "player" if entrant in self.players else "enemy"
+            w, l, d = self.records[entrant]
+            lines.append(f"{entrant[:32]:32s} {side:6s} {rating:7.1f} {w:8d} {l:8d} {d:8d}")
+        return "\n".join(lines)
+
+    # ---------- Checkpoints ----------
+    def to_dict(self):
+        return {"players": self.players, "enemies": self.enemies, "mode": self.mode, "seed": self.seed,
+                "games": self.games, "ratings": self.ratings, "records": self.records,
+                "pairings": self.pairings, "rounds_done": self.rounds_done, "duels": self.duels}
+
+    @classmethod
+    def from_dict(cls, data):
+        ladder = cls(data["players"], data["enemies"], data["mode"], data["seed"], data["games"])
+        ladder.ratings = data["ratings"]
+        ladder.records = data["records"]
+        ladder.pairings = data["pairings"]
+        ladder.rounds_done = data["rounds_done"]
+        ladder.duels = data["duels"]
+        return ladder
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)  # never leave a half-written checkpoint behind
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def run(ladder, rounds, workers=None, checkpoint=None, on_result=None):
+    """Play rounds more rounds, updating ladder as each pairing finishes."""
+    pool = Pool(workers or cpu_count()) if workers != 1 else None
+    try:
+        for _ in range(rounds):
+            round_index = ladder.rounds_done
+            jobs = [(ladder.seed, round_index, i, p, e, ladder.games)
+                    for i, (p, e) in enumerate(ladder.pairings_for_round())]
+            results = pool.imap(run_pairing, jobs) if pool else map(run_pairing, jobs)
+            for result in results:
+                ladder.record(*result)
+                if on_result:
+                    on_result(ladder)
+            ladder.rounds_done += 1
+            if checkpoint:
+                ladder.save(checkpoint)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return ladder
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="AI-vs-AI tournament with an Elo ladder")
+    parser.add_argument("--player", action="append", default=[],
+                        help="player policy: random, greedy, mcts[:ms] (repeatable)")
+    parser.add_argument("--enemy", action="append", default=[],
+                        help="enemy entrant: Name[/policy], e.g. 'Dark Wizard/greedy' (repeatable)")
+    parser.add_argument("--mode", choices=("round-robin", "swiss"), default="round-robin")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES, help="duels per pairing per round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="JSON file written after every round")
+    parser.add_argument("--resume", action="store_true", help="continue from --checkpoint")
+    args = parser.parse_args()
+
+    if args.resume:
+        if not args.checkpoint or not os.path.isfile(args.checkpoint):
+            parser.error("--resume needs an existing --checkpoint file")
+        ladder = Ladder.load(args.checkpoint)
+        print(f"resuming after round {ladder.rounds_done} ({ladder.duels} duels)")
+    else:
+        players = args.player or ["random", "greedy"]
+        enemies = args.enemy or [f"{name}/{policy}" for name in ENEMY_NAMES for policy in ("random", "greedy")]
+        for spec in players:
+            make_policy(spec, "player")
+        for spec in enemies:
+            make_policy(enemy_config(spec)[3], "enemy")
+        ladder = Ladder(players, enemies, args.mode, args.seed, args.games)
+
+    start = time.perf_counter()
+    first = ladder.duels
+
+    def progress(ladder):
+        rate = (ladder.duels - first) / max(1e-9, time.perf_counter() - start) * 60
+        print(f"\rround {ladder.rounds_done + 1}  {ladder.duels} duels  {rate:.0f} duels/min",
+              end="", flush=True)
+
+    run(ladder, args.rounds, args.workers, args.checkpoint, progress)
+    print()
+    print(ladder.table())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# world.py
+# Overworld entities kept in Python (no canvas.bbox round-trips).
+# Boxes live in flat arrays and a uniform grid answers proximity,
+# collision and trigger-zone queries by only looking at nearby cells.
+from array import array
+
+CELL_SIZE = 128
+
+
+class SpatialGrid:
+    def __init__(self, cell=CELL_SIZE):
+        self.cell = cell
+        self.cells = {}  # (cx, cy) -> set of entity ids
+
+    def _span(self, x1, y1, x2, y2):
+        c = self.cell
+        return int(x1 // c), int(y1 // c), int((x2 - 1e-9) // c), int((y2 - 1e-9) // c)
+
+    def _keys(self, span):
+        cx1, cy1, cx2, cy2 = span
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                yield cx, cy
+
+    def insert(self, eid, box):
+        for key in self._keys(self._span(*box)):
+            self.cells.setdefault(key, set()).add(eid)
+
+    def remove(self, eid, box):
+        for key in self._keys(self._span(*box)):
+            bucket = self.cells.get(key)
+            if bucket is not None:
+                bucket.discard(eid)
+                if not bucket:
+                    del self.cells[key]
+
+    def move(self, eid, old_box, new_box):
+        old_span = self._span(*old_box)
+        new_span = self._span(*new_box)
+        if old_span != new_span:  # most frames an entity stays in the same cells
+            self.remove(eid, old_box)
+            self.insert(eid, new_box)
+
+    def candidates(self, x1, y1, x2, y2):
+        found = set()
+        cells = self.cells
+        for key in self._keys(self._span(x1, y1, x2, y2)):
+            bucket = cells.get(key)
+            if bucket:
+                found |= bucket
+        return found
+
+
+class World:
+    """Axis-aligned boxes with a kind, an optional trigger inset and payload.
+
+    mask (collision.Mask) makes trigger and solid tests pixel exact: the
+    hitbox becomes the mask's opaque box and overlapping hitboxes are then
+    checked pixel by pixel. Without a mask, inset shrinks the box instead;
+    solid entities block movement in move_player().
+    """
+
+    def __init__(self, width, height, cell=CELL_SIZE):
+        self.width = width
+        self.height = height
+        self.x = array("d")
+        self.y = array("d")
+        self.w = array("d")
+        self.h = array("d")
+        self.inset = array("d")
+        self.solid = bytearray()
+        self.alive = bytearray()
+        self.kind = []
+        self.data = []
+        self.mask = []
+        self.grid = SpatialGrid(cell)
+
+    def __len__(self):
+        return sum(self.alive)
+
+    # ---------- Entities ----------
+    def add(self, kind, x, y, w, h, solid=False, inset=0, data=None, mask=None):
+        eid = len(self.x)
+        self.x.append(x)
+        self.y.append(y)
+        self.w.append(w)
+        self.h.append(h)
+        self.inset.append(inset)
+        self.solid.append(1 if solid else 0)
+        self.alive.append(1)
+        self.kind.append(kind)
+        self.data.append(data)
+        self.mask.append(mask)
+        self.grid.insert(eid, self.bbox(eid))
+        return eid
+
+    def remove(self, eid):
+        if self.alive[eid]:
+            self.grid.remove(eid, self.bbox(eid))
+            self.alive[eid] = 0
+
+    def bbox(self, eid):
+        x, y = self.x[eid], self.y[eid]
+        return x, y, x + self.w[eid], y + self.h[eid]
+
+    def hitbox(self, eid):
+        mask = self.mask[eid]
+        if mask is not None:
+            x, y = self.x[eid], self.y[eid]
+            mx1, my1, mx2, my2 = mask.bbox
+            return x + mx1, y + my1, x + mx2, y + my2
+        i = self.inset[eid]
+        x1, y1, x2, y2 = self.bbox(eid)
+        return x1 + i, y1 + i, x2 - i, y2 - i
+
+    def touching(self, eid, other, dx=0, dy=0):
+        """Hitboxes overlap (eid moved by dx, dy) and, where both have masks, so do their pixels."""
+        ax1, ay1, ax2, ay2 = self.hitbox(eid)
+        bx1, by1, bx2, by2 = self.hitbox(other)
+        if not (ax2 + dx > bx1 and ax1 + dx < bx2 and ay2 + dy > by1 and ay1 + dy < by2):
+            return False
+        mask, other_mask = self.mask[eid], self.mask[other]
+        if mask is None or other_mask is None:
+            return True
+        return mask.overlaps(self.x[eid] + dx, self.y[eid] + dy, other_mask, self.x[other], self.y[other])
+
+    def move(self, eid, dx, dy):
+        old = self.bbox(eid)
+        self.x[eid] += dx
+        self.y[eid] += dy
+        self.grid.move(eid, old, self.bbox(eid))
+
+    # ---------- Queries ----------
+    def query(self, x1, y1, x2, y2, kind=None, exclude=None, use_hitbox=False):
+        """Entities whose box strictly overlaps the rectangle."""
+        hits = []
+        for eid in self.grid.candidates(x1, y1, x2, y2):
+            if eid == exclude or (kind is not None and self.kind[eid] != kind):
+                continue
+            ex1, ey1, ex2, ey2 = self.hitbox(eid) if use_hitbox else self.bbox(eid)
+            if x2 > ex1 and x1 < ex2 and y2 > ey1 and y1 < ey2:
+                hits.append(eid)
+        hits.sort()
+        return hits
+
+    def nearby(self, x, y, radius, kind=None):
+        """Entities whose box centre is within radius of (x, y)."""
+        r2 = radius * radius
+        hits = []
+        for eid in self.query(x - radius, y - radius, x + radius, y + radius, kind):
+            cx = self.x[eid] + self.w[eid] / 2
+            cy = self.y[eid] + self.h[eid] / 2
+            if (cx - x) ** 2 + (cy - y) ** 2 <= r2:
+                hits.append(eid)
+        return hits
+
+    def triggers(self, eid, kind=None):
+        """Trigger zones (masks or inset boxes) the entity is standing in."""
+        return [other for other in self.query(*self.hitbox(eid), kind=kind, exclude=eid, use_hitbox=True)
+                if self.touching(eid, other)]
+
+    def move_player(self, eid, dx, dy):
+        """Move with edge clamping and solid-entity collision. Returns the applied (dx, dy)."""
+        x1, y1, x2, y2 = self.bbox(eid)
+        # --- Edge boundaries ---
+        if x1 + dx < 0: dx = -x1
+        if y1 + dy < 0: dy = -y1
+        if x2 + dx > self.width: dx = self.width - x2
+        if y2 + dy > self.height: dy = self.height - y2
+        # resolve one axis at a time so the player slides along obstacles
+        if dx and self._blocked(eid, dx, 0):
+            dx = 0
+        if dy and self._blocked(eid, dx, dy):
+            dy = 0
+        if dx or dy:
+            self.move(eid, dx, dy)
+        return dx, dy
+
+    def _blocked(self, eid, dx, dy):
+        x1, y1, x2, y2 = self.hitbox(eid)
+        for other in self.query(x1 + dx, y1 + dy, x2 + dx, y2 + dy, exclude=eid, use_hitbox=True):
+            if self.solid[other] and self.touching(eid, other, dx, dy):
+                return True
+        return False